@@ -3,87 +3,21 @@ import matplotlib.pyplot as plt
 import numpy as np
 from datetime import datetime
 import glob
-from openpyxl import load_workbook
 import os
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'src'))
+from timeslot_store import load_timeslot_data, TIME_COLUMNS
+
 # Set default font
 plt.rcParams['font.sans-serif'] = ['Arial']
 plt.rcParams['axes.unicode_minus'] = False
 
-script_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.dirname(os.path.dirname(script_dir))  # Go up two levels
-data_folder = os.path.join(project_root, 'data', 'Timeslot by week')
-file_pattern = os.path.join(data_folder, 'W*.xlsx')
-files = glob.glob(file_pattern)
-
-print(f"Found {len(files)} files to merge:")
-for f in sorted(files):
-    print(f"  - {os.path.basename(f)}")
-
-# Read and merge all files
-dfs = []
-for file in files:
-    try:
-        wb = load_workbook(file, data_only=True)
-        ws = wb.active
-        
-        data = []
-        for row in ws.iter_rows(values_only=True):
-            data.append(list(row))
-        
-        df = pd.DataFrame(data[1:], columns=data[0])
-        
-        # Standardize column count
-        if len(df.columns) == 31:
-            df.insert(7, '0h00', 0)
-        if len(df.columns) == 32:
-            df = df.iloc[:, :-1]
-        
-        df.columns = [f'col_{i}' for i in range(len(df.columns))]
-        dfs.append(df)
-        
-    except Exception as e:
-        print(f"Error reading {file}: {e}")
-
-merged_df = pd.concat(dfs, ignore_index=True)
-print(f"\nTotal rows after merging: {len(merged_df)}")
-
-# Parse dates
-merged_df['Date_parsed'] = pd.to_datetime(merged_df.iloc[:, 1], errors='coerce', dayfirst=True)
-
-# Correct date errors
-mask = (merged_df['Date_parsed'].dt.year == 2025) & \
-       (merged_df['Date_parsed'].dt.day == 11) & \
-       (merged_df['Date_parsed'].dt.month <= 10)
-
-if mask.sum() > 0:
-    print(f"\nDetected {mask.sum()} rows with potentially misinterpreted dates")
-    print("Correcting: YYYY-M-11 -> YYYY-11-M")
-    corrected_dates = merged_df.loc[mask, 'Date_parsed'].apply(
-        lambda x: pd.Timestamp(year=x.year, month=11, day=x.month)
-    )
-    merged_df.loc[mask, 'Date_parsed'] = corrected_dates
-
-# Filter 2025 yearly data
-year_data = merged_df[merged_df['Date_parsed'].dt.year == 2025]
-print(f"Rows with 2025 data: {len(year_data)}")
-
-# Remove blank category rows
-year_data = year_data[year_data.iloc[:, 3].notna()]
-print(f"Rows after removing blank Category: {len(year_data)}")
-
-# Keep only Booking taken and Available Capacity
-year_data = year_data[year_data.iloc[:, 5].isin(['Booking taken', 'Available Capacity'])]
-print(f"Rows after filtering Booking taken and Available Capacity: {len(year_data)}")
-
-# Create output directory
-output_dir = os.path.join(project_root, 'data', 'Timeslot_Yearly_Analysis')
-os.makedirs(output_dir, exist_ok=True)
 
 # Time column indices
-time_columns = list(range(7, 31))
+time_columns = TIME_COLUMNS
 
 def extract_timeslot_data(df, condition_type, category):
     """Extract timeslot data"""
@@ -166,126 +100,6 @@ def plot_utilization_stacked(data, category, direction, month_name):
     plt.savefig(os.path.join(output_dir, filename), dpi=300, bbox_inches='tight')
     plt.close()
 
-# Month name mapping
-month_names = {
-    1: 'January', 2: 'February', 3: 'March', 4: 'April',
-    5: 'May', 6: 'June', 7: 'July', 8: 'August',
-    9: 'September', 10: 'October', 11: 'November', 12: 'December'
-}
-
-# Store yearly data for boxplots
-yearly_utilization_data = {
-    'FG_inbound': [],
-    'FG_outbound': [],
-    'R&P_inbound': [],
-    'R&P_outbound': []
-}
-
-yearly_booking_data = {
-    'FG_inbound': [],
-    'FG_outbound': [],
-    'R&P_inbound': [],
-    'R&P_outbound': []
-}
-
-yearly_available_data = {
-    'FG_inbound': [],
-    'FG_outbound': [],
-    'R&P_inbound': [],
-    'R&P_outbound': []
-}
-
-# Generate charts for each month
-print("\n=== Processing monthly data ===")
-for month_num in range(1, 13):
-    month_name = month_names[month_num]
-    print(f"\nProcessing {month_name}...")
-    
-    # Filter data for this month
-    month_data = year_data[year_data['Date_parsed'].dt.month == month_num]
-    
-    if len(month_data) == 0:
-        print(f"  No data found for {month_name}, skipping...")
-        continue
-    
-    print(f"  Rows: {len(month_data)}")
-    
-    # Extract data for each category
-    fg_inbound = extract_timeslot_data(month_data, 'inbound', 'FG')
-    fg_outbound = extract_timeslot_data(month_data, 'outbound', 'FG')
-    rp_inbound = extract_timeslot_data(month_data, 'inbound', 'R&P')
-    rp_outbound = extract_timeslot_data(month_data, 'outbound', 'R&P')
-    
-    # Collect utilization data for boxplots
-    yearly_utilization_data['FG_inbound'].append({
-        'month': month_name,
-        'rates': fg_inbound['Utilization Rate'].dropna().values
-    })
-    yearly_utilization_data['FG_outbound'].append({
-        'month': month_name,
-        'rates': fg_outbound['Utilization Rate'].dropna().values
-    })
-    yearly_utilization_data['R&P_inbound'].append({
-        'month': month_name,
-        'rates': rp_inbound['Utilization Rate'].dropna().values
-    })
-    yearly_utilization_data['R&P_outbound'].append({
-        'month': month_name,
-        'rates': rp_outbound['Utilization Rate'].dropna().values
-    })
-    
-    # Collect booking taken data for boxplots
-    yearly_booking_data['FG_inbound'].append({
-        'month': month_name,
-        'values': fg_inbound['Booking Taken'].values
-    })
-    yearly_booking_data['FG_outbound'].append({
-        'month': month_name,
-        'values': fg_outbound['Booking Taken'].values
-    })
-    yearly_booking_data['R&P_inbound'].append({
-        'month': month_name,
-        'values': rp_inbound['Booking Taken'].values
-    })
-    yearly_booking_data['R&P_outbound'].append({
-        'month': month_name,
-        'values': rp_outbound['Booking Taken'].values
-    })
-    
-    # Collect available capacity data for boxplots
-    yearly_available_data['FG_inbound'].append({
-        'month': month_name,
-        'values': fg_inbound['Available Capacity'].values
-    })
-    yearly_available_data['FG_outbound'].append({
-        'month': month_name,
-        'values': fg_outbound['Available Capacity'].values
-    })
-    yearly_available_data['R&P_inbound'].append({
-        'month': month_name,
-        'values': rp_inbound['Available Capacity'].values
-    })
-    yearly_available_data['R&P_outbound'].append({
-        'month': month_name,
-        'values': rp_outbound['Available Capacity'].values
-    })
-    
-    # Generate charts
-    plot_booking_taken(fg_inbound, 'FG', 'inbound', month_name)
-    plot_booking_taken(fg_outbound, 'FG', 'outbound', month_name)
-    plot_booking_taken(rp_inbound, 'R&P', 'inbound', month_name)
-    plot_booking_taken(rp_outbound, 'R&P', 'outbound', month_name)
-    
-    plot_utilization_stacked(fg_inbound, 'FG', 'inbound', month_name)
-    plot_utilization_stacked(fg_outbound, 'FG', 'outbound', month_name)
-    plot_utilization_stacked(rp_inbound, 'R&P', 'inbound', month_name)
-    plot_utilization_stacked(rp_outbound, 'R&P', 'outbound', month_name)
-    
-    print(f"  Generated 8 charts for {month_name}")
-
-# Generate yearly boxplots
-print("\n=== Generating yearly boxplots ===")
-
 def plot_yearly_boxplot(util_data, category, direction):
     """Plot yearly utilization rate boxplot"""
     fig, ax = plt.subplots(figsize=(14, 7))
@@ -346,14 +160,6 @@ def plot_yearly_boxplot(util_data, category, direction):
     plt.close()
     print(f"  Generated {filename}")
 
-# Generate boxplots for each category and direction
-plot_yearly_boxplot(yearly_utilization_data['FG_inbound'], 'FG', 'inbound')
-plot_yearly_boxplot(yearly_utilization_data['FG_outbound'], 'FG', 'outbound')
-plot_yearly_boxplot(yearly_utilization_data['R&P_inbound'], 'R&P', 'inbound')
-plot_yearly_boxplot(yearly_utilization_data['R&P_outbound'], 'R&P', 'outbound')
-
-print("\n=== Generating yearly boxplots for Booking Taken ===")
-
 def plot_yearly_boxplot_booking(booking_data, category, direction):
     """Plot yearly booking taken boxplot"""
     fig, ax = plt.subplots(figsize=(14, 7))
@@ -413,14 +219,6 @@ def plot_yearly_boxplot_booking(booking_data, category, direction):
     plt.close()
     print(f"  Generated {filename}")
 
-# Generate booking taken boxplots
-plot_yearly_boxplot_booking(yearly_booking_data['FG_inbound'], 'FG', 'inbound')
-plot_yearly_boxplot_booking(yearly_booking_data['FG_outbound'], 'FG', 'outbound')
-plot_yearly_boxplot_booking(yearly_booking_data['R&P_inbound'], 'R&P', 'inbound')
-plot_yearly_boxplot_booking(yearly_booking_data['R&P_outbound'], 'R&P', 'outbound')
-
-print("\n=== Generating yearly boxplots for Available Capacity ===")
-
 def plot_yearly_boxplot_available(available_data, category, direction):
     """Plot yearly available capacity boxplot"""
     fig, ax = plt.subplots(figsize=(14, 7))
@@ -480,48 +278,6 @@ def plot_yearly_boxplot_available(available_data, category, direction):
     plt.close()
     print(f"  Generated {filename}")
 
-# Generate available capacity boxplots
-plot_yearly_boxplot_available(yearly_available_data['FG_inbound'], 'FG', 'inbound')
-plot_yearly_boxplot_available(yearly_available_data['FG_outbound'], 'FG', 'outbound')
-plot_yearly_boxplot_available(yearly_available_data['R&P_inbound'], 'R&P', 'inbound')
-plot_yearly_boxplot_available(yearly_available_data['R&P_outbound'], 'R&P', 'outbound')
-
-# Save summary data to Excel
-print("\n=== Saving summary data to Excel ===")
-summary_data = []
-
-for month_num in range(1, 13):
-    month_name = month_names[month_num]
-    month_data = year_data[year_data['Date_parsed'].dt.month == month_num]
-    
-    if len(month_data) == 0:
-        continue
-    
-    fg_inbound = extract_timeslot_data(month_data, 'inbound', 'FG')
-    fg_outbound = extract_timeslot_data(month_data, 'outbound', 'FG')
-    rp_inbound = extract_timeslot_data(month_data, 'inbound', 'R&P')
-    rp_outbound = extract_timeslot_data(month_data, 'outbound', 'R&P')
-    
-    summary_data.append({
-        'Month': month_name,
-        'FG_Inbound_Avg_Utilization': fg_inbound['Utilization Rate'].mean(),
-        'FG_Outbound_Avg_Utilization': fg_outbound['Utilization Rate'].mean(),
-        'R&P_Inbound_Avg_Utilization': rp_inbound['Utilization Rate'].mean(),
-        'R&P_Outbound_Avg_Utilization': rp_outbound['Utilization Rate'].mean(),
-        'FG_Inbound_Total_Bookings': fg_inbound['Booking Taken'].sum(),
-        'FG_Outbound_Total_Bookings': fg_outbound['Booking Taken'].sum(),
-        'R&P_Inbound_Total_Bookings': rp_inbound['Booking Taken'].sum(),
-        'R&P_Outbound_Total_Bookings': rp_outbound['Booking Taken'].sum(),
-    })
-
-summary_df = pd.DataFrame(summary_data)
-summary_file = os.path.join(output_dir, 'Yearly_Summary_2025.xlsx')
-summary_df.to_excel(summary_file, index=False)
-print(f"Summary data saved to {summary_file}")
-
-# Generate yearly average daily timeslot patterns
-print("\n=== Generating yearly average daily timeslot patterns ===")
-
 def plot_yearly_average_daily_pattern(year_data, category, direction):
     """Plot yearly average daily timeslot pattern"""
     # For R&P, exclude data after September (months 10-12) due to data quality issues
@@ -618,14 +374,219 @@ def plot_yearly_average_daily_pattern(year_data, category, direction):
     plt.close()
     print(f"  Generated {filename}")
 
-# Generate yearly average daily patterns for all categories
-plot_yearly_average_daily_pattern(year_data, 'FG', 'inbound')
-plot_yearly_average_daily_pattern(year_data, 'FG', 'outbound')
-plot_yearly_average_daily_pattern(year_data, 'R&P', 'inbound')
-plot_yearly_average_daily_pattern(year_data, 'R&P', 'outbound')
-
-print("\n" + "="*60)
-print("All analysis complete!")
-print(f"Total charts generated: {len(glob.glob(os.path.join(output_dir, '*.png')))}")
-print(f"Output directory: {output_dir}")
-print("="*60)
+
+if __name__ == '__main__':
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(os.path.dirname(script_dir))  # Go up two levels
+    data_folder = os.path.join(project_root, 'data', 'Timeslot by week')
+
+    # Read and merge all files: parsed in parallel, cached, only new or changed W-files are re-read,
+    # date fix (YYYY-M-11 -> YYYY-11-M) already applied (src/timeslot_store.py)
+    merged_df = load_timeslot_data(data_folder, skip_errors=True)
+    print(f"\nTotal rows after merging: {len(merged_df)}")
+
+    # Filter 2025 yearly data
+    year_data = merged_df[merged_df['Date_parsed'].dt.year == 2025]
+    print(f"Rows with 2025 data: {len(year_data)}")
+
+    # Remove blank category rows
+    year_data = year_data[year_data.iloc[:, 3].notna()]
+    print(f"Rows after removing blank Category: {len(year_data)}")
+
+    # Keep only Booking taken and Available Capacity
+    year_data = year_data[year_data.iloc[:, 5].isin(['Booking taken', 'Available Capacity'])]
+    print(f"Rows after filtering Booking taken and Available Capacity: {len(year_data)}")
+
+    # Create output directory
+    output_dir = os.path.join(project_root, 'data', 'Timeslot_Yearly_Analysis')
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Month name mapping
+    month_names = {
+        1: 'January', 2: 'February', 3: 'March', 4: 'April',
+        5: 'May', 6: 'June', 7: 'July', 8: 'August',
+        9: 'September', 10: 'October', 11: 'November', 12: 'December'
+    }
+
+    # Store yearly data for boxplots
+    yearly_utilization_data = {
+        'FG_inbound': [],
+        'FG_outbound': [],
+        'R&P_inbound': [],
+        'R&P_outbound': []
+    }
+
+    yearly_booking_data = {
+        'FG_inbound': [],
+        'FG_outbound': [],
+        'R&P_inbound': [],
+        'R&P_outbound': []
+    }
+
+    yearly_available_data = {
+        'FG_inbound': [],
+        'FG_outbound': [],
+        'R&P_inbound': [],
+        'R&P_outbound': []
+    }
+
+    # Generate charts for each month
+    print("\n=== Processing monthly data ===")
+    for month_num in range(1, 13):
+        month_name = month_names[month_num]
+        print(f"\nProcessing {month_name}...")
+
+        # Filter data for this month
+        month_data = year_data[year_data['Date_parsed'].dt.month == month_num]
+
+        if len(month_data) == 0:
+            print(f"  No data found for {month_name}, skipping...")
+            continue
+
+        print(f"  Rows: {len(month_data)}")
+
+        # Extract data for each category
+        fg_inbound = extract_timeslot_data(month_data, 'inbound', 'FG')
+        fg_outbound = extract_timeslot_data(month_data, 'outbound', 'FG')
+        rp_inbound = extract_timeslot_data(month_data, 'inbound', 'R&P')
+        rp_outbound = extract_timeslot_data(month_data, 'outbound', 'R&P')
+
+        # Collect utilization data for boxplots
+        yearly_utilization_data['FG_inbound'].append({
+            'month': month_name,
+            'rates': fg_inbound['Utilization Rate'].dropna().values
+        })
+        yearly_utilization_data['FG_outbound'].append({
+            'month': month_name,
+            'rates': fg_outbound['Utilization Rate'].dropna().values
+        })
+        yearly_utilization_data['R&P_inbound'].append({
+            'month': month_name,
+            'rates': rp_inbound['Utilization Rate'].dropna().values
+        })
+        yearly_utilization_data['R&P_outbound'].append({
+            'month': month_name,
+            'rates': rp_outbound['Utilization Rate'].dropna().values
+        })
+
+        # Collect booking taken data for boxplots
+        yearly_booking_data['FG_inbound'].append({
+            'month': month_name,
+            'values': fg_inbound['Booking Taken'].values
+        })
+        yearly_booking_data['FG_outbound'].append({
+            'month': month_name,
+            'values': fg_outbound['Booking Taken'].values
+        })
+        yearly_booking_data['R&P_inbound'].append({
+            'month': month_name,
+            'values': rp_inbound['Booking Taken'].values
+        })
+        yearly_booking_data['R&P_outbound'].append({
+            'month': month_name,
+            'values': rp_outbound['Booking Taken'].values
+        })
+
+        # Collect available capacity data for boxplots
+        yearly_available_data['FG_inbound'].append({
+            'month': month_name,
+            'values': fg_inbound['Available Capacity'].values
+        })
+        yearly_available_data['FG_outbound'].append({
+            'month': month_name,
+            'values': fg_outbound['Available Capacity'].values
+        })
+        yearly_available_data['R&P_inbound'].append({
+            'month': month_name,
+            'values': rp_inbound['Available Capacity'].values
+        })
+        yearly_available_data['R&P_outbound'].append({
+            'month': month_name,
+            'values': rp_outbound['Available Capacity'].values
+        })
+
+        # Generate charts
+        plot_booking_taken(fg_inbound, 'FG', 'inbound', month_name)
+        plot_booking_taken(fg_outbound, 'FG', 'outbound', month_name)
+        plot_booking_taken(rp_inbound, 'R&P', 'inbound', month_name)
+        plot_booking_taken(rp_outbound, 'R&P', 'outbound', month_name)
+
+        plot_utilization_stacked(fg_inbound, 'FG', 'inbound', month_name)
+        plot_utilization_stacked(fg_outbound, 'FG', 'outbound', month_name)
+        plot_utilization_stacked(rp_inbound, 'R&P', 'inbound', month_name)
+        plot_utilization_stacked(rp_outbound, 'R&P', 'outbound', month_name)
+
+        print(f"  Generated 8 charts for {month_name}")
+
+    # Generate yearly boxplots
+    print("\n=== Generating yearly boxplots ===")
+
+    # Generate boxplots for each category and direction
+    plot_yearly_boxplot(yearly_utilization_data['FG_inbound'], 'FG', 'inbound')
+    plot_yearly_boxplot(yearly_utilization_data['FG_outbound'], 'FG', 'outbound')
+    plot_yearly_boxplot(yearly_utilization_data['R&P_inbound'], 'R&P', 'inbound')
+    plot_yearly_boxplot(yearly_utilization_data['R&P_outbound'], 'R&P', 'outbound')
+
+    print("\n=== Generating yearly boxplots for Booking Taken ===")
+
+    # Generate booking taken boxplots
+    plot_yearly_boxplot_booking(yearly_booking_data['FG_inbound'], 'FG', 'inbound')
+    plot_yearly_boxplot_booking(yearly_booking_data['FG_outbound'], 'FG', 'outbound')
+    plot_yearly_boxplot_booking(yearly_booking_data['R&P_inbound'], 'R&P', 'inbound')
+    plot_yearly_boxplot_booking(yearly_booking_data['R&P_outbound'], 'R&P', 'outbound')
+
+    print("\n=== Generating yearly boxplots for Available Capacity ===")
+
+    # Generate available capacity boxplots
+    plot_yearly_boxplot_available(yearly_available_data['FG_inbound'], 'FG', 'inbound')
+    plot_yearly_boxplot_available(yearly_available_data['FG_outbound'], 'FG', 'outbound')
+    plot_yearly_boxplot_available(yearly_available_data['R&P_inbound'], 'R&P', 'inbound')
+    plot_yearly_boxplot_available(yearly_available_data['R&P_outbound'], 'R&P', 'outbound')
+
+    # Save summary data to Excel
+    print("\n=== Saving summary data to Excel ===")
+    summary_data = []
+
+    for month_num in range(1, 13):
+        month_name = month_names[month_num]
+        month_data = year_data[year_data['Date_parsed'].dt.month == month_num]
+
+        if len(month_data) == 0:
+            continue
+
+        fg_inbound = extract_timeslot_data(month_data, 'inbound', 'FG')
+        fg_outbound = extract_timeslot_data(month_data, 'outbound', 'FG')
+        rp_inbound = extract_timeslot_data(month_data, 'inbound', 'R&P')
+        rp_outbound = extract_timeslot_data(month_data, 'outbound', 'R&P')
+
+        summary_data.append({
+            'Month': month_name,
+            'FG_Inbound_Avg_Utilization': fg_inbound['Utilization Rate'].mean(),
+            'FG_Outbound_Avg_Utilization': fg_outbound['Utilization Rate'].mean(),
+            'R&P_Inbound_Avg_Utilization': rp_inbound['Utilization Rate'].mean(),
+            'R&P_Outbound_Avg_Utilization': rp_outbound['Utilization Rate'].mean(),
+            'FG_Inbound_Total_Bookings': fg_inbound['Booking Taken'].sum(),
+            'FG_Outbound_Total_Bookings': fg_outbound['Booking Taken'].sum(),
+            'R&P_Inbound_Total_Bookings': rp_inbound['Booking Taken'].sum(),
+            'R&P_Outbound_Total_Bookings': rp_outbound['Booking Taken'].sum(),
+        })
+
+    summary_df = pd.DataFrame(summary_data)
+    summary_file = os.path.join(output_dir, 'Yearly_Summary_2025.xlsx')
+    summary_df.to_excel(summary_file, index=False)
+    print(f"Summary data saved to {summary_file}")
+
+    # Generate yearly average daily timeslot patterns
+    print("\n=== Generating yearly average daily timeslot patterns ===")
+
+    # Generate yearly average daily patterns for all categories
+    plot_yearly_average_daily_pattern(year_data, 'FG', 'inbound')
+    plot_yearly_average_daily_pattern(year_data, 'FG', 'outbound')
+    plot_yearly_average_daily_pattern(year_data, 'R&P', 'inbound')
+    plot_yearly_average_daily_pattern(year_data, 'R&P', 'outbound')
+
+    print("\n" + "="*60)
+    print("All analysis complete!")
+    print(f"Total charts generated: {len(glob.glob(os.path.join(output_dir, '*.png')))}")
+    print(f"Output directory: {output_dir}")
+    print("="*60)
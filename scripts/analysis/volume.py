@@ -2,13 +2,16 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 from datetime import datetime
+import os
+import sys
 
-file_path = 'data\Total Shipments 2025.xlsx'
-inbound_df = pd.read_excel(file_path, sheet_name='Inbound Shipments 2025')
-outbound_df = pd.read_excel(file_path, sheet_name='Outbound Shipments 2025')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'src'))
+from shipments_store import load_shipments
 
-inbound_df['Date Hour appointement'] = pd.to_datetime(inbound_df['Date Hour appointement'])
-outbound_df['Date Hour appointement'] = pd.to_datetime(outbound_df['Date Hour appointement'])
+file_path = 'data\Total Shipments 2025.xlsx'
+shipments = load_shipments(file_path)
+inbound_df = shipments['Inbound']
+outbound_df = shipments['Outbound']
 
 inbound_nov = inbound_df[(inbound_df['Date Hour appointement'].dt.year == 2025) & 
                          (inbound_df['Date Hour appointement'].dt.month == 11)]
@@ -3,21 +3,23 @@ import matplotlib.pyplot as plt
 import numpy as np
 from datetime import datetime
 import os
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'src'))
+from shipments_store import load_shipments
+
 # Set default font
 plt.rcParams['font.sans-serif'] = ['Arial']
 plt.rcParams['axes.unicode_minus'] = False
 
 # File path
 file_path = 'data\\Total Shipments 2025.xlsx'
-inbound_df = pd.read_excel(file_path, sheet_name='Inbound Shipments 2025')
-outbound_df = pd.read_excel(file_path, sheet_name='Outbound Shipments 2025')
-
-# Parse dates
-inbound_df['Date Hour appointement'] = pd.to_datetime(inbound_df['Date Hour appointement'])
-outbound_df['Date Hour appointement'] = pd.to_datetime(outbound_df['Date Hour appointement'])
+# Parsed once and cached next to the workbook (dates already datetime64), see src/shipments_store.py
+shipments = load_shipments(file_path)
+inbound_df = shipments['Inbound']
+outbound_df = shipments['Outbound']
 
 # Filter 2025 data
 inbound_year = inbound_df[inbound_df['Date Hour appointement'].dt.year == 2025]
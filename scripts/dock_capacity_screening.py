@@ -0,0 +1,221 @@
+"""
+码头容量快速筛选 - 不运行simpy，批量评估 hourly_dock_capacity 的 what-if 配置
+
+用途：只改码头小时容量的问题（例如“20:00的FG装货slot减1”）先用 NumPy 排队模型快速扫描成千上万组配置，
+挑出值得细看的配置后再用 DCSimulation 跑完整仿真。模型说明见 src/dock_screening.py。
+
+输出：
+  - outputs/results/dock_capacity_screening.xlsx
+    - Cross_Validation:  与 DCSimulation.run 的逐码头类型对比（等待车辆·小时、最大排队、服务数）
+    - Single_Hour_Sweep: 每个码头类型、每个小时容量 -1 的影响（按等待车辆·小时增量排序）
+"""
+
+import sys
+import os
+import time
+import copy
+import numpy as np
+import simpy
+
+# 确保能导入 src 模块
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+
+from dc_simulation_plot_update import (
+    DCSimulation, SIMULATION_CONFIG, SYSTEM_PARAMETERS, RESULTS_DIR,
+    get_open_calendar, load_order_table
+)
+from dock_screening import (
+    DOCK_SLOTS, hourly_capacity_schedule, arrivals_per_hour, evaluate_dock_queue
+)
+import pandas as pd
+
+
+def build_open_mask(scenario_config, horizon_hours):
+    """逐小时开门掩码（与 timeslot_capacity_manager 一样在整点判断）"""
+    calendar = get_open_calendar(scenario_config)
+    return np.array([calendar.is_open(h) for h in range(horizon_hours)], dtype=bool)
+
+
+def load_dock_arrivals(target_month=1):
+    """按码头类型收集该月订单的timeslot时刻（仿真小时）"""
+    arrivals = {slot_key: [] for slot_key in DOCK_SLOTS}
+    slot_of = {(cat, direction): slot_key for slot_key, (cat, _dock, direction) in DOCK_SLOTS.items()}
+    table = load_order_table(months=[target_month]) or {}
+    for key, records in table.items():
+        if f'M{target_month:02d}' not in key:
+            continue
+        for record in records:
+            slot_key = slot_of.get((record.category, record.direction))
+            if slot_key is not None and record.timeslot_time is not None:
+                arrivals[slot_key].append(record.timeslot_time)
+    return {slot_key: np.array(times, dtype=np.float64) for slot_key, times in arrivals.items()}
+
+
+def _capacity_matrix(variants, slot_key, open_mask):
+    category, dock_type, _direction = DOCK_SLOTS[slot_key]
+    return np.stack([hourly_capacity_schedule(capacity[category][dock_type], open_mask)
+                     for capacity in variants.values()])
+
+
+def screen_capacity_variants(scenario_config, variants, target_month=1, duration_days=30, arrivals=None):
+    """批量评估码头容量配置。
+
+    Args:
+        scenario_config: SIMULATION_CONFIG 中的场景（决定开门时段）
+        variants: {配置名: hourly_dock_capacity 格式的dict}
+        arrivals: load_dock_arrivals 的结果（多次调用时可复用）
+
+    Returns:
+        DataFrame，每行一个 (配置, 码头类型)
+    """
+    horizon_hours = duration_days * 24
+    open_mask = build_open_mask(scenario_config, horizon_hours)
+    if arrivals is None:
+        arrivals = load_dock_arrivals(target_month)
+
+    names = list(variants)
+    frames = []
+    for slot_key in DOCK_SLOTS:
+        result = evaluate_dock_queue(arrivals_per_hour(arrivals[slot_key], horizon_hours),
+                                     _capacity_matrix(variants, slot_key, open_mask))
+        n_arrivals = max(result['arrivals'], 1)
+        frames.append(pd.DataFrame({
+            'variant': names,
+            'slot_key': slot_key,
+            'arrivals': result['arrivals'],
+            'served': result['served'],
+            'unserved': result['unserved'],
+            'truck_hours_waiting': result['truck_hours_waiting'],
+            'avg_wait_per_truck_h': result['truck_hours_waiting'] / n_arrivals,
+            'max_queue': result['max_queue'],
+            'utilization': result['utilization'],
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def single_hour_capacity_variants(base_capacity, delta=-1):
+    """对每个码头类型、每个容量>0的小时生成一个“容量+delta”的配置（含 'base'）"""
+    variants = {'base': base_capacity}
+    for slot_key, (category, dock_type, _direction) in DOCK_SLOTS.items():
+        cap_map = base_capacity[category][dock_type]
+        for hour in range(24):
+            slots = cap_map.get(hour, cap_map.get(str(hour), 0))
+            if slots <= 0:
+                continue
+            variant = copy.deepcopy(base_capacity)
+            variant[category][dock_type] = {h: variant[category][dock_type].get(h, variant[category][dock_type].get(str(h), 0))
+                                            for h in range(24)}
+            variant[category][dock_type][hour] = max(0, slots + delta)
+            variants[f'{slot_key}@{hour:02d}:00{delta:+d}'] = variant
+    return variants
+
+
+def cross_validate_with_simulation(scenario_name='baseline', target_month=1, duration_days=30, seed=42):
+    """与 DCSimulation.run 交叉验证。
+
+    记录仿真中每次码头slot申请/获得的时刻，比较三组排队指标：
+      - sim:            DCSimulation 实际的排队
+      - fast_sim_input: 快速模型 + 仿真里实际的到达时刻（只检验排队模型本身）
+      - fast_screening: 快速模型 + 订单timeslot（screening 实际使用的输入，含“备货不延误”假设）
+    """
+    scenario_config = SIMULATION_CONFIG[scenario_name]
+    horizon_hours = duration_days * 24
+
+    env = simpy.Environment()
+    sim = DCSimulation(env, scenario_config, run_id=1, seed=seed, target_month=target_month)
+    requested = {slot_key: [] for slot_key in DOCK_SLOTS}
+    granted = {slot_key: [] for slot_key in DOCK_SLOTS}
+    dock_request = sim.dock_slots.request
+
+    def _recording_request(slot_key):
+        requested[slot_key].append(env.now)
+        slot_request = dock_request(slot_key)
+        if slot_request is None:
+            granted[slot_key].append(env.now)
+        else:
+            slot_request.callbacks.append(lambda _event: granted[slot_key].append(env.now))
+        return slot_request
+
+    sim.dock_slots.request = _recording_request
+    start = time.perf_counter()
+    sim.run(duration_days=duration_days, target_month=target_month)
+    sim_seconds = time.perf_counter() - start
+
+    open_mask = build_open_mask(scenario_config, horizon_hours)
+    screening_arrivals = load_dock_arrivals(target_month)
+    rows = []
+    for slot_key, (category, dock_type, _direction) in DOCK_SLOTS.items():
+        capacity = hourly_capacity_schedule(SYSTEM_PARAMETERS['hourly_dock_capacity'][category][dock_type], open_mask)
+
+        sim_arrivals = arrivals_per_hour(requested[slot_key], horizon_hours)
+        sim_served = arrivals_per_hour(granted[slot_key], horizon_hours)
+        sim_queue = np.cumsum(sim_arrivals) - np.cumsum(sim_served)
+        fast_sim_input = evaluate_dock_queue(sim_arrivals, capacity)
+        fast_screening = evaluate_dock_queue(arrivals_per_hour(screening_arrivals[slot_key], horizon_hours), capacity)
+
+        rows.append({
+            'scenario': scenario_name,
+            'slot_key': slot_key,
+            'sim_served': int(sim_served.sum()),
+            'fast_sim_input_served': int(fast_sim_input['served']),
+            'fast_screening_served': int(fast_screening['served']),
+            'sim_truck_hours': int(sim_queue.sum()),
+            'fast_sim_input_truck_hours': int(fast_sim_input['truck_hours_waiting']),
+            'fast_screening_truck_hours': int(fast_screening['truck_hours_waiting']),
+            'sim_max_queue': int(sim_queue.max()) if len(sim_queue) else 0,
+            'fast_sim_input_max_queue': int(fast_sim_input['max_queue']),
+            'fast_screening_max_queue': int(fast_screening['max_queue']),
+            'hours_used_equal_pct': float(np.mean(fast_sim_input['used'] == sim_served) * 100),
+            'sim_seconds': sim_seconds,
+        })
+    return pd.DataFrame(rows)
+
+
+# ==================== 主程序 ====================
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("DC 仿真 - 码头容量快速筛选")
+    print("=" * 70)
+
+    target_month = 1
+    duration_days = 30
+
+    # 1. 与完整仿真交叉验证
+    validation_df = pd.concat([
+        cross_validate_with_simulation(name, target_month=target_month, duration_days=duration_days)
+        for name in ['baseline', 'shift_08_20']
+    ], ignore_index=True)
+    print("\n交叉验证（等待车辆·小时 / 最大排队）:")
+    print(validation_df[['scenario', 'slot_key', 'sim_truck_hours', 'fast_sim_input_truck_hours',
+                         'fast_screening_truck_hours', 'sim_max_queue', 'fast_sim_input_max_queue',
+                         'hours_used_equal_pct']].to_string(index=False))
+
+    # 2. 单小时容量 -1 扫描
+    base_capacity = SYSTEM_PARAMETERS['hourly_dock_capacity']
+    variants = single_hour_capacity_variants(base_capacity, delta=-1)
+    arrivals = load_dock_arrivals(target_month)
+    start = time.perf_counter()
+    sweep_df = screen_capacity_variants(SIMULATION_CONFIG['baseline'], variants, target_month=target_month,
+                                        duration_days=duration_days, arrivals=arrivals)
+    screening_seconds = time.perf_counter() - start
+
+    base_rows = sweep_df[sweep_df['variant'] == 'base'].set_index('slot_key')['truck_hours_waiting']
+    sweep_df['delta_truck_hours'] = sweep_df['truck_hours_waiting'] - sweep_df['slot_key'].map(base_rows)
+    # 每个配置只改了一个码头类型，只保留该码头类型的行
+    sweep_df = sweep_df[sweep_df['variant'].str.split('@').str[0] == sweep_df['slot_key']]
+    sweep_df = sweep_df.sort_values('delta_truck_hours', ascending=False)
+
+    sim_seconds = validation_df['sim_seconds'].mean()
+    print(f"\n扫描 {len(variants)} 组容量配置用时 {screening_seconds:.3f}s "
+          f"（完整仿真约 {sim_seconds:.2f}s/组，约快 {sim_seconds * len(variants) / max(screening_seconds, 1e-9):.0f} 倍）")
+    print("\n影响最大的10个小时容量 -1:")
+    print(sweep_df.head(10)[['variant', 'truck_hours_waiting', 'delta_truck_hours', 'max_queue', 'unserved']].to_string(index=False))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output_path = os.path.join(RESULTS_DIR, 'dock_capacity_screening.xlsx')
+    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        validation_df.to_excel(writer, sheet_name='Cross_Validation', index=False)
+        sweep_df.to_excel(writer, sheet_name='Single_Hour_Sweep', index=False)
+    print(f"\n✅ 导出完成: {output_path}")
@@ -15,7 +15,6 @@
 
 import sys
 import os
-import numpy as np
 import simpy
 
 # 确保能导入 src 模块
@@ -35,7 +34,8 @@ def run_order_tracking(
     track_category='FG',
     track_direction='Outbound',
     track_specific_ids=None,
-    seed=42
+    seed=42,
+    event_store_dir=None
 ):
     """
     运行仿真并追踪指定类型的订单。
@@ -48,13 +48,12 @@ def run_order_tracking(
         track_direction: 追踪的方向 ('Outbound' / 'Inbound' / None=全部)
         track_specific_ids: 指定追踪的订单ID列表（None=追踪所有匹配订单）
         seed: 随机种子
+        event_store_dir: 事件日志写入的磁盘目录（None=保存在内存里；追踪整年订单时建议设置）
 
     Returns:
         tracker: OrderTracker 实例
         sim: DCSimulation 实例
     """
-    np.random.seed(seed)
-
     scenario_config = SIMULATION_CONFIG[scenario_name].copy()
     print(f"\n{'='*70}")
     print(f"订单流程追踪器")
@@ -65,16 +64,17 @@ def run_order_tracking(
     print(f"{'='*70}\n")
 
     # 创建追踪器（追踪所有订单，后续再筛选）
-    tracker = OrderTracker(enabled=True, track_order_ids=track_specific_ids)
+    tracker = OrderTracker(enabled=True, track_order_ids=track_specific_ids, event_store_dir=event_store_dir)
 
     # 创建仿真环境
     env = simpy.Environment()
-    sim = DCSimulation(env, scenario_config, run_id=1, order_tracker=tracker)
+    sim = DCSimulation(env, scenario_config, run_id=1, order_tracker=tracker, seed=seed,
+                       target_month=target_month)
 
     # 运行仿真
     result = sim.run(duration_days=duration_days, target_month=target_month)
 
-    print(f"\n仿真完成！追踪到 {len(tracker.order_summary)} 个订单, {len(tracker.event_log)} 个事件")
+    print(f"\n仿真完成！追踪到 {len(tracker.order_summary)} 个订单, {tracker.event_count} 个事件")
 
     return tracker, sim, result
 
@@ -94,7 +94,7 @@ def export_tracking_results(tracker, output_path=None,
     if output_path is None:
         output_path = os.path.join(RESULTS_DIR, 'order_flow_tracking.xlsx')
 
-    if not tracker.event_log:
+    if not tracker.event_count:
         print("无事件日志可导出")
         return
 
@@ -108,9 +108,8 @@ def export_tracking_results(tracker, output_path=None,
             print(f"  Order_Summary: {len(summary_df)} 个订单")
 
         # ===== Sheet 2: 完整事件日志 =====
-        log_df = pd.DataFrame(tracker.event_log)
-        log_df.to_excel(writer, sheet_name='Event_Log', index=False)
-        print(f"  Event_Log: {len(log_df)} 个事件")
+        n_events = tracker.write_event_log(writer, sheet_name='Event_Log')
+        print(f"  Event_Log: {n_events} 个事件")
 
         # ===== Sheet 3: FG Outbound 订单筛选 =====
         if not summary_df.empty:
@@ -156,7 +155,7 @@ def export_tracking_results(tracker, output_path=None,
 
         for label, example_id in [('OnTime_Example', on_time_example), ('Delayed_Example', delayed_example)]:
             if example_id:
-                example_events = [e for e in tracker.event_log if e['order_id'] == example_id]
+                example_events = tracker.events_for(example_id)
                 if example_events:
                     ex_df = pd.DataFrame(example_events)
                     ex_df.to_excel(writer, sheet_name=label, index=False)
@@ -202,7 +201,7 @@ def print_example_order_flow(tracker, order_id=None, category='FG', direction='O
         return
 
     summary = tracker.order_summary.get(order_id, {})
-    events = [e for e in tracker.event_log if e['order_id'] == order_id]
+    events = tracker.events_for(order_id)
 
     print(f"\n{'='*80}")
     print(f"📦 Order Flow Example: {order_id}")
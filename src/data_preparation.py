@@ -4,8 +4,19 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
+import argparse
+import inspect
 import json
 import os
+import pickle
+
+import order_store
+import shipments_store
+import timeslot_store
+from order_store import write_order_store, default_store_path
+from result_cache import fingerprint, file_fingerprint
+from shipments_store import load_shipments
+from timeslot_store import load_timeslot_data, TIME_COLUMNS
 
 plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'Arial Unicode MS']
 plt.rcParams['axes.unicode_minus'] = False
@@ -15,6 +26,8 @@ DATA_DIR = PROJECT_ROOT / 'data' / 'raw'
 TIMESLOT_DIR = PROJECT_ROOT / 'data' / 'Timeslot by week'
 OUTPUT_DIR = PROJECT_ROOT / 'outputs' / 'simulation_configs'
 FIGURES_DIR = PROJECT_ROOT / 'outputs' / 'figures'
+# 各阶段的中间结果（见 run_pipeline）
+PIPELINE_DIR = OUTPUT_DIR / '.pipeline'
 
 KPI_FILE = DATA_DIR / 'KPI sheet 2025.xlsx'
 SHIPMENTS_FILE = DATA_DIR / 'Total Shipments 2025.xlsx'
@@ -24,6 +37,9 @@ FIGURES_DIR.mkdir(parents=True, exist_ok=True)
 
 FTE_DATA_FILE = DATA_DIR / 'Input FTE Data.txt'
 
+# 订单生成的根随机种子：每个 (月份, 类别, 方向) 的订单流由 [种子, 月份, 类别序号, 方向序号] 派生，互不影响
+ORDER_RANDOM_SEED = 42
+
 def extract_fte_from_file():
     """从Input FTE Data.txt提取FTE配置"""
     print("\n" + "=" * 60)
@@ -200,13 +216,10 @@ def extract_demand_distribution(target_year=2025):
     print("2. 提取需求分布参数（1-8月数据）")
     print("=" * 60)
     
-    # 读取数据
-    inbound_df = pd.read_excel(SHIPMENTS_FILE, sheet_name='Inbound Shipments 2025')
-    outbound_df = pd.read_excel(SHIPMENTS_FILE, sheet_name='Outbound Shipments 2025')
-    
-    # 转换日期
-    inbound_df['Date Hour appointement'] = pd.to_datetime(inbound_df['Date Hour appointement'])
-    outbound_df['Date Hour appointement'] = pd.to_datetime(outbound_df['Date Hour appointement'])
+    # 读取数据（日期列已转换为datetime，见 shipments_store.load_shipments）
+    shipments = load_shipments(SHIPMENTS_FILE)
+    inbound_df = shipments['Inbound']
+    outbound_df = shipments['Outbound']
     
     # 只使用1-8月数据
     inbound_df['Month'] = inbound_df['Date Hour appointement'].dt.month
@@ -421,57 +434,14 @@ def extract_dock_capacity_from_timeslot():
     print("提取码头容量数据")
     print("=" * 60)
     
-    from openpyxl import load_workbook
-    
-    # 查找所有Timeslot文件（修正路径：直接在data目录下）
-    timeslot_files = list(TIMESLOT_DIR.glob('W*.xlsx'))
-    
-    if not timeslot_files:
-        print(f"警告: 未找到Timeslot文件，路径: {TIMESLOT_DIR / 'W*.xlsx'}")
-        return None
-    
-    print(f"  找到 {len(timeslot_files)} 个周数据文件")
-    
     try:
-        # 读取并合并所有文件（参照Timeslot.py的逻辑）
-        dfs = []
-        for file in timeslot_files:
-            wb = load_workbook(file, data_only=True)
-            ws = wb.active
-            
-            data = []
-            for row in ws.iter_rows(values_only=True):
-                data.append(list(row))
-            
-            df = pd.DataFrame(data[1:], columns=data[0])
-            
-            # 标准化列数
-            if len(df.columns) == 31:
-                df.insert(7, '0h00', 0)
-            if len(df.columns) == 32:
-                df = df.iloc[:, :-1]
-            
-            # 统一列名
-            df.columns = [f'col_{i}' for i in range(len(df.columns))]
-            dfs.append(df)
-        
-        merged_df = pd.concat(dfs, ignore_index=True)
+        # 读取并合并所有周文件（并行解析，只重新解析新增/修改的文件，见 timeslot_store）
+        merged_df = load_timeslot_data(TIMESLOT_DIR)
+        if merged_df is None:
+            print(f"警告: 未找到Timeslot文件，路径: {TIMESLOT_DIR / 'W*.xlsx'}")
+            return None
         print(f"  合并后总行数: {len(merged_df)}")
         
-        # 解析日期
-        merged_df['Date_parsed'] = pd.to_datetime(merged_df.iloc[:, 1], errors='coerce', dayfirst=True)
-        
-        # 修正日期错误（YYYY-M-11 → YYYY-11-M）
-        mask = (merged_df['Date_parsed'].dt.year == 2025) & \
-               (merged_df['Date_parsed'].dt.day == 11) & \
-               (merged_df['Date_parsed'].dt.month <= 10)
-        
-        if mask.sum() > 0:
-            corrected_dates = merged_df.loc[mask, 'Date_parsed'].apply(
-                lambda x: pd.Timestamp(year=x.year, month=11, day=x.month)
-            )
-            merged_df.loc[mask, 'Date_parsed'] = corrected_dates
-        
         # 过滤2025年数据
         year_data = merged_df[merged_df['Date_parsed'].dt.year == 2025]
         
@@ -482,7 +452,7 @@ def extract_dock_capacity_from_timeslot():
         print(f"  有效数据行数: {len(year_data)}")
         
         # 时间列索引（col_7到col_30，共24列）
-        time_columns = list(range(7, 31))
+        time_columns = TIME_COLUMNS
         
         # 提取码头容量的函数（参照Timeslot.py的extract_timeslot_data）
         def extract_capacity(df, condition_type, category):
@@ -563,13 +533,10 @@ def extract_pallet_distribution():
     print("分析托盘数分布（1-8月数据）")
     print("=" * 60)
     
-    # 读取 Inbound 和 Outbound 数据（实际sheet名称）
-    inbound_df = pd.read_excel(SHIPMENTS_FILE, sheet_name='Inbound Shipments 2025')
-    outbound_df = pd.read_excel(SHIPMENTS_FILE, sheet_name='Outbound Shipments 2025')
-    
-    # 转换日期并只保留1-8月数据
-    inbound_df['Date Hour appointement'] = pd.to_datetime(inbound_df['Date Hour appointement'])
-    outbound_df['Date Hour appointement'] = pd.to_datetime(outbound_df['Date Hour appointement'])
+    # 读取 Inbound 和 Outbound 数据，只保留1-8月数据
+    shipments = load_shipments(SHIPMENTS_FILE)
+    inbound_df = shipments['Inbound']
+    outbound_df = shipments['Outbound']
     
     inbound_df['Month'] = inbound_df['Date Hour appointement'].dt.month
     outbound_df['Month'] = outbound_df['Date Hour appointement'].dt.month
@@ -691,27 +658,29 @@ def extract_monthly_totals_from_kpi():
 
 
 def generate_orders_for_month(month, category, direction, kpi_total_pallet, 
-                                shipments_df, pallet_dist, dock_capacity):
-    """为指定月份生成校准后的订单数据
+                                shipments_df, pallet_dist, dock_capacity, seed=None):
+    """为指定月份生成校准后的订单数据（整批向量化生成）
     
     Args:
         month: 月份 (1-12)
         category: 'FG' or 'R&P'
         direction: 'Inbound' or 'Outbound'
         kpi_total_pallet: KPI sheet的该月总托盘数
-        shipments_df: Total Shipments原始数据
+        shipments_df: Total Shipments原始数据（不会被修改）
         pallet_dist: 托盘分布参数
         dock_capacity: 码头容量配置
+        seed: 随机种子（int / 种子序列 / np.random.Generator），相同种子生成相同订单
     
     Returns:
         DataFrame: 订单数据
     """
+    rng = np.random.default_rng(seed)
+    
     # 1. 筛选该月、该类别的数据
-    shipments_df['Month'] = shipments_df['Date Hour appointement'].dt.month
     month_data = shipments_df[
-        (shipments_df['Month'] == month) & 
+        (shipments_df['Date Hour appointement'].dt.month == month) & 
         (shipments_df['Category'] == category)
-    ].copy()
+    ]
     
     if len(month_data) == 0:
         print(f"    警告: {category} {direction} 月{month} 无shipments数据，跳过")
@@ -731,82 +700,66 @@ def generate_orders_for_month(month, category, direction, kpi_total_pallet,
     print(f"      原始订单数={original_order_count}, 校正后={corrected_order_count}")
     print(f"      校正比例={correction_ratio:.3f}")
     
+    if corrected_order_count <= 0:
+        print(f"    警告: {category} {direction} 月{month} 校正后订单数为0，跳过")
+        return None
+    
     # 3. 生成订单
-    orders = []
+    n = corrected_order_count
     days_in_month = pd.Period(f'2025-{month:02d}').days_in_month
-    orders_per_day = corrected_order_count / days_in_month
+    orders_per_day = n / days_in_month
     
     # 从pallet分布采样
     dist_params = pallet_dist.get(category, {})
     if dist_params.get('type') == 'triangular':
-        sampled_pallets = np.random.triangular(
-            dist_params['min'], 
-            dist_params['mode'], 
-            dist_params['max'], 
-            corrected_order_count
-        )
+        sampled_pallets = rng.triangular(dist_params['min'], dist_params['mode'], dist_params['max'], n)
     else:  # normal
-        sampled_pallets = np.random.normal(
-            dist_params['mean'], 
-            dist_params['std'], 
-            corrected_order_count
-        )
+        sampled_pallets = rng.normal(dist_params['mean'], dist_params['std'], n)
     
     # 确保非负且为整数
-    sampled_pallets = np.maximum(1, sampled_pallets).astype(int)
+    sampled_pallets = np.maximum(1, sampled_pallets).astype(np.int64)
     
     # 4. 按比例调整使总和=kpi_total_pallet
     sampled_total = sampled_pallets.sum()
     scale_factor = kpi_total_pallet / sampled_total
-    adjusted_pallets = (sampled_pallets * scale_factor).astype(int)
+    adjusted_pallets = (sampled_pallets * scale_factor).astype(np.int64)
     
     # 最后一个订单补齐差额
     adjusted_pallets[-1] += int(kpi_total_pallet - adjusted_pallets.sum())
     
-    # 5. 生成订单记录
-    for i in range(corrected_order_count):
-        # 均匀分配到每天
-        day = int(i / orders_per_day) + 1
-        if day > days_in_month:
-            day = days_in_month
-        
-        order = {
-            'order_id': f'{category}_{direction}_{month:02d}_{i+1:05d}',
-            'month': month,
-            'day': day,
-            'category': category,
-            'direction': direction,
-            'pallets': int(adjusted_pallets[i])
-        }
-        
-        # Outbound特有属性
-        if direction == 'Outbound':
-            # 随机分配region (40-40-20)
-            rand = np.random.random()
-            if rand < 0.4:
-                order['region'] = 'G2_same_day'
-                # creation_time: 当日0-12h
-                order['creation_hour'] = np.random.uniform(0, 12)
-            elif rand < 0.8:
-                order['region'] = 'G2_next_day'
-                # creation_time: 前一天12-24h
-                order['creation_hour'] = np.random.uniform(12, 24) - 24  # 负数表示前一天
-            else:
-                order['region'] = 'ROW_next_day'
-                # creation_time: 前一天0h
-                order['creation_hour'] = -24  # 前一天0h
-        
-        # Inbound特有属性: 从原始数据采样timeslot小时
-        if direction == 'Inbound':
-            if len(month_data) > 0:
-                sample = month_data.sample(1).iloc[0]
-                order['timeslot_hour'] = sample['Date Hour appointement'].hour
-            else:
-                order['timeslot_hour'] = np.random.randint(6, 22)  # 默认6-21h
-        
-        orders.append(order)
+    # 5. 生成订单记录（均匀分配到每天）
+    index = np.arange(n)
+    days = np.minimum((index / orders_per_day).astype(np.int64) + 1, days_in_month)
+    
+    columns = {
+        'order_id': [f'{category}_{direction}_{month:02d}_{i:05d}' for i in range(1, n + 1)],
+        'month': np.full(n, month, dtype=np.int64),
+        'day': days,
+        'category': category,
+        'direction': direction,
+        'pallets': adjusted_pallets,
+    }
+    
+    # Outbound特有属性: 随机分配region (40-40-20)
+    #   G2_same_day : creation_time 当日0-12h
+    #   G2_next_day : creation_time 前一天12-24h（负数表示前一天）
+    #   ROW_next_day: creation_time 前一天0h
+    if direction == 'Outbound':
+        region_draw = rng.random(n)
+        hour_draw = rng.random(n)
+        same_day = region_draw < 0.4
+        next_day = ~same_day & (region_draw < 0.8)
+        columns['region'] = np.select([same_day, next_day], ['G2_same_day', 'G2_next_day'], 'ROW_next_day').astype(object)
+        columns['creation_hour'] = np.select(
+            [same_day, next_day], [hour_draw * 12, 12 + hour_draw * 12 - 24], -24.0
+        )
     
-    orders_df = pd.DataFrame(orders)
+    # Inbound特有属性: 从原始数据（有放回）采样timeslot小时
+    if direction == 'Inbound':
+        appointment_hours = month_data['Date Hour appointement'].dt.hour.to_numpy(dtype=np.int64)
+        columns['timeslot_hour'] = appointment_hours[rng.integers(0, len(appointment_hours), n)]
+    
+    orders_df = pd.DataFrame(columns)
     
     # 6. Outbound: 贪心分配timeslot
     if direction == 'Outbound':
@@ -817,9 +770,71 @@ def generate_orders_for_month(month, category, direction, kpi_total_pallet,
     return orders_df
 
 
+class _FreeSlotIndex:
+    """绝对小时上的最小值线段树：O(log H) 查询区间 [a, b] 内“有剩余容量且已用数最少”的时段。
+
+    叶子的值编码为 usage * size + hour（满的或无容量的时段为 FULL），
+    因此区间最小值同时给出最小已用数和其中最早的小时，与逐小时扫描、严格小于才替换的贪心规则一致。
+    """
+
+    def __init__(self, capacity):
+        capacity = np.asarray(capacity, dtype=np.int64)
+        size = 1
+        while size < len(capacity):
+            size *= 2
+        self.size = size
+        self.FULL = np.iinfo(np.int64).max
+        self.capacity = capacity.tolist()
+        self.usage = [0] * len(capacity)
+
+        leaves = np.full(size, self.FULL, dtype=np.int64)
+        hours = np.arange(len(capacity), dtype=np.int64)
+        leaves[:len(capacity)] = np.where(capacity > 0, hours, self.FULL)  # usage=0 -> 编码即小时
+        levels = [leaves]
+        while len(levels[-1]) > 1:
+            levels.append(levels[-1].reshape(-1, 2).min(axis=1))
+        # 堆式布局：tree[1] 为根，tree[size + h] 为小时h的叶子
+        self.tree = [self.FULL] + [v for level in reversed(levels) for v in level.tolist()]
+
+    def query(self, lo, hi):
+        """[lo, hi] 内有剩余容量、已用数最少（并列取最早）的小时；没有则返回None"""
+        lo = max(lo, 0)
+        hi = min(hi, len(self.capacity) - 1)
+        if lo > hi:
+            return None
+        tree = self.tree
+        best = self.FULL
+        lo += self.size
+        hi += self.size + 1
+        while lo < hi:
+            if lo & 1:
+                best = min(best, tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = min(best, tree[hi])
+            lo >>= 1
+            hi >>= 1
+        return None if best == self.FULL else best % self.size
+
+    def take(self, hour):
+        """占用小时 hour 的一个slot（允许超载，超载后该小时视为已满）"""
+        usage = self.usage[hour] = self.usage[hour] + 1
+        node = hour + self.size
+        tree = self.tree
+        tree[node] = usage * self.size + hour if usage < self.capacity[hour] else self.FULL
+        node >>= 1
+        while node:
+            tree[node] = min(tree[2 * node], tree[2 * node + 1])
+            node >>= 1
+
+
 def allocate_outbound_timeslots(orders_df, dock_capacity, category):
     """改进的贪心算法：优先将订单分配到搜索范围内**利用率最低**的时段
     
+    订单按creation_time依次分配；“区间内有剩余容量且已用数最少的最早时段”由 _FreeSlotIndex 线段树回答，
+    每个订单 O(log H)，结果与逐小时扫描完全相同。
+    
     Args:
         orders_df: 订单DataFrame（已有creation_hour和region）
         dock_capacity: 码头容量配置
@@ -837,94 +852,61 @@ def allocate_outbound_timeslots(orders_df, dock_capacity, category):
     # 获取容量配置
     dock_type = 'loading'
     capacity_dict = dock_capacity.get(category, {}).get(dock_type, {})
-    
-    # 每小时使用计数器 {absolute_hour: count}
-    usage_counter = {}
+    hourly_capacity = np.array([capacity_dict.get(h, capacity_dict.get(str(h), 0)) for h in range(24)], dtype=np.int64)
     
     # 预先计算 DC 的开放时段（有容量 > 0 的时段）
-    open_hours = [h for h in range(24) if capacity_dict.get(h, capacity_dict.get(str(h), 0)) > 0]
-    if not open_hours:
+    open_hours = np.flatnonzero(hourly_capacity > 0)
+    if len(open_hours) == 0:
         # 如果没有开放时段，给订单分配默认值
         orders_df['timeslot_hour'] = 12
         return orders_df
     
-    first_open_hour = min(open_hours)
-    last_open_hour = max(open_hours)
+    if len(orders_df) == 0:
+        return orders_df
     
-    for idx, row in orders_df.iterrows():
-        region = row['region']
-        creation_abs = row['creation_time_abs']
-        day = row['day']
-        
-        # 确定搜索范围（DC运营时间：基于open_hours）
-        if region == 'G2_same_day':
-            # same_day: creation + 5h 到当日的最后开放时段
-            start_abs = creation_abs + 5
-            end_abs = day * 24 + last_open_hour
-            # 确保 start_abs 不超过 end_abs
-            if start_abs > end_abs:
-                # 当天无法分配，推到次日
-                start_abs = (day + 1) * 24 + first_open_hour
-                end_abs = (day + 1) * 24 + last_open_hour
-        else:  # G2_next_day, ROW_next_day
-            # next_day: 订单在当天生成，分配到次日的开放时段
-            start_abs = (day + 1) * 24 + first_open_hour
-            end_abs = (day + 1) * 24 + last_open_hour
-        
+    first_open_hour = int(open_hours.min())
+    last_open_hour = int(open_hours.max())
+    
+    # 搜索范围（DC运营时间：基于open_hours）
+    #   same_day: creation + 5h 到当日的最后开放时段；当天无法分配时推到次日
+    #   next_day: 订单在当天生成，分配到次日的开放时段
+    day = orders_df['day'].to_numpy(dtype=np.int64)
+    creation_abs = orders_df['creation_time_abs'].to_numpy(dtype=np.float64)
+    same_day_start = creation_abs + 5
+    same_day_end = day * 24 + last_open_hour
+    same_day = (orders_df['region'].to_numpy() == 'G2_same_day') & (same_day_start <= same_day_end)
+    start_abs = np.where(same_day, same_day_start, (day + 1) * 24 + first_open_hour).astype(np.int64)
+    end_abs = np.where(same_day, same_day_end, (day + 1) * 24 + last_open_hour).astype(np.int64)
+    
+    # 绝对小时的容量（覆盖扩展搜索的未来30天）
+    horizon = int(end_abs.max()) + 30 * 24
+    index = _FreeSlotIndex(hourly_capacity[np.arange(horizon) % 24])
+    
+    slot_abs = np.empty(len(orders_df), dtype=np.int64)
+    delayed = np.zeros(len(orders_df), dtype=bool)
+    for i, (start, end) in enumerate(zip(start_abs.tolist(), end_abs.tolist())):
         # 在搜索范围内找到利用率最低的时段
-        best_abs_hour = None
-        min_usage = float('inf')
-        
-        for abs_hour in range(int(start_abs), int(end_abs) + 1):
-            hour_of_day = abs_hour % 24
-            max_capacity = capacity_dict.get(hour_of_day, capacity_dict.get(str(hour_of_day), 0))
-            current_usage = usage_counter.get(abs_hour, 0)
-            
-            # 只考虑有容量且未满的时段
-            if max_capacity > 0 and current_usage < max_capacity:
-                # 优先选择利用率最低的时段
-                if current_usage < min_usage:
-                    min_usage = current_usage
-                    best_abs_hour = abs_hour
-        
-        # 如果在范围内找到了可用时段，分配
-        if best_abs_hour is not None:
-            hour_of_day = best_abs_hour % 24
-            orders_df.at[idx, 'timeslot_hour'] = hour_of_day
-            orders_df.at[idx, 'timeslot_abs'] = best_abs_hour
-            usage_counter[best_abs_hour] = usage_counter.get(best_abs_hour, 0) + 1
-        else:
+        best_abs_hour = index.query(start, end)
+        if best_abs_hour is None:
             # 搜索范围内无法分配，扩大搜索到未来 30 天
-            for abs_hour in range(int(end_abs) + 1, int(end_abs) + 30 * 24):
-                hour_of_day = abs_hour % 24
-                max_capacity = capacity_dict.get(hour_of_day, capacity_dict.get(str(hour_of_day), 0))
-                current_usage = usage_counter.get(abs_hour, 0)
-                
-                if max_capacity > 0 and current_usage < max_capacity:
-                    if current_usage < min_usage or min_usage == float('inf'):
-                        min_usage = current_usage
-                        best_abs_hour = abs_hour
-            
-            if best_abs_hour is not None:
-                hour_of_day = best_abs_hour % 24
-                orders_df.at[idx, 'timeslot_hour'] = hour_of_day
-                orders_df.at[idx, 'timeslot_abs'] = best_abs_hour
-                orders_df.at[idx, 'delayed'] = True
-                usage_counter[best_abs_hour] = usage_counter.get(best_abs_hour, 0) + 1
-            else:
-                # 最坏情况：无法找到任何可用时段，分配给最利用率最低的时段（可能超载）
-                min_usage_abs = min(
-                    (usage_counter.get(abs_hour, 0), abs_hour)
-                    for abs_hour in range(int(end_abs), int(end_abs) + 24)
-                    if capacity_dict.get(abs_hour % 24, capacity_dict.get(str(abs_hour % 24), 0)) > 0
-                )
-                if min_usage_abs:
-                    best_abs_hour = min_usage_abs[1]
-                    hour_of_day = best_abs_hour % 24
-                    orders_df.at[idx, 'timeslot_hour'] = hour_of_day
-                    orders_df.at[idx, 'timeslot_abs'] = best_abs_hour
-                    orders_df.at[idx, 'delayed'] = True
-                    usage_counter[best_abs_hour] = usage_counter.get(best_abs_hour, 0) + 1
+            delayed[i] = True
+            best_abs_hour = index.query(end + 1, end + 30 * 24 - 1)
+        if best_abs_hour is None:
+            # 最坏情况：无法找到任何可用时段，分配给 [end, end+23] 中利用率最低的开放时段（可能超载）
+            best_abs_hour = min(
+                (index.usage[abs_hour], abs_hour)
+                for abs_hour in range(end, end + 24)
+                if hourly_capacity[abs_hour % 24] > 0
+            )[1]
+        slot_abs[i] = best_abs_hour
+        index.take(best_abs_hour)
+    
+    orders_df['timeslot_hour'] = (slot_abs % 24).astype(np.float64)
+    orders_df['timeslot_abs'] = slot_abs.astype(np.float64)
+    if delayed.any():
+        delayed_col = np.full(len(orders_df), np.nan, dtype=object)
+        delayed_col[delayed] = True
+        orders_df['delayed'] = delayed_col
     
     return orders_df
 
@@ -999,7 +981,8 @@ def generate_simulation_config(efficiency_params, demand_distribution,
                                 production_rates,
                                 dock_capacity=None, pallet_distribution=None, 
                                 fte_data=None, fte_config=None,
-                                monthly_totals=None, orders_file_path=None):
+                                monthly_totals=None, orders_file_path=None,
+                                orders_store_path=None):
     """生成完整的仿真配置文件"""
     print("\n" + "=" * 60)
     print("生成仿真配置文件")
@@ -1069,6 +1052,9 @@ def generate_simulation_config(efficiency_params, demand_distribution,
     if orders_file_path is not None:
         config['generated_orders_path'] = str(orders_file_path)
         print(f"已包含订单数据路径: {orders_file_path.name}")
+    if orders_store_path is not None:
+        config['generated_orders_store_path'] = str(orders_store_path)
+        print(f"已包含订单列式存储路径: {Path(orders_store_path).name}")
     
     # 添加KPI月度总量（新增）
     if monthly_totals is not None:
@@ -1153,121 +1139,297 @@ def generate_simulation_config(efficiency_params, demand_distribution,
     return config
 
 
-def main():
-    """主函数 - 执行所有数据提取步骤"""
+# ==================== 分阶段流水线 ====================
+#
+# 每个阶段的结果持久化为 PIPELINE_DIR/<阶段>.pkl，并记录阶段key的组成：
+#   输入文件的 (路径, 大小, mtime)、阶段代码（源码hash）、参数、上游阶段的key。
+# 重新运行时，只有 key 组成变化、没有持久化结果、输出文件缺失、被 --force 指定，
+# 或者上游阶段需要重建的阶段才会执行，其余阶段直接读取持久化结果。
+
+def _stage_orders(results):
+    """生成1-8月全部订单，写出 generated_orders.json 和列式存储。
+
+    Returns:
+        (JSON路径, 列式存储路径)；缺少必要数据或未生成任何订单时为 (None, None)
+    """
+    monthly_totals = results['monthly_totals']
+    pallet_distribution = results['pallets']
+    dock_capacity = results['dock_capacity']
+    
     print("\n" + "="*70)
-    print("DC 仿真数据准备脚本 - 完整版（含订单生成）")
-    print("从现有数据中提取仿真所需的全部参数 + 生成订单数据")
+    print("订单生成")
     print("="*70)
     
+    if not (monthly_totals and pallet_distribution and dock_capacity):
+        print("\n警告: 跳过订单生成（缺少必要数据）")
+        return None, None
+    
+    shipments = load_shipments(SHIPMENTS_FILE)
+    inbound_shipments = shipments['Inbound']
+    outbound_shipments = shipments['Outbound']
+    
+    inbound_shipments['Month'] = inbound_shipments['Date Hour appointement'].dt.month
+    outbound_shipments['Month'] = outbound_shipments['Date Hour appointement'].dt.month
+    inbound_shipments = inbound_shipments[inbound_shipments['Month'] <= 8].copy()
+    outbound_shipments = outbound_shipments[outbound_shipments['Month'] <= 8].copy()
+    print(f"\nShipments已过滤至1-8月: Inbound {len(inbound_shipments):,}, Outbound {len(outbound_shipments):,}")
+    
+    all_orders = {}
+    print("\n生成订单数据:")
+    for category_index, category in enumerate(['FG', 'R&P']):
+        for direction_index, direction in enumerate(['Inbound', 'Outbound']):
+            shipments_df = inbound_shipments if direction == 'Inbound' else outbound_shipments
+            for month in range(1, 9):
+                kpi_total = monthly_totals[category][direction].get(month)
+                if kpi_total is None or kpi_total == 0:
+                    continue
+                
+                try:
+                    orders_df = generate_orders_for_month(
+                        month, category, direction, kpi_total,
+                        shipments_df, pallet_distribution, dock_capacity,
+                        seed=[ORDER_RANDOM_SEED, month, category_index, direction_index]
+                    )
+                    
+                    if orders_df is not None and len(orders_df) > 0:
+                        key = f"{category}_{direction}_M{month:02d}"
+                        all_orders[key] = orders_df
+                except Exception as e:
+                    print(f"    错误: 生成订单失败 - {e}")
+    
+    if not all_orders:
+        print("\n警告: 未能生成任何订单数据")
+        return None, None
+    
+    orders_output_path = OUTPUT_DIR / 'generated_orders.json'
+    
+    # 转换为可序列化格式
+    orders_serializable = {}
+    for key, df in all_orders.items():
+        orders_serializable[key] = df.to_dict(orient='records')
+    
+    # JSON仅作为回退格式保留（不缩进，写入/读取更快、体积更小）
+    with open(orders_output_path, 'w', encoding='utf-8') as f:
+        json.dump(orders_serializable, f, ensure_ascii=False)
+    
+    # 按月分区的列式存储（仿真优先读取，可只内存映射单个月份）
+    orders_store_path = Path(default_store_path(orders_output_path))
+    write_order_store(all_orders, orders_store_path)
+    
+    print(f"\n✓ 订单数据已保存: {orders_output_path}")
+    print(f"✓ 订单列式存储已保存: {orders_store_path}")
+    print(f"  总计生成 {len(all_orders)} 个月度订单文件")
+    print(f"  总订单数: {sum(len(df) for df in all_orders.values()):,}")
+    print(f"  总托盘数: {sum(df['pallets'].sum() for df in all_orders.values()):,.0f}")
+    return orders_output_path, orders_store_path
+
+
+def _stage_config(results):
+    """写出 simulation_config.json 和 simulation_parameters.xlsx（包含所有数据）"""
+    orders_output_path, orders_store_path = results['orders']
+    return generate_simulation_config(
+        results['efficiency'],
+        results['demand'],
+        results['production'],
+        dock_capacity=results['dock_capacity'],
+        pallet_distribution=results['pallets'],
+        fte_data=results['fte_kpi'],
+        fte_config=results['fte_config'],
+        monthly_totals=results['monthly_totals'],
+        orders_file_path=orders_output_path,
+        orders_store_path=orders_store_path
+    )
+
+
+# 阶段按执行顺序排列：
+#   inputs  : 输入文件（目录表示其中的全部文件）
+#   deps    : 上游阶段
+#   code    : 参与代码指纹的函数/类/模块
+#   params  : 其他影响结果的参数
+#   outputs : 由结果得到输出文件列表（缺失时重建）
+#   on_error: 设置时该阶段失败只打印警告、结果为None（不持久化，下次重试）；否则中止流水线
+PIPELINE_STAGES = [
+    {'name': 'fte_config', 'run': lambda r: extract_fte_from_file(),
+     'inputs': [FTE_DATA_FILE], 'code': [extract_fte_from_file]},
+    {'name': 'efficiency', 'run': lambda r: extract_efficiency_parameters(),
+     'inputs': [KPI_FILE], 'code': [extract_efficiency_parameters]},
+    {'name': 'demand', 'run': lambda r: extract_demand_distribution(target_year=2025),
+     'inputs': [SHIPMENTS_FILE], 'code': [extract_demand_distribution, shipments_store],
+     'params': {'target_year': 2025}},
+    {'name': 'production', 'run': lambda r: calculate_factory_production_rate(r['demand']['daily_demand']),
+     'deps': ['demand'], 'code': [calculate_factory_production_rate]},
+    {'name': 'dock_capacity', 'run': lambda r: extract_dock_capacity_from_timeslot(),
+     'inputs': [TIMESLOT_DIR], 'code': [extract_dock_capacity_from_timeslot, timeslot_store],
+     'on_error': '提取码头容量失败'},
+    {'name': 'pallets', 'run': lambda r: extract_pallet_distribution(),
+     'inputs': [SHIPMENTS_FILE], 'code': [extract_pallet_distribution, shipments_store],
+     'on_error': '分析托盘数分布失败'},
+    {'name': 'fte_kpi', 'run': lambda r: None if r['fte_config'] else extract_fte_from_kpi(),
+     'inputs': [KPI_FILE], 'deps': ['fte_config'], 'code': [extract_fte_from_kpi],
+     'on_error': '提取人力资源数据失败'},
+    {'name': 'monthly_totals', 'run': lambda r: extract_monthly_totals_from_kpi(),
+     'inputs': [KPI_FILE], 'code': [extract_monthly_totals_from_kpi],
+     'on_error': '无法提取KPI月度总量'},
+    {'name': 'orders', 'run': _stage_orders,
+     'inputs': [SHIPMENTS_FILE], 'deps': ['monthly_totals', 'pallets', 'dock_capacity'],
+     'code': [_stage_orders, generate_orders_for_month, allocate_outbound_timeslots, _FreeSlotIndex,
+              order_store, shipments_store],
+     'params': {'seed': ORDER_RANDOM_SEED},
+     'outputs': lambda value: [path for path in value if path is not None]},
+    {'name': 'config', 'run': _stage_config,
+     'deps': ['fte_config', 'efficiency', 'demand', 'production', 'dock_capacity', 'pallets', 'fte_kpi',
+              'monthly_totals', 'orders'],
+     'code': [_stage_config, generate_simulation_config],
+     'outputs': lambda value: [OUTPUT_DIR / 'simulation_config.json', OUTPUT_DIR / 'simulation_parameters.xlsx']},
+]
+PIPELINE_STAGE_NAMES = [stage['name'] for stage in PIPELINE_STAGES]
+
+
+def _input_fingerprints(paths):
+    """{输入文件路径: [路径, 大小, mtime_ns] 或 None（不存在）}；目录展开为其中的全部文件"""
+    result = {}
+    for path in paths:
+        path = Path(path)
+        files = sorted(p for p in path.iterdir() if p.is_file()) if path.is_dir() else [path]
+        for file in files:
+            result[str(file)] = file_fingerprint(str(file))
+    return result
+
+
+def _stage_components(stage, keys):
+    """阶段key的组成部分及key本身"""
+    components = {
+        'inputs': _input_fingerprints(stage.get('inputs', [])),
+        'deps': {dep: keys[dep] for dep in stage.get('deps', [])},
+        'code': fingerprint(*[inspect.getsource(obj) for obj in stage.get('code', [])]),
+        'params': stage.get('params', {}),
+    }
+    return fingerprint(components), components
+
+
+def _artefact_path(name):
+    return PIPELINE_DIR / f'{name}.pkl'
+
+
+def _load_artefact(name):
     try:
-        # 0. 提取FTE配置（从Input FTE Data.txt） - 优先！
-        fte_config = extract_fte_from_file()
-        
-        # 1. 提取效率参数（基于11个月数据）
-        efficiency_params = extract_efficiency_parameters()
-        demand_distribution = extract_demand_distribution(target_year=2025)
-        production_rates = calculate_factory_production_rate(demand_distribution['daily_demand'])
-        
-        dock_capacity = None
-        try:
-            dock_capacity = extract_dock_capacity_from_timeslot()
-        except Exception as e:
-            print(f"警告: 提取码头容量失败: {e}")
-        
-        pallet_distribution = None
-        try:
-            pallet_distribution = extract_pallet_distribution()
-        except Exception as e:
-            print(f"警告: 分析托盘数分布失败: {e}")
-        
-        fte_data = None
-        if not fte_config:
-            try:
-                fte_data = extract_fte_from_kpi()
-            except Exception as e:
-                print(f"警告: 提取人力资源数据失败: {e}")
-        
-        print("\n" + "="*70)
-        print("订单生成")
-        print("="*70)
-        
-        monthly_totals = None
+        with open(_artefact_path(name), 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, ImportError, AttributeError):
+        # 文件缺失/损坏，或由不兼容的 pandas/numpy 版本写入：按未缓存处理，重新计算该阶段
+        return None
+
+
+def _save_artefact(name, key, components, value):
+    PIPELINE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = _artefact_path(name).with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({'key': key, 'components': components, 'value': value}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, _artefact_path(name))
+
+
+def plan_pipeline(force=()):
+    """计算每个阶段是否需要重建（不执行任何阶段）。
+
+    Args:
+        force: 强制重建的阶段名（'all' 表示全部）
+
+    Returns:
+        [(stage, key, components, artefact, reasons)]，reasons 为空表示可以直接使用持久化结果
+    """
+    force = set(force)
+    keys = {}
+    rebuilt = set()
+    plan = []
+    for stage in PIPELINE_STAGES:
+        name = stage['name']
+        key, components = _stage_components(stage, keys)
+        keys[name] = key
+        artefact = _load_artefact(name)
+
+        reasons = []
+        if name in force or 'all' in force:
+            reasons.append('--force')
+        if artefact is None:
+            reasons.append('无持久化结果')
+        elif artefact['key'] != key:
+            old = artefact['components']
+            changed = sorted(os.path.basename(path) for path in set(old['inputs']) | set(components['inputs'])
+                             if old['inputs'].get(path) != components['inputs'].get(path))
+            if changed:
+                reasons.append('输入变化: ' + ', '.join(changed[:5]) + (f' 等{len(changed)}个' if len(changed) > 5 else ''))
+            if old['code'] != components['code']:
+                reasons.append('代码变化')
+            if old['params'] != components['params']:
+                reasons.append('参数变化')
+        if artefact is not None and 'outputs' in stage:
+            missing = [Path(path).name for path in stage['outputs'](artefact['value']) if not Path(path).exists()]
+            if missing:
+                reasons.append('输出缺失: ' + ', '.join(missing))
+        upstream = [dep for dep in stage.get('deps', []) if dep in rebuilt]
+        if upstream:
+            reasons.append('上游重建: ' + ', '.join(upstream))
+
+        if reasons:
+            rebuilt.add(name)
+        plan.append((stage, key, components, artefact, reasons))
+    return plan
+
+
+def print_pipeline_plan(plan):
+    print("\n数据准备流水线:")
+    for stage, _key, _components, _artefact, reasons in plan:
+        print(f"  {stage['name']:<15s} " + (f"重建  {'; '.join(reasons)}" if reasons else '最新'))
+
+
+def run_pipeline(force=(), dry_run=False):
+    """按阶段执行数据准备，只重建需要重建的阶段。
+
+    Returns:
+        {阶段名: 结果}；dry_run=True 时只打印计划并返回None
+    """
+    plan = plan_pipeline(force)
+    print_pipeline_plan(plan)
+    if dry_run:
+        return None
+
+    results = {}
+    for stage, key, components, artefact, reasons in plan:
+        name = stage['name']
+        if not reasons:
+            results[name] = artefact['value']
+            continue
         try:
-            monthly_totals = extract_monthly_totals_from_kpi()
+            value = stage['run'](results)
         except Exception as e:
-            print(f"错误: 无法提取KPI月度总量: {e}")
-        
-        inbound_shipments = pd.read_excel(SHIPMENTS_FILE, sheet_name='Inbound Shipments 2025')
-        outbound_shipments = pd.read_excel(SHIPMENTS_FILE, sheet_name='Outbound Shipments 2025')
-        inbound_shipments['Date Hour appointement'] = pd.to_datetime(inbound_shipments['Date Hour appointement'])
-        outbound_shipments['Date Hour appointement'] = pd.to_datetime(outbound_shipments['Date Hour appointement'])
-        
-        inbound_shipments['Month'] = inbound_shipments['Date Hour appointement'].dt.month
-        outbound_shipments['Month'] = outbound_shipments['Date Hour appointement'].dt.month
-        inbound_shipments = inbound_shipments[inbound_shipments['Month'] <= 8].copy()
-        outbound_shipments = outbound_shipments[outbound_shipments['Month'] <= 8].copy()
-        print(f"\nShipments已过滤至1-8月: Inbound {len(inbound_shipments):,}, Outbound {len(outbound_shipments):,}")
-        
-        all_orders = {}
-        if monthly_totals and pallet_distribution and dock_capacity:
-            print("\n生成订单数据:")
-            for category in ['FG', 'R&P']:
-                for direction in ['Inbound', 'Outbound']:
-                    shipments_df = inbound_shipments if direction == 'Inbound' else outbound_shipments
-                    for month in range(1, 9):
-                        kpi_total = monthly_totals[category][direction].get(month)
-                        if kpi_total is None or kpi_total == 0:
-                            continue
-                        
-                        try:
-                            orders_df = generate_orders_for_month(
-                                month, category, direction, kpi_total,
-                                shipments_df, pallet_distribution, dock_capacity
-                            )
-                            
-                            if orders_df is not None and len(orders_df) > 0:
-                                key = f"{category}_{direction}_M{month:02d}"
-                                all_orders[key] = orders_df
-                        except Exception as e:
-                            print(f"    错误: 生成订单失败 - {e}")
-            
-            if all_orders:
-                orders_output_path = OUTPUT_DIR / 'generated_orders.json'
-                
-                # 转换为可序列化格式
-                orders_serializable = {}
-                for key, df in all_orders.items():
-                    orders_serializable[key] = df.to_dict(orient='records')
-                
-                with open(orders_output_path, 'w', encoding='utf-8') as f:
-                    json.dump(orders_serializable, f, indent=2, ensure_ascii=False)
-                
-                print(f"\n✓ 订单数据已保存: {orders_output_path}")
-                print(f"  总计生成 {len(all_orders)} 个月度订单文件")
-                print(f"  总订单数: {sum(len(df) for df in all_orders.values()):,}")
-                print(f"  总托盘数: {sum(df['pallets'].sum() for df in all_orders.values()):,.0f}")
-            else:
-                orders_output_path = None
-                print("\n警告: 未能生成任何订单数据")
-        else:
-            orders_output_path = None
-            print("\n警告: 跳过订单生成（缺少必要数据）")
-        
-        # ===== 结束订单生成流程 =====
+            if 'on_error' not in stage:
+                raise
+            print(f"警告: {stage['on_error']}: {e}")
+            _artefact_path(name).unlink(missing_ok=True)
+            results[name] = None
+            continue
+        _save_artefact(name, key, components, value)
+        results[name] = value
+    return results
+
+
+def main(force=(), dry_run=False):
+    """主函数 - 执行所有数据提取步骤（只重建输入变化的阶段，见 run_pipeline）"""
+    print("\n" + "="*70)
+    print("DC 仿真数据准备脚本 - 完整版（含订单生成）")
+    print("从现有数据中提取仿真所需的全部参数 + 生成订单数据")
+    print("="*70)
+    
+    try:
+        results = run_pipeline(force=force, dry_run=dry_run)
+        if results is None:
+            return None
         
-        # 13. 生成配置文件（包含所有数据）
-        config = generate_simulation_config(
-            efficiency_params,
-            demand_distribution,
-            production_rates,
-            dock_capacity=dock_capacity,
-            pallet_distribution=pallet_distribution,
-            fte_data=fte_data,
-            fte_config=fte_config,
-            monthly_totals=monthly_totals,
-            orders_file_path=orders_output_path if 'orders_output_path' in locals() else None
-        )
+        config = results['config']
+        dock_capacity = results['dock_capacity']
+        pallet_distribution = results['pallets']
+        fte_config = results['fte_config']
+        fte_data = results['fte_kpi']
         
         # 打印汇总
         print("\n" + "="*70)
@@ -1334,4 +1496,10 @@ def main():
 
 
 if __name__ == '__main__':
-    config = main()
+    parser = argparse.ArgumentParser(description='DC仿真数据准备（分阶段执行，只重建输入变化的阶段）')
+    parser.add_argument('--force', action='append', default=[], metavar='STAGE',
+                        choices=PIPELINE_STAGE_NAMES + ['all'],
+                        help=f"强制重建的阶段（及其下游），可重复；'all' 为全部。阶段: {', '.join(PIPELINE_STAGE_NAMES)}")
+    parser.add_argument('--dry-run', action='store_true', help='只报告哪些阶段会重建及原因，不执行')
+    args = parser.parse_args()
+    config = main(force=args.force, dry_run=args.dry_run)
@@ -7,11 +7,25 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 import json
 import os
 import re
 import math
+import bisect
+import operator
+import heapq
+import io
+import zlib
+import hashlib
+import argparse
+import string
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
+import order_store
+import event_store
+import result_cache
 
 plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'Arial Unicode MS']
 plt.rcParams['axes.unicode_minus'] = False
@@ -21,12 +35,26 @@ RESULTS_DIR = os.path.join(PROJECT_ROOT, 'outputs', 'results')
 FIGURES_DIR = os.path.join(PROJECT_ROOT, 'outputs', 'figures')
 
 # Cache for large generated_orders.json to avoid repeated IO during multi-scenario / multi-month runs
+# _CACHED_ORDERS_PATH: (resolved path, mtime) of the parsed JSON file / columnar store manifest
+# _CACHED_ORDERS_DATA: {group key (e.g. 'FG_Outbound_M01'): tuple of immutable OrderRecord}
 _CACHED_ORDERS_PATH = None
 _CACHED_ORDERS_DATA = None
+# 列式存储按月懒加载：已加载的月份集合（None=JSON整文件已全部加载）
+_CACHED_ORDERS_MONTHS = None
 
 os.makedirs(RESULTS_DIR, exist_ok=True)
 os.makedirs(FIGURES_DIR, exist_ok=True)
 
+# 仿真结果磁盘缓存（按输入内容寻址，见 _replication_cache_key）；None=不使用缓存（--no-cache）
+RESULT_CACHE_DIR = os.path.join(PROJECT_ROOT, 'outputs', 'result_cache')
+RESULT_CACHE = result_cache.ResultCache(RESULT_CACHE_DIR)
+# 参与“代码版本”指纹的源文件：改动其中任何一个都会让旧缓存全部失效
+_RESULT_CACHE_SOURCES = (os.path.abspath(__file__), order_store.__file__, event_store.__file__)
+_RESULT_CACHE_CODE_VERSION = None
+
+# 默认根随机种子：每次仿真的随机流由 (root seed, scenario_key, run_id, 目标月份) 派生，见 make_simulation_rng
+DEFAULT_RANDOM_SEED = 42
+
 def load_simulation_config(config_path='outputs/simulation_configs/simulation_config.json'):
     """加载仿真配置文件，不存在则使用默认参数"""
     config_file = os.path.join(PROJECT_ROOT, config_path)
@@ -229,6 +257,122 @@ def _is_dc_open_at_time(time_abs: float, dc_config: dict) -> bool:
             return True
     return False
 
+
+class OpenCalendar:
+    """预编译的开门日历：把 _compute_daily_open_windows 展开成绝对时间上的有序开/关门边界。
+
+    每个开门窗口 [starts[i], ends[i]) 对应某一天的一个 (open_hour, close_hour) 窗口；
+    相邻两天首尾相接的窗口不合并，以保持与逐日计算完全相同的语义（例如 time_until_close 到当天24点为止）。
+    查询全部是二分查找；查询时间超出已编译范围时自动向后扩展，负时间回退到逐日计算。
+    """
+
+    def __init__(self, dc_config: dict, horizon_days: int = 120):
+        self.dc_config = dc_config
+        self.horizon_days = 0
+        self.starts = []
+        self.ends = []
+        # cum_open[i] = 前 i 个窗口的开门总时长（用于 open_overlap）
+        self.cum_open = [0.0]
+        self._extend(max(1, int(horizon_days)))
+
+    def _extend(self, horizon_days: int):
+        for day_index in range(self.horizon_days, horizon_days):
+            day_start = day_index * 24
+            for a, b in _compute_daily_open_windows(self.dc_config, day_index):
+                self.starts.append(day_start + a)
+                self.ends.append(day_start + b)
+                self.cum_open.append(self.cum_open[-1] + (b - a))
+        self.horizon_days = horizon_days
+
+    def _covers(self, t) -> bool:
+        """确保 t 落在已编译范围内（t<0 返回False，由调用方回退）。"""
+        if t < 0:
+            return False
+        # 多留60天，保证 next_open 在范围内找得到下一个窗口
+        needed = int(t) // 24 + 61
+        if needed > self.horizon_days:
+            self._extend(max(needed, self.horizon_days * 2))
+        return True
+
+    def _window_index(self, t) -> int:
+        """返回开始时间 <= t 的最后一个窗口下标（没有则为-1）。"""
+        return bisect.bisect_right(self.starts, t) - 1
+
+    def is_open(self, t) -> bool:
+        if t is None:
+            return False
+        if not self._covers(t):
+            return _is_dc_open_at_time(t, self.dc_config)
+        i = self._window_index(t)
+        return i >= 0 and t < self.ends[i]
+
+    def next_open(self, t) -> float:
+        """下一个开门时刻（若当前开门则返回 t 本身；60天内找不到则返回 t）。"""
+        if not self._covers(t):
+            return float(t)
+        i = self._window_index(t)
+        if i >= 0 and t < self.ends[i]:
+            return float(t)
+        j = i + 1
+        if j < len(self.starts) and self.starts[j] < (int(t) // 24 + 60) * 24:
+            return float(self.starts[j])
+        return float(t)
+
+    def time_until_close(self, t) -> float:
+        """距离当前窗口关门还有多少小时（若已关门则返回0）。"""
+        if not self._covers(t):
+            return 0.0
+        i = self._window_index(t)
+        if i >= 0 and t < self.ends[i]:
+            return max(0.0, float(self.ends[i]) - float(t))
+        return 0.0
+
+    def _open_before(self, t) -> float:
+        """[0, t) 内的开门总时长。"""
+        i = self._window_index(t)
+        if i < 0:
+            return 0.0
+        return self.cum_open[i] + min(max(t - self.starts[i], 0.0), self.ends[i] - self.starts[i])
+
+    def open_overlap(self, a, b) -> float:
+        """[a, b) 与开门窗口重叠的总时长。"""
+        if b <= a:
+            return 0.0
+        if not self._covers(a) or not self._covers(b):
+            total = 0.0
+            for day_index in range(int(a) // 24, int(b) // 24 + 1):
+                for wa, wb in _compute_daily_open_windows(self.dc_config, day_index):
+                    lo = max(a, day_index * 24 + wa)
+                    hi = min(b, day_index * 24 + wb)
+                    if hi > lo:
+                        total += hi - lo
+            return total
+        return self._open_before(b) - self._open_before(a)
+
+
+_OPEN_CALENDAR_CACHE = {}
+
+
+def _open_calendar_fingerprint(dc_config: dict) -> str:
+    """只包含影响开门窗口的字段，用作日历缓存key。"""
+    relevant = {
+        k: dc_config.get(k)
+        for k in ('dc_open_time', 'dc_close_time', 'day1_weekday', 'shift_cancel_rules', 'biweekly_shift_cancel')
+    }
+    return json.dumps(relevant, sort_keys=True, default=str)
+
+
+def get_open_calendar(dc_config: dict, horizon_days: int = 120) -> OpenCalendar:
+    """按场景配置获取（并缓存）编译好的开门日历；同一配置在进程内只编译一次。"""
+    key = _open_calendar_fingerprint(dc_config)
+    calendar = _OPEN_CALENDAR_CACHE.get(key)
+    if calendar is None:
+        calendar = OpenCalendar(dc_config, horizon_days=horizon_days)
+        _OPEN_CALENDAR_CACHE[key] = calendar
+    elif calendar.horizon_days < horizon_days:
+        calendar._extend(horizon_days)
+    return calendar
+
 if LOADED_CONFIG:
     SYSTEM_PARAMETERS = {
         'efficiency': LOADED_CONFIG['efficiency'],
@@ -294,10 +438,18 @@ if LOADED_CONFIG:
     # 加载订单数据和opening hour coefficient
     if 'generated_orders_path' in LOADED_CONFIG:
         SYSTEM_PARAMETERS['generated_orders_path'] = LOADED_CONFIG['generated_orders_path']
+    if 'generated_orders_store_path' in LOADED_CONFIG:
+        SYSTEM_PARAMETERS['generated_orders_store_path'] = LOADED_CONFIG['generated_orders_store_path']
     if 'opening_hour_coefficient' in LOADED_CONFIG:
         SYSTEM_PARAMETERS['opening_hour_coefficient'] = LOADED_CONFIG['opening_hour_coefficient']
     else:
         SYSTEM_PARAMETERS['opening_hour_coefficient'] = 1.0
+    # 人力模型：'independent'（默认，每个订单独立使用整队产能）/ 'shared'（共享人力池）
+    if 'labour_model' in LOADED_CONFIG:
+        SYSTEM_PARAMETERS['labour_model'] = LOADED_CONFIG['labour_model']
+    # KPI模式：'detail'（默认，保留逐条记录，可导出明细）/ 'summary'（只保留在线汇总统计，适合长时长仿真）
+    if 'kpi_mode' in LOADED_CONFIG:
+        SYSTEM_PARAMETERS['kpi_mode'] = LOADED_CONFIG['kpi_mode']
 
 else:
     # 使用硬编码默认参数
@@ -409,59 +561,362 @@ else:
         }
     }
 
+# 订单的不可变部分（解析后在进程内缓存、所有仿真共享）；creation_time/timeslot_time 已预先算好
+OrderRecord = namedtuple('OrderRecord', [
+    'order_id', 'month', 'day', 'category', 'direction', 'pallets',
+    'region', 'creation_hour', 'creation_time_abs', 'timeslot_hour', 'timeslot_abs',
+    'creation_time', 'timeslot_time',
+])
+
+
+def _make_order_record(order_id, month, day, category, direction, pallets,
+                       region=None, creation_hour=None, creation_time_abs=None,
+                       timeslot_hour=None, timeslot_abs=None):
+    """构造 OrderRecord（并计算绝对仿真时间）。"""
+    # 仿真从 day=1 的 00:00 开始 -> time=0
+    base_time = (day - 1) * 24
+
+    creation_time = None
+    if direction == 'Outbound':
+        # creation_hour可能是负数（表示前一天），例如：day=2, creation_hour=-24 → 第1天0点
+        creation_time = base_time + creation_hour
+    else:
+        region = None
+        creation_hour = None
+        creation_time_abs = None
+
+    timeslot_time = base_time + timeslot_hour if timeslot_hour is not None else None
+
+    return OrderRecord(
+        order_id=order_id,
+        month=month,
+        day=day,
+        category=category,
+        direction=direction,
+        pallets=pallets,
+        region=region,
+        creation_hour=creation_hour,
+        creation_time_abs=creation_time_abs,
+        timeslot_hour=timeslot_hour,
+        timeslot_abs=timeslot_abs,
+        creation_time=creation_time,
+        timeslot_time=timeslot_time,
+    )
+
+
+def _order_record_from_dict(order_data):
+    """把generated_orders.json里的一条订单记录转换为 OrderRecord。"""
+    return _make_order_record(
+        order_data['order_id'], order_data['month'], order_data['day'],
+        order_data['category'], order_data['direction'], order_data['pallets'],
+        region=order_data.get('region'),
+        creation_hour=order_data.get('creation_hour'),
+        creation_time_abs=order_data.get('creation_time_abs'),
+        timeslot_hour=order_data.get('timeslot_hour'),
+        timeslot_abs=order_data.get('timeslot_abs'),
+    )
+
+
+def _order_records_from_columns(columns, start, stop):
+    """把列式存储中 [start, stop) 行转换为 OrderRecord 元组（NaN → None）。"""
+    def _col(name):
+        values = columns[name][start:stop]
+        return values if isinstance(values, list) else values.tolist()
+
+    def _nullable(values):
+        return [None if v != v else v for v in values]
+
+    return tuple(
+        _make_order_record(*row[:6], region=row[6], creation_hour=row[7], creation_time_abs=row[8],
+                           timeslot_hour=row[9], timeslot_abs=row[10])
+        for row in zip(
+            _col('order_id'), _col('month'), _col('day'), _col('category'), _col('direction'), _col('pallets'),
+            _col('region'), _nullable(_col('creation_hour')), _nullable(_col('creation_time_abs')),
+            _nullable(_col('timeslot_hour')), _nullable(_col('timeslot_abs')),
+        )
+    )
+
+
+def _resolve_orders_path(orders_path=None):
+    """解析订单文件路径（相对路径相对于项目根目录）。"""
+    if orders_path is None:
+        orders_path = SYSTEM_PARAMETERS.get('generated_orders_path')
+    if not orders_path:
+        return None
+    if not os.path.isabs(orders_path):
+        orders_path = os.path.join(PROJECT_ROOT, orders_path)
+    return os.path.normpath(orders_path)
+
+
+def _resolve_orders_store_path(orders_path=None):
+    """解析列式订单存储目录：优先使用配置里的 generated_orders_store_path，否则取JSON文件旁的默认目录。"""
+    if orders_path is None and SYSTEM_PARAMETERS.get('generated_orders_store_path'):
+        return _resolve_orders_path(SYSTEM_PARAMETERS['generated_orders_store_path'])
+    json_path = _resolve_orders_path(orders_path)
+    if json_path is None:
+        return None
+    return order_store.default_store_path(json_path)
+
+
+def load_order_table(orders_path=None, months=None):
+    """读取预生成订单，返回 {分组key: tuple(OrderRecord, ...)}。
+
+    - 优先读取按月分区的列式存储（order_store，内存映射），只读取 months 指定的月份；
+    - 找不到列式存储时回退到 generated_orders.json（整文件解析一次）。
+
+    结果按 (路径, mtime) 缓存在进程内（_CACHED_ORDERS_PATH / _CACHED_ORDERS_DATA），
+    同一进程里的所有场景、replication、月份只解析一次；文件被重新生成后自动重新加载。
+    返回的表是只读的，每次仿真为自己的可变状态建一张 OrderTable。
+
+    Args:
+        months: 需要的月份列表（None=全部月份）
+    """
+    global _CACHED_ORDERS_PATH, _CACHED_ORDERS_DATA, _CACHED_ORDERS_MONTHS
+
+    wanted = None if months is None else {int(m) for m in months}
+
+    store_dir = _resolve_orders_store_path(orders_path)
+    manifest = order_store.read_manifest(store_dir) if store_dir else None
+
+    if manifest is not None:
+        cache_key = (store_dir, os.path.getmtime(os.path.join(store_dir, order_store.MANIFEST_NAME)))
+        if _CACHED_ORDERS_PATH != cache_key or _CACHED_ORDERS_DATA is None:
+            _CACHED_ORDERS_PATH = cache_key
+            _CACHED_ORDERS_DATA = {}
+            _CACHED_ORDERS_MONTHS = set()
+
+        to_load = set(order_store.available_months(manifest)) if wanted is None else wanted
+        for month in sorted(to_load - _CACHED_ORDERS_MONTHS):
+            columns, groups = order_store.load_month_columns(store_dir, month, manifest=manifest)
+            if columns is not None:
+                print(f"读取订单存储: {store_dir} (M{month:02d})")
+                for key, (start, stop) in groups.items():
+                    _CACHED_ORDERS_DATA[key] = _order_records_from_columns(columns, start, stop)
+            _CACHED_ORDERS_MONTHS.add(month)
+    else:
+        path = _resolve_orders_path(orders_path)
+        if path is None or not os.path.exists(path):
+            return None
+
+        cache_key = (path, os.path.getmtime(path))
+        if _CACHED_ORDERS_PATH != cache_key or _CACHED_ORDERS_DATA is None:
+            print(f"解析订单文件: {path}")
+            with open(path, 'r', encoding='utf-8') as f:
+                orders_data = json.load(f)
+
+            _CACHED_ORDERS_PATH = cache_key
+            _CACHED_ORDERS_DATA = {
+                key: tuple(_order_record_from_dict(order_data) for order_data in order_list)
+                for key, order_list in orders_data.items()
+            }
+            _CACHED_ORDERS_MONTHS = None
+
+    if wanted is None:
+        return dict(_CACHED_ORDERS_DATA)
+    return {key: records for key, records in _CACHED_ORDERS_DATA.items() if _order_group_month(key) in wanted}
+
+
+def available_order_months(orders_path=None):
+    """返回预生成订单里有哪些月份（列式存储只读manifest，不加载数据）。"""
+    store_dir = _resolve_orders_store_path(orders_path)
+    manifest = order_store.read_manifest(store_dir) if store_dir else None
+    if manifest is not None:
+        return order_store.available_months(manifest)
+    table = load_order_table(orders_path)
+    return _extract_available_months_from_orders_data(table) if table else []
+
+
+def _order_group_month(key):
+    """从分组key（例如 'FG_Outbound_M01'）中解析月份；解析失败返回None。"""
+    months = _extract_available_months_from_orders_data({key: None})
+    return months[0] if months else None
+
+
+class OrderTable:
+    """一次仿真的订单表（struct-of-arrays）。
+
+    不可变字段仍由缓存的 OrderRecord 提供（所有场景/replication共享），
+    每次仿真只为可变状态分配一组定长数组，例如 on_time[i]、completed[i]；
+    仿真流程拿到的是 Order 句柄（表 + 行号），订单id为本次仿真内的行号+1，与进程里跑过多少次仿真无关。
+    """
+
+    # 状态列: (dtype, 初始值)；浮点列用NaN表示None，actual_timeslot 用 -1 表示None
+    STATE_COLUMNS = {
+        'preparation_started': (np.bool_, False),
+        'preparation_completed': (np.bool_, False),
+        'preparation_pallets_done': (np.float64, 0.0),
+        'actual_timeslot': (np.int64, -1),
+        'on_time': (np.bool_, True),
+        'delay_hours': (np.int64, 0),
+        'processing_start_time': (np.float64, np.nan),
+        'processing_end_time': (np.float64, np.nan),
+        'processing_deadline': (np.float64, np.nan),
+        'completed': (np.bool_, False),
+    }
+
+    def __init__(self, records):
+        self.records = tuple(records)
+        n = len(self.records)
+        for name, (dtype, initial) in self.STATE_COLUMNS.items():
+            setattr(self, name, np.full(n, initial, dtype=dtype))
+        # simpy.Event 不能放进数值数组
+        self.preparation_done_event = [None] * n
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def handles(self, start=0, stop=None):
+        """返回 [start, stop) 行的 Order 句柄列表"""
+        stop = len(self.records) if stop is None else stop
+        return [Order._from_table(self, i) for i in range(start, stop)]
+
+    def column(self, name):
+        """不可变字段的数组视图（按需构建并缓存，None → NaN），用于向量化统计"""
+        if name not in self._columns:
+            values = [getattr(r, name) for r in self.records]
+            if name in ('order_id', 'category', 'direction', 'region'):
+                self._columns[name] = np.array(values, dtype=object)
+            else:
+                self._columns[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        return self._columns[name]
+
+
+_ORDER_ROW = operator.attrgetter('_index')
+
+
+def _order_record_property(name):
+    return property(operator.attrgetter(f'_record.{name}'))
+
+
+def _order_state_property(name, nullable=None):
+    """OrderTable 状态列的读写属性；nullable 为表示None的哨兵（NaN 或 -1）"""
+    if nullable is None:
+        def fget(self):
+            return getattr(self._table, name).item(self._index)
+    else:
+        def fget(self):
+            value = getattr(self._table, name).item(self._index)
+            return None if (value == nullable or value != value) else value
+
+    def fset(self, value):
+        if value is None:
+            value = nullable
+        getattr(self._table, name)[self._index] = value
+
+    return property(fget, fset)
+
+
 class Order:
-    """订单实体（新逻辑：基于预生成数据）"""
-    _id_counter = 0
-    
+    """订单实体（新逻辑：基于预生成数据）
+
+    轻量句柄：不可变字段读 OrderRecord，可变状态读写所属 OrderTable 的状态列。
+    """
+    __slots__ = ('_table', '_index', '_record')
+
     def __init__(self, order_data):
         """
         Args:
-            order_data: dict，从generated_orders.json加载的订单记录
+            order_data: dict，从generated_orders.json加载的订单记录（单独构造时使用一张单行订单表）
         """
-        Order._id_counter += 1
-        self.id = Order._id_counter
-        
-        # 基础属性
-        self.order_id = order_data['order_id']
-        self.month = order_data['month']
-        self.day = order_data['day']
-        self.category = order_data['category']
-        self.direction = order_data['direction']
-        self.pallets = order_data['pallets']
-        
-        # Outbound特有属性
-        if self.direction == 'Outbound':
-            self.region = order_data.get('region')  # 'G2_same_day', 'G2_next_day', 'ROW_next_day'
-            self.creation_hour = order_data.get('creation_hour')  # 相对当天的小时
-            # data_preparation.py 可能会写入绝对时间字段（非严格JSON也会被python json解析）
-            self.creation_time_abs = order_data.get('creation_time_abs')
-            self.creation_time = None  # 绝对仿真时间，后续计算
-            self.preparation_started = False
-            self.preparation_completed = False
-            self.preparation_pallets_done = 0
-        
-        # Inbound/Outbound通用
-        self.timeslot_hour = order_data.get('timeslot_hour')
-        self.timeslot_abs = order_data.get('timeslot_abs')
-        self.timeslot_time = None  # 绝对仿真时间，后续计算
-        
-        # 状态跟踪
-        self.actual_timeslot = None  # 实际分配的timeslot（可能因延误改变）
-        self.on_time = True  # 是否按原timeslot完成
-        self.delay_hours = 0
-        self.processing_start_time = None
-        self.processing_end_time = None
-        self.completed = False
-        
+        self._table = OrderTable([_order_record_from_dict(order_data)])
+        self._index = 0
+        self._record = self._table.records[0]
+
+    @classmethod
+    def _from_table(cls, table, index):
+        order = cls.__new__(cls)
+        order._table = table
+        order._index = index
+        order._record = table.records[index]
+        return order
+
+    @classmethod
+    def from_record(cls, record):
+        """从缓存的不可变 OrderRecord 创建单个订单（批量创建请用 OrderTable(records).handles()）。"""
+        return cls._from_table(OrderTable([record]), 0)
+
+    @property
+    def id(self):
+        return self._index + 1
+
+    # 基础属性（不可变）
+    order_id = _order_record_property('order_id')
+    month = _order_record_property('month')
+    day = _order_record_property('day')
+    category = _order_record_property('category')
+    direction = _order_record_property('direction')
+    pallets = _order_record_property('pallets')
+    # Outbound特有属性（Inbound为None）
+    region = _order_record_property('region')  # 'G2_same_day', 'G2_next_day', 'ROW_next_day'
+    creation_hour = _order_record_property('creation_hour')  # 相对当天的小时
+    creation_time_abs = _order_record_property('creation_time_abs')
+    creation_time = _order_record_property('creation_time')  # 绝对仿真时间
+    # Inbound/Outbound通用
+    timeslot_hour = _order_record_property('timeslot_hour')
+    timeslot_abs = _order_record_property('timeslot_abs')
+    timeslot_time = _order_record_property('timeslot_time')  # 绝对仿真时间
+
+    # 状态跟踪（可变，存放在 OrderTable）
+    preparation_started = _order_state_property('preparation_started')
+    preparation_completed = _order_state_property('preparation_completed')
+    preparation_pallets_done = _order_state_property('preparation_pallets_done')
+    actual_timeslot = _order_state_property('actual_timeslot', nullable=-1)  # 实际分配的timeslot（可能因延误改变）
+    on_time = _order_state_property('on_time')  # 是否按原timeslot完成
+    delay_hours = _order_state_property('delay_hours')
+    processing_start_time = _order_state_property('processing_start_time', nullable=np.nan)
+    processing_end_time = _order_state_property('processing_end_time', nullable=np.nan)
+    processing_deadline = _order_state_property('processing_deadline', nullable=np.nan)
+    completed = _order_state_property('completed')
+
+    @property
+    def preparation_done_event(self):
+        """simpy.Event，调度时由DCSimulation创建"""
+        return self._table.preparation_done_event[self._index]
+
+    @preparation_done_event.setter
+    def preparation_done_event(self, event):
+        self._table.preparation_done_event[self._index] = event
+
     def __repr__(self):
         if self.direction == 'Outbound':
             return f"Order-{self.id}({self.category}-OUT, {self.pallets}p, {self.region}, slot={self.timeslot_hour})"
         return f"Order-{self.id}({self.category}-IN, {self.pallets}p, slot={self.timeslot_hour})"
 
 
+def make_simulation_rng(seed=None, scenario_key=None, run_id=1, stream=None, substream=None, month=None):
+    """为单次仿真创建独立的 numpy.random.Generator。
+
+    随机流由根 SeedSequence(seed) 按 spawn_key=(scenario_key, run_id[, month][, stream][, substream]) 派生：
+    - 同一 (seed, scenario_key, run_id, month) 总是得到同一条随机流，单次replication可以单独复现，
+      也可以分发到任意worker上运行；
+    - month 为仿真的目标月份：逐月仿真（run_yearly_scenario_summary）时每个月是独立的随机流，
+      月度平均才能平均掉随机波动；None 时不参与派生；
+    - scenario_key=None 时随机流只取决于 run_id，不同场景的同一次replication共享随机数
+      （common random numbers，见 run_paired_comparison）；
+    - stream 为随机来源名称：每个来源一条独立子流，新增随机来源（例如随机到达）不会挪动
+      已有来源的抽样序列。stream=None 是默认流；
+    - substream 为来源内的键（例如订单号，见 DCSimulation.order_stream），按64位hash派生，
+      同一订单在各场景抽到同一条子流。
+    """
+    if seed is None:
+        seed = DEFAULT_RANDOM_SEED
+    spawn_key = (int(run_id),)
+    if month is not None:
+        spawn_key = spawn_key + (int(month),)
+    if scenario_key is not None:
+        spawn_key = (zlib.crc32(str(scenario_key).encode('utf-8')),) + spawn_key
+    if stream is not None:
+        spawn_key = spawn_key + (zlib.crc32(str(stream).encode('utf-8')),)
+    if substream is not None:
+        digest = hashlib.blake2b(str(substream).encode('utf-8'), digest_size=8).digest()
+        spawn_key = spawn_key + (int.from_bytes(digest, 'little'),)
+    return np.random.default_rng(np.random.SeedSequence(int(seed), spawn_key=spawn_key))
+
+
 class FTEManager:
     """人力资源管理器 - FTE 按运营时长调整"""
-    def __init__(self, operating_hours=18, efficiency_multiplier=1.0, fte_adjustment_ratio=None):
+    def __init__(self, operating_hours=18, efficiency_multiplier=1.0, fte_adjustment_ratio=None, rng=None):
         if LOADED_CONFIG and 'fte_config' in LOADED_CONFIG:
             fte_config = LOADED_CONFIG['fte_config']
             self.baseline_fte = {
@@ -498,6 +953,8 @@ class FTEManager:
         self.fte_adjustment_ratio = fte_adjustment_ratio  # 显式FTE调整比例
         self.adjusted_fte = self._calculate_adjusted_fte()
         self.efficiency_multiplier = float(efficiency_multiplier) if efficiency_multiplier is not None else 1.0
+        # 随机数发生器（由DCSimulation传入；单独使用时按默认种子创建）
+        self.rng = rng if rng is not None else make_simulation_rng()
         
     def _calculate_adjusted_fte(self):
         """根据运营时长调整FTE
@@ -521,17 +978,22 @@ class FTEManager:
                 adjusted[category][direction] = base * adjustment_ratio
         return adjusted
     
-    def get_hourly_capacity(self, category, direction, coefficient=1.0):
+    def get_nominal_hourly_capacity(self, category, direction, coefficient=1.0):
+        """每小时处理能力的名义值（不含随机波动）"""
+        fte = self.adjusted_fte[category][direction]
+        efficiency = self.efficiency_per_fte[category]
+        base_capacity = (fte * efficiency) / self.hours_per_month
+        return base_capacity * coefficient * self.efficiency_multiplier
+
+    def get_hourly_capacity(self, category, direction, coefficient=1.0, rng=None):
         """每小时处理能力（托盘/小时）
         
         公式: (调整FTE × 效率) / 月度工时 × coefficient
+        rng: 抽取随机波动的子流（例如 DCSimulation.order_stream）；None 时用 self.rng
         """
-        fte = self.adjusted_fte[category][direction]
-        efficiency = self.efficiency_per_fte[category]
-        base_capacity = (fte * efficiency) / self.hours_per_month
-        adjusted_capacity = base_capacity * coefficient * self.efficiency_multiplier
+        adjusted_capacity = self.get_nominal_hourly_capacity(category, direction, coefficient)
         # 随机波动 ±5%
-        actual_capacity = adjusted_capacity * np.random.uniform(0.95, 1.05)
+        actual_capacity = adjusted_capacity * (rng if rng is not None else self.rng).uniform(0.95, 1.05)
         
         return actual_capacity
     
@@ -558,20 +1020,424 @@ class FTEManager:
 
 # ==================== KPI 收集器 ====================
 
+class KPIRecordBuffer:
+    """单类KPI记录的列式缓冲区（替代 list of dict）。
+
+    每列一个预分配的NumPy数组，写满后按2倍扩容；字符串列（category/direction/region/dock_type）
+    存为 int16 类别编码，编码表按首次出现的顺序增长。append 按 columns 的顺序传值，
+    汇总时用 column()/mask()/group_sum() 做向量化统计，导出时 to_frame() 还原成原来的表格。
+    """
+
+    CATEGORICAL = 'category'
+
+    def __init__(self, columns, capacity=256):
+        """
+        Args:
+            columns: {列名: numpy dtype 或 'category'}（有序）
+            capacity: 初始预分配行数
+        """
+        self.columns = dict(columns)
+        self._size = 0
+        self._capacity = capacity
+        self._data = {}
+        self._codes = {}    # 类别列: {label: code}
+        self._labels = {}   # 类别列: [label]
+        for name, kind in self.columns.items():
+            if kind == self.CATEGORICAL:
+                self._data[name] = np.empty(capacity, dtype=np.int16)
+                self._codes[name] = {}
+                self._labels[name] = []
+            else:
+                self._data[name] = np.empty(capacity, dtype=kind)
+        # append 的逐列写入方式: (列名, 类别编码表 或 None, 是否浮点列)
+        self._writers = tuple(
+            (name, self._codes.get(name), self.columns[name] is np.float64)
+            for name in self.columns
+        )
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        """兼容旧代码按 dict 逐条读取"""
+        return iter(self.to_frame().to_dict('records'))
+
+    def append(self, *values):
+        i = self._size
+        if i == self._capacity:
+            self._grow()
+        data = self._data
+        for (name, codes, is_float), value in zip(self._writers, values):
+            if codes is not None:
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(codes)
+                    self._labels[name].append(value)
+                value = code
+            elif is_float and value is None:
+                value = np.nan
+            data[name][i] = value
+        self._size = i + 1
+
+    def _grow(self):
+        self._capacity *= 2
+        for name, array in self._data.items():
+            grown = np.empty(self._capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            self._data[name] = grown
+
+    def column(self, name):
+        """已写入部分的数组视图（类别列返回编码）"""
+        return self._data[name][:self._size]
+
+    def labels(self, name):
+        return self._labels[name]
+
+    def decode(self, name):
+        """类别列还原为字符串（object数组）"""
+        return np.array(self._labels[name] + [None], dtype=object)[self.column(name)]
+
+    def mask(self, name, label=None, predicate=None):
+        """类别列的行掩码：等于 label，或 predicate(label) 为真（只对编码表逐个判断）"""
+        if predicate is None:
+            return self.column(name) == self._codes[name].get(label, -1)
+        table = np.array([bool(predicate(lbl)) for lbl in self._labels[name]] + [False], dtype=bool)
+        return table[self.column(name)]
+
+    def where(self, **conditions):
+        """行掩码：每个条件是 列名=label 或 列名=predicate(label)"""
+        rows = np.ones(self._size, dtype=bool)
+        for name, condition in conditions.items():
+            if callable(condition):
+                rows &= self.mask(name, predicate=condition)
+            else:
+                rows &= self.mask(name, condition)
+        return rows
+
+    # 下面的查询接口与 KPIRunningTable 相同，generate_summary 对两种模式只写一套
+    def count(self, **conditions):
+        return int(np.count_nonzero(self.where(**conditions))) if conditions else len(self)
+
+    def total(self, name, **conditions):
+        values = self.column(name)
+        return values[self.where(**conditions)].sum() if conditions else values.sum()
+
+    def mean(self, name, **conditions):
+        values = self.column(name)
+        return np.mean(values[self.where(**conditions)] if conditions else values)
+
+    def max(self, name, **conditions):
+        values = self.column(name)
+        return (values[self.where(**conditions)] if conditions else values).max()
+
+    def quantile(self, name, q):
+        return np.percentile(self.column(name), q * 100)
+
+    def grouped(self, keys, values):
+        """按若干列分组：{(各列的值...): (行数, {列: 合计}, {列: 最大值})}"""
+        if not self._size:
+            return {}
+        # 各列先各自编号，再按混合进制合成一个整数分组key
+        key_values, shape = [], []
+        combined = np.zeros(self._size, dtype=np.int64)
+        for key in keys:
+            labels, index = np.unique(self.column(key), return_inverse=True)
+            if key in self._codes:
+                labels = [self._labels[key][code] for code in labels]
+            key_values.append(labels)
+            shape.append(len(labels))
+            combined = combined * len(labels) + index
+        unique_groups, inverse = np.unique(combined, return_inverse=True)
+        group_keys = np.unravel_index(unique_groups, shape)
+        n_groups = len(unique_groups)
+        counts = np.bincount(inverse, minlength=n_groups)
+        sums, maxes = {}, {}
+        for name in values:
+            column = self.column(name).astype(np.float64)
+            sums[name] = np.bincount(inverse, weights=column, minlength=n_groups)
+            maxes[name] = np.full(n_groups, -np.inf)
+            np.maximum.at(maxes[name], inverse, column)
+        return {
+            tuple(labels[index[g]] for labels, index in zip(key_values, group_keys)): (
+                counts[g],
+                {name: sums[name][g] for name in values},
+                {name: maxes[name][g] for name in values},
+            )
+            for g in range(n_groups)
+        }
+
+    def to_frame(self):
+        return pd.DataFrame({
+            name: (self.decode(name) if kind == self.CATEGORICAL else self.column(name))
+            for name, kind in self.columns.items()
+        })
+
+    def nbytes(self):
+        return sum(array.nbytes for array in self._data.values())
+
+
+class RunningStats:
+    """Welford 在线统计：count / total / mean / variance / max，O(1) 内存"""
+    __slots__ = ('count', 'total', 'mean', '_m2', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if value > self.max:
+            self.max = value
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def merge(self, other):
+        """合并两组统计（Chan 并行公式），返回新对象"""
+        merged = RunningStats()
+        merged.count = self.count + other.count
+        if merged.count == 0:
+            return merged
+        delta = other.mean - self.mean
+        merged.total = self.total + other.total
+        merged.mean = self.mean + delta * other.count / merged.count
+        merged._m2 = self._m2 + other._m2 + delta * delta * self.count * other.count / merged.count
+        merged.max = max(self.max, other.max)
+        return merged
+
+
+class P2Quantile:
+    """P² 流式分位数估计（Jain & Chlamtac, 1985）：只保留5个标记点，O(1) 内存
+
+    样本数不足5个时直接对已有样本求精确分位数。
+    """
+
+    def __init__(self, q):
+        self.q = q
+        self._samples = []
+        self._heights = None
+        self._positions = None
+        self._desired = None
+        self._increments = (0.0, q / 2, q, (1 + q) / 2, 1.0)
+
+    def add(self, value):
+        if self._heights is None:
+            self._samples.append(value)
+            if len(self._samples) == 5:
+                q = self.q
+                self._heights = sorted(self._samples)
+                self._positions = [0, 1, 2, 3, 4]
+                self._desired = [0.0, 2 * q, 4 * q, 2 + 2 * q, 4.0]
+            return
+
+        heights, positions = self._heights, self._positions
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = bisect.bisect_right(heights, value) - 1
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # 调整中间3个标记点的高度（抛物线插值，越界时退回线性插值）
+        for i in (1, 2, 3):
+            offset = self._desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or \
+                    (offset <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                candidate = heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+                    (positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i]) / (positions[i + 1] - positions[i])
+                    + (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1]) / (positions[i] - positions[i - 1])
+                )
+                if not heights[i - 1] < candidate < heights[i + 1]:
+                    candidate = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = candidate
+                positions[i] += step
+
+    def value(self):
+        if self._heights is None:
+            return np.percentile(self._samples, self.q * 100) if self._samples else 0.0
+        return self._heights[2]
+
+
+class KPIRunningTable:
+    """summary-only 模式下替代 KPIRecordBuffer：不保存逐条记录，只按 group_by 列维护 RunningStats。
+
+    append 的参数顺序与对应的 KPIRecordBuffer 相同；内存只与分组数（例如 category×region）有关，与仿真时长无关。
+    分组条件只能用 group_by 里的列。
+    """
+
+    def __init__(self, columns, group_by=(), quantiles=None):
+        names = list(columns)
+        self.group_by = tuple(group_by)
+        self._key_positions = tuple(names.index(name) for name in self.group_by)
+        self._value_positions = tuple(
+            (i, name) for i, (name, kind) in enumerate(columns.items())
+            if name not in self.group_by and kind != KPIRecordBuffer.CATEGORICAL
+        )
+        self._quantiles = {name: (names.index(name), P2Quantile(q)) for name, q in (quantiles or {}).items()}
+        self._size = 0
+        self._rows = {}    # 分组key -> 行数
+        self._stats = {}   # 分组key -> {列: RunningStats}
+
+    def __len__(self):
+        return self._size
+
+    def append(self, *values):
+        key = tuple(values[i] for i in self._key_positions)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = {name: RunningStats() for _, name in self._value_positions}
+            self._rows[key] = 0
+        self._rows[key] += 1
+        for i, name in self._value_positions:
+            value = values[i]
+            if value is not None:
+                stats[name].add(value)
+        for position, sketch in self._quantiles.values():
+            sketch.add(values[position])
+        self._size += 1
+
+    def _matching(self, conditions):
+        positions = {name: self.group_by.index(name) for name in conditions}
+        for key in self._stats:
+            if all(condition(key[positions[name]]) if callable(condition) else key[positions[name]] == condition
+                   for name, condition in conditions.items()):
+                yield key
+
+    def count(self, **conditions):
+        return sum(self._rows[key] for key in self._matching(conditions))
+
+    def stats(self, name, **conditions):
+        merged = RunningStats()
+        for key in self._matching(conditions):
+            merged = merged.merge(self._stats[key][name])
+        return merged
+
+    def total(self, name, **conditions):
+        return self.stats(name, **conditions).total
+
+    def mean(self, name, **conditions):
+        return self.stats(name, **conditions).mean
+
+    def max(self, name, **conditions):
+        return self.stats(name, **conditions).max
+
+    def quantile(self, name, q):
+        _position, sketch = self._quantiles[name]
+        assert sketch.q == q, f'{name} 只维护了 q={sketch.q} 的分位数'
+        return sketch.value()
+
+    def grouped(self, keys, values):
+        assert tuple(keys) == self.group_by
+        return {
+            key: (self._rows[key],
+                  {name: self._stats[key][name].total for name in values},
+                  {name: self._stats[key][name].max for name in values})
+            for key in self._stats
+        }
+
+
 class KPICollector:
-    """KPI 数据收集和分析"""
-    def __init__(self, operating_hours=18):
-        self.buffer_overflows = []
-        self.truck_wait_times = []
-        self.sla_misses = []
-        self.completed_orders = []
-        self.inbound_operations = []
-        self.outbound_operations = []
-        self.hourly_buffer_occupancy = defaultdict(list)
-        self.midnight_backlogs = []
-        self.inbound_delays = []
-        self.dock_usage = []
-        self.fte_usage = []  # 新增：FTE使用记录
+    """KPI 数据收集和分析
+
+    每类记录是一个 KPIRecordBuffer（列式、类别编码），record_* 接口与原来的 list of dict 版本一致。
+    summary_only=True 时改用 KPIRunningTable：只保留汇总需要的在线统计（按 SUMMARY_GROUPS 分组），
+    内存不随仿真时长增长，generate_summary 输出相同的字段（p95 为 P² 估计值），但 export_to_excel 只有 Summary 表。
+    """
+
+    # record_outbound_operation / record_outbound_truck（以及 inbound 的新旧两种记录）写同一个缓冲区，
+    # 这里是两者字段的并集，缺失的字段写 NaN / 默认值
+    BUFFER_COLUMNS = {
+        'buffer_overflows': {
+            'category': KPIRecordBuffer.CATEGORICAL, 'timestamp': np.float64,
+            'hour': np.int16, 'pallets': np.float64,
+        },
+        'truck_wait_times': {
+            'category': KPIRecordBuffer.CATEGORICAL, 'direction': KPIRecordBuffer.CATEGORICAL,
+            'wait_time': np.float64, 'total_wait': np.float64, 'overnight': np.bool_,
+        },
+        'sla_misses': {
+            'order_id': np.int64, 'scheduled_departure': np.float64, 'actual_completion': np.float64,
+            'delay': np.float64, 'pallets': np.float64,
+        },
+        'completed_orders': {
+            'order_id': np.int64, 'pallets': np.float64, 'order_time': np.float64,
+            'completion_time': np.float64, 'departure_time': np.float64,
+            'has_time_constraint': np.bool_, 'region': KPIRecordBuffer.CATEGORICAL, 'on_time': np.bool_,
+        },
+        'inbound_operations': {
+            'category': KPIRecordBuffer.CATEGORICAL, 'pallets': np.float64,
+            'arrival_time': np.float64, 'processing_time': np.float64, 'missed_deadline': np.bool_,
+            'start_time': np.float64, 'end_time': np.float64, 'duration': np.float64,
+            'from_buffer': np.bool_, 'order_count': np.int16,
+        },
+        'outbound_operations': {
+            'category': KPIRecordBuffer.CATEGORICAL, 'pallets': np.float64,
+            'region': KPIRecordBuffer.CATEGORICAL, 'on_time': np.bool_, 'delay_hours': np.float64,
+            'service_time': np.float64, 'completion_time': np.float64,
+            'scheduled_time': np.float64, 'start_time': np.float64, 'end_time': np.float64,
+            'order_count': np.int16,
+        },
+        'hourly_buffer_occupancy': {
+            'category': KPIRecordBuffer.CATEGORICAL, 'hour': np.float64, 'occupancy_rate': np.float64,
+        },
+        'midnight_backlogs': {
+            'day': np.int64, 'pending_orders': np.int64, 'pending_pallets': np.float64,
+        },
+        'inbound_delays': {
+            'category': KPIRecordBuffer.CATEGORICAL, 'pallets': np.float64, 'arrival_time': np.float64,
+            'processing_end': np.float64, 'delay_hours': np.float64, 'processing_deadline': np.float64,
+        },
+        'dock_usage': {
+            'hour': np.int64, 'dock_type': KPIRecordBuffer.CATEGORICAL,
+            'category': KPIRecordBuffer.CATEGORICAL, 'used': np.int32, 'available': np.int32,
+            'utilization': np.float64, 'over_capacity': np.int32,
+        },
+        'fte_usage': {
+            'category': KPIRecordBuffer.CATEGORICAL, 'direction': KPIRecordBuffer.CATEGORICAL,
+            'processing_time': np.float64, 'pallets_processed': np.float64, 'available_fte': np.float64,
+            'fte_required': np.float64, 'fte_used': np.float64, 'fte_utilization': np.float64,
+            'fte_efficiency': np.float64, 'actual_efficiency': np.float64, 'timestamp': np.float64,
+        },
+    }
+
+    # summary-only 模式下每类记录的分组列（generate_summary 的筛选条件只用到这些列）
+    SUMMARY_GROUPS = {
+        'buffer_overflows': (),
+        'truck_wait_times': (),
+        'sla_misses': (),
+        'completed_orders': ('region',),
+        'inbound_operations': ('category',),
+        'outbound_operations': ('category', 'region'),
+        'hourly_buffer_occupancy': ('category',),
+        'midnight_backlogs': (),
+        'inbound_delays': ('category',),
+        'dock_usage': ('category', 'dock_type', 'hour'),
+        'fte_usage': ('category', 'direction'),
+    }
+
+    def __init__(self, operating_hours=18, summary_only=False):
+        self.summary_only = summary_only
+        for name, columns in self.BUFFER_COLUMNS.items():
+            if summary_only:
+                quantiles = {'wait_time': 0.95} if name == 'truck_wait_times' else None
+                setattr(self, name, KPIRunningTable(columns, self.SUMMARY_GROUPS[name], quantiles))
+            else:
+                setattr(self, name, KPIRecordBuffer(columns))
         self.operating_hours = operating_hours  # 营业时间
     
     def record_dock_usage(self, hour, dock_type, category, used, available):
@@ -581,15 +1447,8 @@ class KPICollector:
         else:
             utilization = 0
             
-        self.dock_usage.append({
-            'hour': hour,
-            'dock_type': dock_type,  # 'loading' or 'reception'
-            'category': category,
-            'used': used,
-            'available': available,
-            'utilization': utilization,
-            'over_capacity': max(0, used - available)
-        })
+        self.dock_usage.append(hour, dock_type, category, used, available, utilization,
+                               max(0, used - available))
     
     def record_fte_usage(self, category, direction, processing_time, pallets_processed, available_fte, hourly_capacity):
         """记录FTE使用情况
@@ -612,38 +1471,27 @@ class KPICollector:
         # FTE利用率 = 实际使用的FTE / 配置的FTE（最高100%）
         fte_utilization = fte_used / available_fte if available_fte > 0 else 0
         
-        self.fte_usage.append({
-            'category': category,
-            'direction': direction,
-            'processing_time': processing_time,  # 实际处理时间（小时）
-            'pallets_processed': pallets_processed,  # 处理的托盘数
-            'available_fte': available_fte,  # 配置的FTE工作量（已按营业时间调整）
-            'fte_required': fte_required,  # 理论需要的FTE（可能超过配置）
-            'fte_used': fte_used,  # 实际使用的FTE（不超过配置）
-            'fte_utilization': fte_utilization,  # 本次操作的FTE利用率（最高100%）
-            'fte_efficiency': fte_efficiency,  # 单FTE处理能力（基线标准）
-            'actual_efficiency': pallets_processed / processing_time if processing_time > 0 else 0,  # 实际处理效率（托盘/小时）
-            'timestamp': self.env.now if hasattr(self, 'env') else 0  # 添加时间戳
-        })
+        self.fte_usage.append(
+            category,
+            direction,
+            processing_time,  # 实际处理时间（小时）
+            pallets_processed,  # 处理的托盘数
+            available_fte,  # 配置的FTE工作量（已按营业时间调整）
+            fte_required,  # 理论需要的FTE（可能超过配置）
+            fte_used,  # 实际使用的FTE（不超过配置）
+            fte_utilization,  # 本次操作的FTE利用率（最高100%）
+            fte_efficiency,  # 单FTE处理能力（基线标准）
+            pallets_processed / processing_time if processing_time > 0 else 0,  # 实际处理效率（托盘/小时）
+            self.env.now if hasattr(self, 'env') else 0  # 时间戳
+        )
     
     def record_inbound_delay(self, category, pallets, arrival_time, processing_end, delay_hours):
         """记录Inbound处理超过24小时的情况"""
-        self.inbound_delays.append({
-            'category': category,
-            'pallets': pallets,
-            'arrival_time': arrival_time,
-            'processing_end': processing_end,
-            'delay_hours': delay_hours,
-            'processing_deadline': arrival_time + 24
-        })
+        self.inbound_delays.append(category, pallets, arrival_time, processing_end, delay_hours,
+                                   arrival_time + 24)
         
     def record_buffer_overflow(self, category, timestamp, pallets):
-        self.buffer_overflows.append({
-            'category': category,
-            'timestamp': timestamp,
-            'hour': int(timestamp) % 24,
-            'pallets': pallets
-        })
+        self.buffer_overflows.append(category, timestamp, int(timestamp) % 24, pallets)
     
     def record_truck_wait(self, truck, dc_config):
         """记录卡车等待时间（排除DC关闭时间）"""
@@ -656,110 +1504,83 @@ class KPICollector:
         # 计算实际业务等待时间：只累计“开门窗口”内的等待
         business_wait = 0.0
         if service_start > arrival_time:
-            start_day = int(arrival_time) // 24
-            end_day = int(service_start) // 24
-            for day_index in range(start_day, end_day + 1):
-                for a, b in _compute_daily_open_windows(dc_config, day_index):
-                    win_start = day_index * 24 + a
-                    win_end = day_index * 24 + b
-                    overlap_start = max(arrival_time, win_start)
-                    overlap_end = min(service_start, win_end)
-                    if overlap_end > overlap_start:
-                        business_wait += (overlap_end - overlap_start)
+            business_wait = get_open_calendar(dc_config).open_overlap(arrival_time, service_start)
 
         # 标记是否跨夜（使用“常规”关门长度近似，便于对比）
         dc_open = int(dc_config.get('dc_open_time', 0))
         dc_close = int(dc_config.get('dc_close_time', 24))
         daily_closure_hours = 24 - dc_close + dc_open
         
-        self.truck_wait_times.append({
-            'category': truck.category,
-            'direction': truck.direction,
-            'wait_time': business_wait,  # 只记录业务等待时间
-            'total_wait': total_wait,     # 保留总等待时间用于分析
-            'overnight': total_wait >= daily_closure_hours  # 标记是否跨夜
-        })
+        self.truck_wait_times.append(
+            truck.category,
+            truck.direction,
+            business_wait,  # 只记录业务等待时间
+            total_wait,     # 保留总等待时间用于分析
+            total_wait >= daily_closure_hours  # 标记是否跨夜
+        )
     
     def record_sla_miss(self, order, actual_completion):
-        self.sla_misses.append({
-            'order_id': order.id,
-            'scheduled_departure': order.departure_time,
-            'actual_completion': actual_completion,
-            'delay': actual_completion - order.departure_time,
-            'pallets': order.pallets
-        })
+        self.sla_misses.append(order.id, order.departure_time, actual_completion,
+                               actual_completion - order.departure_time, order.pallets)
     
     def record_order_completion(self, order):
-        self.completed_orders.append({
-            'order_id': order.id,
-            'pallets': order.pallets,
-            'order_time': order.order_time,
-            'completion_time': order.completion_time,
-            'departure_time': order.departure_time,
-            'has_time_constraint': order.has_time_constraint,
-            'region': order.region,  # 添加地区信息
-            'on_time': order.completion_time <= order.departure_time if order.has_time_constraint else True
-        })
+        self.completed_orders.append(
+            order.id,
+            order.pallets,
+            order.order_time,
+            order.completion_time,
+            order.departure_time,
+            order.has_time_constraint,
+            order.region,  # 地区信息
+            order.completion_time <= order.departure_time if order.has_time_constraint else True
+        )
     
     def record_inbound_operation(self, category, pallets, start_time, end_time, from_buffer):
-        self.inbound_operations.append({
-            'category': category,
-            'pallets': pallets,
-            'start_time': start_time,
-            'end_time': end_time,
-            'duration': end_time - start_time,
-            'from_buffer': from_buffer,
-            'order_count': 1  # 每个inbound operation对应一个订单
-        })
+        # 旧逻辑字段：arrival_time / processing_time / missed_deadline 留空
+        self.inbound_operations.append(category, pallets, None, None, False,
+                                       start_time, end_time, end_time - start_time, from_buffer,
+                                       1)  # 每个inbound operation对应一个订单
     
     def record_outbound_operation(self, truck):
-        self.outbound_operations.append({
-            'category': truck.category,
-            'pallets': truck.pallets,
-            'scheduled_time': truck.scheduled_time,
-            'start_time': truck.service_start_time,
-            'end_time': truck.service_end_time,
-            'region': truck.region,  # 添加地区信息（仅FG）
-            'order_count': 1  # 每个truck代表一个订单
-        })
+        # 旧逻辑字段：on_time / delay_hours / service_time / completion_time 留空
+        self.outbound_operations.append(truck.category, truck.pallets,
+                                        truck.region,  # 地区信息（仅FG）
+                                        False, 0, None, None,
+                                        truck.scheduled_time, truck.service_start_time, truck.service_end_time,
+                                        1)  # 每个truck代表一个订单
     
     def record_buffer_occupancy(self, hour, category, occupancy_rate):
-        self.hourly_buffer_occupancy[category].append({
-            'hour': hour,
-            'occupancy_rate': occupancy_rate
-        })
+        self.hourly_buffer_occupancy.append(category, hour, occupancy_rate)
     
     def record_midnight_backlog(self, day, pending_orders_count, pending_pallets):
-        self.midnight_backlogs.append({
-            'day': day,
-            'pending_orders': pending_orders_count,
-            'pending_pallets': pending_pallets
-        })
+        self.midnight_backlogs.append(day, pending_orders_count, pending_pallets)
     
     def record_outbound_truck(self, order_data):
         """记录Outbound订单完成（新逻辑）"""
-        self.outbound_operations.append({
-            'category': order_data['category'],
-            'pallets': order_data['pallets'],
-            'region': order_data['region'],
-            'on_time': order_data['on_time'],
-            'delay_hours': order_data.get('delay_hours', 0),
-            'service_time': order_data['service_time'],
-            'completion_time': order_data['completion_time'],
-            'order_count': 1
-        })
+        self.outbound_operations.append(
+            order_data['category'],
+            order_data['pallets'],
+            order_data['region'],
+            order_data['on_time'],
+            order_data.get('delay_hours', 0),
+            order_data['service_time'],
+            order_data['completion_time'],
+            None, None, None,
+            1
+        )
     
     def record_inbound_truck(self, order_data):
         """记录Inbound订单完成（新逻辑）"""
-        self.inbound_operations.append({
-            'category': order_data['category'],
-            'pallets': order_data['pallets'],
-            'arrival_time': order_data['arrival_time'],
-            'processing_time': order_data['processing_time'],
-            'missed_deadline': order_data.get('missed_deadline', False),
-            'order_count': 1,
-            'from_buffer': False  # 新逻辑中无buffer
-        })
+        self.inbound_operations.append(
+            order_data['category'],
+            order_data['pallets'],
+            order_data['arrival_time'],
+            order_data['processing_time'],
+            order_data.get('missed_deadline', False),
+            None, None, None,
+            False,  # 新逻辑中无buffer
+            1
+        )
     
     def generate_summary(self, adjusted_fte=None):
         """生成汇总报告
@@ -770,28 +1591,32 @@ class KPICollector:
         summary = {}
         
         summary['buffer_overflow_events'] = len(self.buffer_overflows)
-        summary['total_overflow_pallets'] = sum(e['pallets'] for e in self.buffer_overflows)
+        summary['total_overflow_pallets'] = self.buffer_overflows.total('pallets')
         
         if self.truck_wait_times:
-            wait_times = [w['wait_time'] for w in self.truck_wait_times]
-            summary['avg_truck_wait_time'] = np.mean(wait_times)
-            summary['max_truck_wait_time'] = np.max(wait_times)
-            summary['p95_truck_wait_time'] = np.percentile(wait_times, 95)
+            summary['avg_truck_wait_time'] = self.truck_wait_times.mean('wait_time')
+            summary['max_truck_wait_time'] = self.truck_wait_times.max('wait_time')
+            summary['p95_truck_wait_time'] = self.truck_wait_times.quantile('wait_time', 0.95)
         else:
             summary['avg_truck_wait_time'] = 0
             summary['max_truck_wait_time'] = 0
             summary['p95_truck_wait_time'] = 0
         
+        outbound = self.outbound_operations
+        inbound = self.inbound_operations
+        
         # 按地区统计准时率（FG Outbound）
-        fg_outbound_completed = [o for o in self.outbound_operations if o['category'] == 'FG']
-        for region in ['G2', 'ROW']:
-            # 匹配region前缀（G2_same_day, G2_next_day, ROW_next_day都应该匹配）
-            region_orders = [o for o in fg_outbound_completed 
-                            if o.get('region', '').startswith(region)]
-            if region_orders:
-                region_on_time = sum(1 for o in region_orders if o['on_time'])
-                summary[f'{region}_on_time_rate'] = region_on_time / len(region_orders)
-                summary[f'{region}_total_orders'] = len(region_orders)
+        # 匹配region前缀（G2_same_day, G2_next_day, ROW_next_day都应该匹配）
+        region_filters = {
+            region: {'category': 'FG', 'region': lambda r, p=region: (r or '').startswith(p)}
+            for region in ['G2', 'ROW']
+        }
+        for region, region_filter in region_filters.items():
+            region_total = outbound.count(**region_filter)
+            if region_total:
+                region_on_time = int(outbound.total('on_time', **region_filter))
+                summary[f'{region}_on_time_rate'] = region_on_time / region_total
+                summary[f'{region}_total_orders'] = region_total
             else:
                 summary[f'{region}_on_time_rate'] = 0.0
                 summary[f'{region}_total_orders'] = 0
@@ -799,13 +1624,11 @@ class KPICollector:
         # Inbound 24h 延期统计
         if self.inbound_delays:
             summary['total_inbound_delays'] = len(self.inbound_delays)
-            summary['total_delayed_pallets'] = sum(d['pallets'] for d in self.inbound_delays)
-            summary['avg_inbound_delay_hours'] = np.mean([d['delay_hours'] for d in self.inbound_delays])
-            summary['max_inbound_delay_hours'] = max([d['delay_hours'] for d in self.inbound_delays])
-            fg_delays = [d for d in self.inbound_delays if d['category'] == 'FG']
-            rp_delays = [d for d in self.inbound_delays if d['category'] == 'R&P']
-            summary['fg_inbound_delays'] = len(fg_delays)
-            summary['rp_inbound_delays'] = len(rp_delays)
+            summary['total_delayed_pallets'] = self.inbound_delays.total('pallets')
+            summary['avg_inbound_delay_hours'] = self.inbound_delays.mean('delay_hours')
+            summary['max_inbound_delay_hours'] = self.inbound_delays.max('delay_hours')
+            summary['fg_inbound_delays'] = self.inbound_delays.count(category='FG')
+            summary['rp_inbound_delays'] = self.inbound_delays.count(category='R&P')
         else:
             summary['total_inbound_delays'] = 0
             summary['total_delayed_pallets'] = 0
@@ -816,35 +1639,30 @@ class KPICollector:
         
         # 午夜积压统计
         if self.midnight_backlogs:
-            summary['avg_midnight_backlog_orders'] = np.mean([b['pending_orders'] for b in self.midnight_backlogs])
-            summary['avg_midnight_backlog_pallets'] = np.mean([b['pending_pallets'] for b in self.midnight_backlogs])
-            summary['max_midnight_backlog_pallets'] = max([b['pending_pallets'] for b in self.midnight_backlogs])
+            summary['avg_midnight_backlog_orders'] = self.midnight_backlogs.mean('pending_orders')
+            summary['avg_midnight_backlog_pallets'] = self.midnight_backlogs.mean('pending_pallets')
+            summary['max_midnight_backlog_pallets'] = self.midnight_backlogs.max('pending_pallets')
         else:
             summary['avg_midnight_backlog_orders'] = 0
             summary['avg_midnight_backlog_pallets'] = 0
             summary['max_midnight_backlog_pallets'] = 0
         
         # 流量统计（托盘和订单）
-        summary['total_inbound_pallets'] = sum(o['pallets'] for o in self.inbound_operations)
-        summary['total_outbound_pallets'] = sum(o['pallets'] for o in self.outbound_operations)
-        summary['total_inbound_orders'] = sum(o.get('order_count', 1) for o in self.inbound_operations)
-        summary['total_outbound_orders'] = sum(o.get('order_count', 1) for o in self.outbound_operations)
+        summary['total_inbound_pallets'] = inbound.total('pallets')
+        summary['total_outbound_pallets'] = outbound.total('pallets')
+        summary['total_inbound_orders'] = int(inbound.total('order_count'))
+        summary['total_outbound_orders'] = int(outbound.total('order_count'))
         
         for category in ['FG', 'R&P']:
-            inbound_cat = [o for o in self.inbound_operations if o['category'] == category]
-            outbound_cat = [o for o in self.outbound_operations if o['category'] == category]
-            summary[f'{category}_inbound_pallets'] = sum(o['pallets'] for o in inbound_cat)
-            summary[f'{category}_outbound_pallets'] = sum(o['pallets'] for o in outbound_cat)
-            summary[f'{category}_inbound_orders'] = sum(o.get('order_count', 1) for o in inbound_cat)
-            summary[f'{category}_outbound_orders'] = sum(o.get('order_count', 1) for o in outbound_cat)
+            summary[f'{category}_inbound_pallets'] = inbound.total('pallets', category=category)
+            summary[f'{category}_outbound_pallets'] = outbound.total('pallets', category=category)
+            summary[f'{category}_inbound_orders'] = int(inbound.total('order_count', category=category))
+            summary[f'{category}_outbound_orders'] = int(outbound.total('order_count', category=category))
         
         # 按地区统计 FG 出库
-        fg_outbound = [o for o in self.outbound_operations if o['category'] == 'FG']
-        for region in ['G2', 'ROW']:
-            # 匹配region前缀（G2_same_day, G2_next_day, ROW_next_day都应该匹配）
-            fg_region = [o for o in fg_outbound if o.get('region', '').startswith(region)]
-            summary[f'FG_{region}_outbound_pallets'] = sum(o['pallets'] for o in fg_region)
-            summary[f'FG_{region}_outbound_orders'] = sum(o.get('order_count', 1) for o in fg_region)
+        for region, region_filter in region_filters.items():
+            summary[f'FG_{region}_outbound_pallets'] = outbound.total('pallets', **region_filter)
+            summary[f'FG_{region}_outbound_orders'] = int(outbound.total('order_count', **region_filter))
         
         # ========== FTE利用率统计（简化版）==========
         # 逻辑很简单：
@@ -908,10 +1726,10 @@ class KPICollector:
             }
         
         # 从已记录的操作中统计托盘数
-        fg_inbound_pallets = sum(o['pallets'] for o in self.inbound_operations if o['category'] == 'FG')
-        fg_outbound_pallets = sum(o['pallets'] for o in self.outbound_operations if o['category'] == 'FG')
-        rp_inbound_pallets = sum(o['pallets'] for o in self.inbound_operations if o['category'] == 'R&P')
-        rp_outbound_pallets = sum(o['pallets'] for o in self.outbound_operations if o['category'] == 'R&P')
+        fg_inbound_pallets = summary['FG_inbound_pallets']
+        fg_outbound_pallets = summary['FG_outbound_pallets']
+        rp_inbound_pallets = summary['R&P_inbound_pallets']
+        rp_outbound_pallets = summary['R&P_outbound_pallets']
         
         # 理论需求FTE = 托盘数 / 效率（如果要按标准效率完成这些工作，理论上需要多少FTE）
         fg_inbound_fte_needed = fg_inbound_pallets / FTE_EFFICIENCY['FG']
@@ -958,103 +1776,83 @@ class KPICollector:
         summary['total_fte_available'] = total_fte_available
         
         # 缓冲区平均占用率
+        occupancy = self.hourly_buffer_occupancy
         for category in ['R&P', 'FG']:
-            if category in self.hourly_buffer_occupancy:
-                occupancy_rates = [o['occupancy_rate'] for o in self.hourly_buffer_occupancy[category]]
-                summary[f'{category.lower()}_avg_buffer_occupancy'] = np.mean(occupancy_rates)
+            if occupancy.count(category=category):
+                summary[f'{category.lower()}_avg_buffer_occupancy'] = occupancy.mean('occupancy_rate', category=category)
             else:
                 summary[f'{category.lower()}_avg_buffer_occupancy'] = 0
         
-        # Timeslot利用率统计（新增）
-        if self.dock_usage:
-            df_usage = pd.DataFrame(self.dock_usage)
-
-            # 总体利用率（加权口径）：sum(used) / sum(available)
-            total_available = df_usage['available'].sum()
-            total_used = df_usage['used'].sum()
-            summary['avg_dock_utilization'] = (total_used / total_available) if total_available > 0 else 0
-            
-            # 按小时统计利用率（保留hourly数据用于可视化，包含used和available原始数值）
-            hourly_utilization = {}
-            for category in ['FG', 'R&P']:
-                for direction in ['inbound', 'outbound']:
-                    dock_type = 'reception' if direction == 'inbound' else 'loading'
-                    key = f'{category}_{direction}'
-                    
-                    # 筛选对应的数据
-                    filtered_data = df_usage[(df_usage['category'] == category) & 
-                                            (df_usage['dock_type'] == dock_type)]
-                    
-                    if len(filtered_data) > 0:
-                        # 按小时分组，计算平均used和available（以及utilization）
-                        hourly_stats = {}
-                        for hour in sorted(filtered_data['hour'].unique()):
-                            hour_data = filtered_data[filtered_data['hour'] == hour]
-                            hourly_stats[hour] = {
-                                'utilization': hour_data['utilization'].mean(),
-                                'used': hour_data['used'].mean(),
-                                'available': hour_data['available'].mean()
-                            }
-                        hourly_utilization[key] = hourly_stats
-                    else:
-                        hourly_utilization[key] = {}
-            
-            summary['hourly_dock_utilization'] = hourly_utilization
-            
-            # 按码头类型统计
-            for dock_type in ['loading', 'reception']:
-                type_data = df_usage[df_usage['dock_type'] == dock_type]
-                if len(type_data) > 0:
-                    type_avail = type_data['available'].sum()
-                    type_used = type_data['used'].sum()
-                    summary[f'{dock_type}_avg_utilization'] = (type_used / type_avail) if type_avail > 0 else 0
-                    summary[f'{dock_type}_peak_utilization'] = type_data['utilization'].max()
-                else:
-                    summary[f'{dock_type}_avg_utilization'] = 0
-                    summary[f'{dock_type}_peak_utilization'] = 0
-            
-            # 按类别统计
-            for category in ['FG', 'R&P']:
-                cat_data = df_usage[df_usage['category'] == category]
-                if len(cat_data) > 0:
-                    cat_avail = cat_data['available'].sum()
-                    cat_used = cat_data['used'].sum()
-                    summary[f'{category}_dock_avg_utilization'] = (cat_used / cat_avail) if cat_avail > 0 else 0
-                else:
-                    summary[f'{category}_dock_avg_utilization'] = 0
-            
-            # 按类别和方向统计（FG/R&P × Inbound/Outbound）
-            for category in ['FG', 'R&P']:
-                # Inbound = Reception码头
-                inbound_data = df_usage[(df_usage['category'] == category) & (df_usage['dock_type'] == 'reception')]
-                if len(inbound_data) > 0:
-                    in_avail = inbound_data['available'].sum()
-                    in_used = inbound_data['used'].sum()
-                    summary[f'{category}_inbound_utilization'] = (in_used / in_avail) if in_avail > 0 else 0
-                else:
-                    summary[f'{category}_inbound_utilization'] = 0
-                
-                # Outbound = Loading码头
-                outbound_data = df_usage[(df_usage['category'] == category) & (df_usage['dock_type'] == 'loading')]
-                if len(outbound_data) > 0:
-                    out_avail = outbound_data['available'].sum()
-                    out_used = outbound_data['used'].sum()
-                    summary[f'{category}_outbound_utilization'] = (out_used / out_avail) if out_avail > 0 else 0
-                else:
-                    summary[f'{category}_outbound_utilization'] = 0
-        else:
-            summary['avg_dock_utilization'] = 0
-            summary['hourly_dock_utilization'] = {}
-            summary['loading_avg_utilization'] = 0
-            summary['loading_peak_utilization'] = 0
-            summary['reception_avg_utilization'] = 0
-            summary['reception_peak_utilization'] = 0
-            summary['FG_dock_avg_utilization'] = 0
-            summary['R&P_dock_avg_utilization'] = 0
-            summary['FG_inbound_utilization'] = 0
-            summary['FG_outbound_utilization'] = 0
-            summary['R&P_inbound_utilization'] = 0
-            summary['R&P_outbound_utilization'] = 0
+        # Timeslot利用率统计：一次按 (category, dock_type, hour) 分组，全部码头指标都由分组结果汇总
+        summary.update(self._dock_usage_summary())
+        
+        return summary
+    
+    def _dock_usage_summary(self):
+        """码头Timeslot利用率指标（avg/peak、按类型/类别/方向、以及 hourly_dock_utilization）
+        
+        dock_usage 只分组一次：(category, dock_type, hour) -> 行数 / sum(used) / sum(available) /
+        sum(utilization) / max(utilization)，其余口径都在分组结果（最多 2×2×24 组）上合并。
+        两种KPI模式的分组结果相同，summary-only 模式下分组就是在线累计的结果。
+        """
+        summary = {
+            'avg_dock_utilization': 0,
+            'hourly_dock_utilization': {},
+            'loading_avg_utilization': 0,
+            'loading_peak_utilization': 0,
+            'reception_avg_utilization': 0,
+            'reception_peak_utilization': 0,
+            'FG_dock_avg_utilization': 0,
+            'R&P_dock_avg_utilization': 0,
+            'FG_inbound_utilization': 0,
+            'FG_outbound_utilization': 0,
+            'R&P_inbound_utilization': 0,
+            'R&P_outbound_utilization': 0,
+        }
+        if not self.dock_usage:
+            return summary
+        
+        groups = self.dock_usage.grouped(('category', 'dock_type', 'hour'), ('used', 'available', 'utilization'))
+        
+        def _ratio(selected):
+            used_total = sum(sums['used'] for _count, sums, _maxes in selected)
+            available_total = sum(sums['available'] for _count, sums, _maxes in selected)
+            return (used_total / available_total) if available_total > 0 else 0
+        
+        # 总体利用率（加权口径）：sum(used) / sum(available)
+        summary['avg_dock_utilization'] = _ratio(groups.values())
+        
+        # 按码头类型统计
+        for dock_type in ['loading', 'reception']:
+            selected = [g for (_c, d, _h), g in groups.items() if d == dock_type]
+            if selected:
+                summary[f'{dock_type}_avg_utilization'] = _ratio(selected)
+                summary[f'{dock_type}_peak_utilization'] = max(maxes['utilization'] for _count, _sums, maxes in selected)
+        
+        # 按类别统计
+        for category in ['FG', 'R&P']:
+            selected = [g for (c, _d, _h), g in groups.items() if c == category]
+            if selected:
+                summary[f'{category}_dock_avg_utilization'] = _ratio(selected)
+        
+        # 按类别和方向统计（Inbound = Reception码头，Outbound = Loading码头）；
+        # 同时按小时统计利用率（保留hourly数据用于可视化，包含used和available的小时平均值）
+        hourly_utilization = {}
+        for category in ['FG', 'R&P']:
+            for direction in ['inbound', 'outbound']:
+                dock_type = 'reception' if direction == 'inbound' else 'loading'
+                selected = sorted((h, g) for (c, d, h), g in groups.items() if c == category and d == dock_type)
+                if selected:
+                    summary[f'{category}_{direction}_utilization'] = _ratio([g for _h, g in selected])
+                hourly_utilization[f'{category}_{direction}'] = {
+                    hour: {
+                        'utilization': sums['utilization'] / count,
+                        'used': sums['used'] / count,
+                        'available': sums['available'] / count
+                    }
+                    for hour, (count, sums, _maxes) in selected
+                }
+        summary['hourly_dock_utilization'] = hourly_utilization
         
         return summary
     
@@ -1066,19 +1864,23 @@ class KPICollector:
             summary_df = pd.DataFrame([summary])
             summary_df.to_excel(writer, sheet_name='Summary', index=False)
             
+            # summary-only 模式没有逐条记录
+            if self.summary_only:
+                return
+            
             # 其他详细数据（如果有）
             if self.buffer_overflows:
-                pd.DataFrame(self.buffer_overflows).to_excel(writer, sheet_name='Buffer_Overflows', index=False)
+                self.buffer_overflows.to_frame().to_excel(writer, sheet_name='Buffer_Overflows', index=False)
             if self.truck_wait_times:
-                pd.DataFrame(self.truck_wait_times).to_excel(writer, sheet_name='Truck_Wait_Times', index=False)
+                self.truck_wait_times.to_frame().to_excel(writer, sheet_name='Truck_Wait_Times', index=False)
             if self.sla_misses:
-                pd.DataFrame(self.sla_misses).to_excel(writer, sheet_name='SLA_Misses', index=False)
+                self.sla_misses.to_frame().to_excel(writer, sheet_name='SLA_Misses', index=False)
             if self.completed_orders:
-                pd.DataFrame(self.completed_orders).to_excel(writer, sheet_name='Completed_Orders', index=False)
+                self.completed_orders.to_frame().to_excel(writer, sheet_name='Completed_Orders', index=False)
             if self.midnight_backlogs:
-                pd.DataFrame(self.midnight_backlogs).to_excel(writer, sheet_name='Midnight_Backlogs', index=False)
+                self.midnight_backlogs.to_frame().to_excel(writer, sheet_name='Midnight_Backlogs', index=False)
             if self.fte_usage:
-                pd.DataFrame(self.fte_usage).to_excel(writer, sheet_name='FTE_Usage', index=False)
+                self.fte_usage.to_frame().to_excel(writer, sheet_name='FTE_Usage', index=False)
                 
                 # 创建FTE汇总统计表
                 fte_summary_data = []
@@ -1105,17 +1907,15 @@ class KPICollector:
                         })
                 
                 # 总体统计
-                total_fte_used = sum(f['fte_used'] for f in self.fte_usage)
+                total_fte_used = self.fte_usage.column('fte_used').sum()
                 
-                # 正确的总可用FTE计算
-                unique_fte_configs = {}
-                for f in self.fte_usage:
-                    key = f"{f['category']}_{f['direction']}"
-                    if key not in unique_fte_configs:
-                        unique_fte_configs[key] = f['available_fte']
-                total_fte_available = sum(unique_fte_configs.values())
+                # 正确的总可用FTE计算：每个 category×direction 取第一条记录的配置FTE
+                fte_keys = (self.fte_usage.column('category').astype(np.int64) * len(self.fte_usage.labels('direction'))
+                            + self.fte_usage.column('direction'))
+                _, first_rows = np.unique(fte_keys, return_index=True)
+                total_fte_available = self.fte_usage.column('available_fte')[np.sort(first_rows)].sum()
                 
-                total_pallets = sum(f['pallets_processed'] for f in self.fte_usage)
+                total_pallets = self.fte_usage.column('pallets_processed').sum()
                 
                 fte_summary_data.append({'Metric': 'Total FTE Used', 'Value': total_fte_used})
                 fte_summary_data.append({'Metric': 'Total FTE Available (Configured)', 'Value': total_fte_available})
@@ -1125,31 +1925,98 @@ class KPICollector:
                 fte_summary_df = pd.DataFrame(fte_summary_data)
                 fte_summary_df.to_excel(writer, sheet_name='FTE_Summary', index=False)
             if self.dock_usage:
-                pd.DataFrame(self.dock_usage).to_excel(writer, sheet_name='Dock_Usage', index=False)
+                self.dock_usage.to_frame().to_excel(writer, sheet_name='Dock_Usage', index=False)
             if self.inbound_operations:
-                pd.DataFrame(self.inbound_operations).to_excel(writer, sheet_name='Inbound_Operations', index=False)
+                self.inbound_operations.to_frame().to_excel(writer, sheet_name='Inbound_Operations', index=False)
             if self.outbound_operations:
-                pd.DataFrame(self.outbound_operations).to_excel(writer, sheet_name='Outbound_Operations', index=False)
+                self.outbound_operations.to_frame().to_excel(writer, sheet_name='Outbound_Operations', index=False)
 
 
 # ==================== 订单流程追踪器 ====================
 
+class _TrackerFormatter(string.Formatter):
+    """追踪叙述模板的格式化器：额外支持 {field!t}，把仿真小时转换为 'Day X, HH:MM'"""
+
+    def convert_field(self, value, conversion):
+        if conversion == 't':
+            return OrderTracker._sim_time_to_str(value)
+        return super().convert_field(value, conversion)
+
+
 class OrderTracker:
     """订单全流程追踪器 - 记录每个订单从生成到完成的完整事件日志
     
     用于演示/展示时详细展示单个订单的生命周期。
+    
+    仿真中只记录 (订单, 事件代码, 时刻, 原始字段)，叙述文字按 EVENT_TEMPLATES 在读取 event_log /
+    order_summary 或导出时才生成；未启用或订单不在追踪列表里时 log_event 直接返回。
     """
     
-    def __init__(self, enabled=False, track_order_ids=None):
+    # 事件代码 -> 叙述模板。字符串模板可用 {order.xxx}（订单的不可变字段）、{sim_time} 和 log_event 传入的字段，
+    # {x!t} 表示按仿真时间格式化；需要计算的叙述用函数，参数是同样内容的dict
+    EVENT_TEMPLATES = {
+        'ORDER_ARRIVED': ('Order enters scheduler queue. Pallets={order.pallets}, Region={order.region}, '
+                          'Timeslot={order.timeslot_time!t}, Est.Prep={est_prep:.2f}h, '
+                          'Latest_Start={latest_start!t}, Status={status}'),
+        'DISPATCHED': ('Dispatched from priority queue (#{dispatch_rank}). '
+                       'Queue remaining={queue_remaining}, Latest_Start={latest_start!t}'),
+        'PREP_START': ('Preparation started. Total pallets={total_pallets}, DC open={dc_open}, '
+                       'Timeslot={order.timeslot_time!t}'),
+        'PREP_TIMESLOT_REACHED': lambda e: (
+            f"Timeslot reached before prep complete. Processed={e['processed']:.0f}/{e['total_pallets']} pallets "
+            f"({e['processed'] / e['total_pallets'] * 100:.1f}%)"),
+        'PREP_DC_CLOSED': ('DC closed. Waiting until next open={next_open!t}. '
+                           'Progress={processed:.0f}/{total_pallets} pallets'),
+        'PREP_PROGRESS': lambda e: (
+            f"Work session #{e['session']}: +{e['pallets_added']:.1f} pallets in {e['duration']:.2f}h "
+            f"(capacity={e['hourly_capacity']:.1f}p/h). Total={e['pallets_done']:.0f}/{e['total_pallets']} "
+            f"({e['pallets_done'] / e['total_pallets'] * 100:.1f}%)"),
+        'PREP_COMPLETE': lambda e: (
+            f"Preparation completed! All {e['total_pallets']} pallets ready. Duration={e['duration']:.2f}h. "
+            f"Time until timeslot={e['order'].timeslot_time - e['sim_time']:.2f}h"
+            if e['order'].timeslot_time else f"Duration={e['duration']:.2f}h"),
+        'LOADING_WAIT_TIMESLOT': 'Waiting for scheduled timeslot={order.timeslot_time!t}. Prep completed={prep_completed}',
+        'LOADING_PREP_NOT_READY': ('Timeslot reached but preparation NOT complete! '
+                                   'Prepared={prepared:.0f}/{order.pallets} pallets. Order will be DELAYED and rescheduled.'),
+        'LOADING_RESCHEDULED': 'Rescheduled to new timeslot={new_slot!t} (original={order.timeslot_time!t})',
+        'LOADING_PREP_READY': 'Preparation already complete. Ready for loading at scheduled timeslot.',
+        'LOADING_WAIT_CAPACITY': 'Dock capacity full (used={used}/{capacity}). Waiting for next hour.',
+        'LOADING_START': ('Loading started at dock. Actual timeslot={sim_time!t}, '
+                          'Scheduled={order.timeslot_time!t}, On-time={on_time}'),
+        'LOADING_COMPLETE': 'Loading complete! Truck departs. Pallets={order.pallets}, On-time={on_time}, Delay={delay_hours}h',
+        'INBOUND_ARRIVAL': 'Truck arrives at reception dock. Pallets={order.pallets}, Timeslot={order.timeslot_time!t}',
+        'INBOUND_WAIT_CAPACITY': 'Reception dock full (used={used}/{capacity}). Waiting.',
+        'INBOUND_UNLOADING': 'Unloading started (1 hour). Pallets={order.pallets}',
+        'INBOUND_PROCESSING_START': 'Unloading complete. FTE processing starts. Deadline={deadline!t} (24h window)',
+        'INBOUND_DEADLINE_EXCEEDED': '24h processing deadline exceeded! Processed={processed:.0f}/{total_pallets}',
+        'INBOUND_DC_CLOSED': 'DC closed. Wait until {next_open!t}. Progress={processed:.0f}/{total_pallets}',
+        'INBOUND_COMPLETE': lambda e: (
+            f"Inbound processing complete. Pallets={e['total_pallets']}, "
+            f"Total time={e['sim_time'] - e['unloading_start']:.2f}h, "
+            f"Within deadline={e['sim_time'] <= e['deadline']}"),
+    }
+    
+    _formatter = _TrackerFormatter()
+    
+    def __init__(self, enabled=False, track_order_ids=None, event_store_dir=None,
+                 chunk_size=event_store.DEFAULT_CHUNK_SIZE):
         """
         Args:
             enabled: 是否启用追踪
             track_order_ids: 要追踪的订单ID列表（None=追踪所有订单）
+            event_store_dir: 事件日志写入的磁盘目录（None=保存在内存里）。
+                设置后事件按 chunk_size 分块写成列式文件（见 event_store.py），
+                内存里只保留每个订单的汇总，适合追踪全年订单。
+                目录须为新目录、空目录或之前的事件日志（会被覆盖），否则抛出 ValueError
         """
         self.enabled = enabled
         self.track_order_ids = set(track_order_ids) if track_order_ids else None
-        self.event_log = []  # 详细事件日志
-        self.order_summary = {}  # 每个订单的关键时间戳汇总
+        self.event_store = (event_store.EventLogStore(event_store_dir, chunk_size=chunk_size)
+                            if event_store_dir else None)
+        self._events = []       # (OrderRecord, 事件代码, 时刻, details, 原始字段)；磁盘模式下不使用
+        self._event_rows = []   # 已格式化的 event_log 行（按需增量生成）
+        self._orders = {}       # order_id -> (OrderRecord, {事件代码: 最近一次时刻}, 最终状态, 事件下标列表)
+        self._order_summary = None
     
     def _should_track(self, order):
         """判断是否需要追踪该订单"""
@@ -1159,7 +2026,8 @@ class OrderTracker:
             return True
         return order.order_id in self.track_order_ids
     
-    def _sim_time_to_str(self, sim_time):
+    @staticmethod
+    def _sim_time_to_str(sim_time):
         """将仿真时间（小时）转换为可读字符串 Day X, HH:00"""
         if sim_time is None:
             return 'N/A'
@@ -1168,57 +2036,157 @@ class OrderTracker:
         minute = int((sim_time % 1) * 60)
         return f'Day {day}, {hour:02d}:{minute:02d}'
     
-    def log_event(self, order, event_type, sim_time, details='', **extra):
-        """记录一个追踪事件"""
+    def log_event(self, order, event_type, sim_time, details=None, **fields):
+        """记录一个追踪事件
+        
+        Args:
+            details: 现成的描述文字（可选）；不传时按 EVENT_TEMPLATES[event_type] 在读取时生成
+            **fields: 原始字段（数值/布尔/仿真时刻），供模板使用，同时作为 Event_Log 的附加列
+        """
         if not self._should_track(order):
             return
         
+        record = order._record
+        entry = self._orders.get(record.order_id)
+        if entry is None:
+            entry = self._orders[record.order_id] = (record, {}, {}, [])
+        if self.event_store is not None:
+            self.event_store.append(record.order_id, event_type, sim_time, details, fields)
+        else:
+            entry[3].append(len(self._events))
+            self._events.append((record, event_type, sim_time, details, fields))
+        entry[1][event_type] = sim_time
+        self._order_summary = None
+    
+    def finalize_order(self, order, sim_time):
+        """订单完成时的最终汇总"""
+        if not self._should_track(order):
+            return
+        entry = self._orders.get(order.order_id)
+        if entry is not None:
+            entry[2].update({
+                'completed': order.completed,
+                'on_time': getattr(order, 'on_time', None),
+                'delay_hours': getattr(order, 'delay_hours', 0),
+                'actual_timeslot': getattr(order, 'actual_timeslot', None),
+                'scheduled_timeslot': int(order.timeslot_time) if order.timeslot_time is not None else None,
+                'final_time': sim_time,
+            })
+            self._order_summary = None
+    
+    def format_details(self, record, event_type, sim_time, fields):
+        """按模板生成一条事件的叙述文字"""
+        template = self.EVENT_TEMPLATES.get(event_type)
+        context = dict(fields, order=record, sim_time=sim_time)
+        if template is None:
+            return ', '.join(f'{k}={v}' for k, v in fields.items())
+        if callable(template):
+            return template(context)
+        return self._formatter.vformat(template, (), context)
+    
+    def _event_row(self, record, event_type, sim_time, details, fields):
         event = {
-            'order_id': order.order_id,
-            'category': order.category,
-            'direction': order.direction,
+            'order_id': record.order_id,
+            'category': record.category,
+            'direction': record.direction,
             'event_type': event_type,
             'sim_time_h': round(sim_time, 3),
             'readable_time': self._sim_time_to_str(sim_time),
-            'details': details,
+            'details': details if details is not None else self.format_details(record, event_type, sim_time, fields),
         }
-        event.update(extra)
-        self.event_log.append(event)
-        
-        # 初始化汇总记录
-        oid = order.order_id
-        if oid not in self.order_summary:
-            self.order_summary[oid] = {
-                'order_id': oid,
-                'category': order.category,
-                'direction': order.direction,
-                'pallets': order.pallets,
-                'region': getattr(order, 'region', None),
-            }
+        event.update(fields)
+        return event
+    
+    @property
+    def event_count(self):
+        if self.event_store is not None:
+            return self.event_store.event_count
+        return len(self._events)
+    
+    @property
+    def event_log(self):
+        """详细事件日志（list of dict）；首次读取时才格式化，之后只格式化新增事件
         
-        # 更新汇总时间戳
-        ts_key = event_type.lower().replace(' ', '_')
-        self.order_summary[oid][f'{ts_key}_time'] = round(sim_time, 3)
-        self.order_summary[oid][f'{ts_key}_readable'] = self._sim_time_to_str(sim_time)
+        磁盘模式下每次读取都会从事件存储里重新生成全部行，大日志请用 iter_event_chunks / events_for
+        """
+        if self.event_store is not None:
+            return [row for rows in self.iter_event_chunks() for row in rows]
+        for event in self._events[len(self._event_rows):]:
+            self._event_rows.append(self._event_row(*event))
+        return self._event_rows
     
-    def finalize_order(self, order, sim_time):
-        """订单完成时的最终汇总"""
-        if not self._should_track(order):
+    def iter_event_chunks(self):
+        """按块生成 event_log 行（内存模式下只有一块）"""
+        if self.event_store is None:
+            if self.event_log:
+                yield self.event_log
             return
-        oid = order.order_id
-        if oid in self.order_summary:
-            s = self.order_summary[oid]
-            s['completed'] = order.completed
-            s['on_time'] = getattr(order, 'on_time', None)
-            s['delay_hours'] = getattr(order, 'delay_hours', 0)
-            s['actual_timeslot'] = getattr(order, 'actual_timeslot', None)
-            s['scheduled_timeslot'] = int(order.timeslot_time) if order.timeslot_time is not None else None
-            s['final_time'] = round(sim_time, 3)
-            s['final_readable'] = self._sim_time_to_str(sim_time)
+        for rows in self.event_store.iter_chunks():
+            yield [self._event_row(self._orders[oid][0], event_type, sim_time, details, fields)
+                   for oid, event_type, sim_time, details, fields in rows]
+    
+    def events_for(self, order_id):
+        """单个订单的 event_log 行（按订单索引读取，不扫描全部日志）"""
+        entry = self._orders.get(order_id)
+        if entry is None:
+            return []
+        if self.event_store is not None:
+            return [self._event_row(entry[0], event_type, sim_time, details, fields)
+                    for _oid, event_type, sim_time, details, fields in self.event_store.events_for(order_id)]
+        rows = self.event_log
+        return [rows[i] for i in entry[3]]
+    
+    def write_event_log(self, writer, sheet_name='Event_Log'):
+        """逐块把事件日志写入 ExcelWriter 的一个sheet（超出Excel行数上限的部分截断）
+        
+        Returns:
+            写入的事件数
+        """
+        max_rows = 1048575
+        columns = None
+        if self.event_store is not None:
+            columns = (['order_id', 'category', 'direction', 'event_type', 'sim_time_h', 'readable_time', 'details']
+                       + self.event_store.field_names)
+        written = 0
+        for rows in self.iter_event_chunks():
+            rows = rows[:max_rows - written]
+            if not rows:
+                break
+            pd.DataFrame(rows, columns=columns).to_excel(writer, sheet_name=sheet_name, index=False,
+                                                         header=written == 0,
+                                                         startrow=0 if written == 0 else written + 1)
+            written += len(rows)
+        if written < self.event_count:
+            print(f'OrderTracker: 事件数 {self.event_count} 超过Excel行数上限，{sheet_name} 只写入前 {written} 条')
+        return written
+    
+    @property
+    def order_summary(self):
+        """每个订单的关键时间戳汇总（order_id -> dict）；有新事件后首次读取时重新生成"""
+        if self._order_summary is None:
+            self._order_summary = {}
+            for oid, (record, event_times, final, _events) in self._orders.items():
+                summary = {
+                    'order_id': oid,
+                    'category': record.category,
+                    'direction': record.direction,
+                    'pallets': record.pallets,
+                    'region': record.region,
+                }
+                for event_type, sim_time in event_times.items():
+                    ts_key = event_type.lower().replace(' ', '_')
+                    summary[f'{ts_key}_time'] = round(sim_time, 3)
+                    summary[f'{ts_key}_readable'] = self._sim_time_to_str(sim_time)
+                if final:
+                    summary.update(final)
+                    summary['final_time'] = round(final['final_time'], 3)
+                    summary['final_readable'] = self._sim_time_to_str(final['final_time'])
+                self._order_summary[oid] = summary
+        return self._order_summary
     
     def export_to_excel(self, filepath):
         """导出追踪日志到Excel"""
-        if not self.event_log:
+        if not self.event_count:
             print('OrderTracker: 无事件日志可导出')
             return
         
@@ -1229,28 +2197,25 @@ class OrderTracker:
                 summary_df.to_excel(writer, sheet_name='Order_Summary', index=False)
             
             # Sheet 2: 完整事件日志
-            log_df = pd.DataFrame(self.event_log)
-            log_df.to_excel(writer, sheet_name='Event_Log', index=False)
+            self.write_event_log(writer, sheet_name='Event_Log')
             
             # Sheet 3: 单个订单详细叙事（取第一个追踪的订单作为示例）
-            if self.event_log:
-                example_id = self.event_log[0]['order_id']
-                example_events = [e for e in self.event_log if e['order_id'] == example_id]
-                example_df = pd.DataFrame(example_events)
-                example_df.to_excel(writer, sheet_name='Example_Order_Detail', index=False)
-                
-                # Sheet 4: 叙述性描述
-                narrative = self._generate_narrative(example_id)
-                narrative_df = pd.DataFrame({'Order Flow Narrative': narrative})
-                narrative_df.to_excel(writer, sheet_name='Example_Narrative', index=False)
+            example_id = next(iter(self._orders))
+            example_df = pd.DataFrame(self.events_for(example_id))
+            example_df.to_excel(writer, sheet_name='Example_Order_Detail', index=False)
+            
+            # Sheet 4: 叙述性描述
+            narrative = self._generate_narrative(example_id)
+            narrative_df = pd.DataFrame({'Order Flow Narrative': narrative})
+            narrative_df.to_excel(writer, sheet_name='Example_Narrative', index=False)
         
         print(f'OrderTracker: 日志已导出到 {filepath}')
         print(f'  - 追踪订单数: {len(self.order_summary)}')
-        print(f'  - 总事件数: {len(self.event_log)}')
+        print(f'  - 总事件数: {self.event_count}')
     
     def _generate_narrative(self, order_id):
         """为单个订单生成叙述性流程描述"""
-        events = [e for e in self.event_log if e['order_id'] == order_id]
+        events = self.events_for(order_id)
         if not events:
             return ['No events found']
         
@@ -1277,21 +2242,278 @@ class OrderTracker:
         return narrative
 
 
+# ==================== 码头Timeslot资源 ====================
+
+def _trigger(env, event, priority, delay=0, value=None):
+    """以指定优先级（simpy.events.URGENT / NORMAL）在 delay 之后触发 event。
+
+    simpy 的 Event.succeed() 只能立即按NORMAL优先级调度，这里直接设置 _ok/_value 再调用 env.schedule，
+    依赖 simpy Event 的内部属性（requirements.txt 因此把 simpy 限定在已验证的 4.0.1 - 4.1.x）；
+    升级simpy时只需检查这一处。
+    """
+    event._ok = True
+    event._value = value
+    env.schedule(event, priority=priority, delay=delay)
+    return event
+
+
+class DockSlotBoard:
+    """按码头类型（fg_loading / rp_reception ...）的每小时timeslot资源。
+
+    容量和已用计数仍然是 DCSimulation.hourly_timeslot_capacity / hourly_timeslot_used，
+    由 timeslot_capacity_manager 每小时设置和重置。拿不到slot的卡车挂起在 request() 返回的事件上，
+    由码头资源代为每小时检查，卡车进程本身直到拿到slot才恢复。
+
+    为了与原 `while used >= available: yield timeout(1)` 的排队顺序和KPI逐位一致，
+    每辆等待的卡车仍保留一个检查事件，位置与原轮询timeout完全相同（失败时刻 +1h, +2h, ...）；
+    检查通过时以URGENT优先级触发该卡车的事件，卡车紧接着恢复，与原来在timeout回调里直接继续等价。
+    """
+
+    def __init__(self, env, capacity: dict, used: dict):
+        self.env = env
+        self.capacity = capacity
+        self.used = used
+        self._waiting = defaultdict(int)
+
+    def request(self, slot_key):
+        """申请当前小时的一个slot。
+
+        Returns:
+            None: 立即拿到slot（计数器已加一）
+            simpy.Event: 需要等待，yield该事件后即拿到slot
+        """
+        if self._try_take(slot_key):
+            return None
+        grant = simpy.Event(self.env)
+        self._waiting[slot_key] += 1
+        self._poll(slot_key, grant)
+        return grant
+
+    def waiting_count(self, slot_key=None):
+        if slot_key is None:
+            return sum(self._waiting.values())
+        return self._waiting[slot_key]
+
+    def _try_take(self, slot_key):
+        if self.used.get(slot_key, 0) < self.capacity.get(slot_key, 0):
+            self.used[slot_key] = self.used.get(slot_key, 0) + 1
+            return True
+        return False
+
+    def _poll(self, slot_key, grant):
+        wake = self.env.timeout(1)
+        wake.callbacks.append(lambda _event: self._check(slot_key, grant))
+
+    def _check(self, slot_key, grant):
+        if not self._try_take(slot_key):
+            self._poll(slot_key, grant)
+            return
+        self._waiting[slot_key] -= 1
+        _trigger(self.env, grant, simpy.events.URGENT)
+
+
+# ==================== 共享人力池 ====================
+
+class LabourJob:
+    """人力池中的一个订单（由 LabourPool.submit 创建）"""
+    __slots__ = ('order', 'pallets', 'latest_start', 'weight', 'base', 'start_tag', 'finish_tag', 'active', 'done')
+
+    def __init__(self, env, order, pallets, latest_start, weight):
+        self.order = order
+        self.pallets = pallets
+        self.latest_start = latest_start
+        self.weight = weight
+        self.base = 0.0  # start_tag 之前已完成的托盘数
+        self.start_tag = 0.0
+        self.finish_tag = 0.0
+        self.active = True
+        self.done = env.event()  # 处理完成时触发，value=托盘数
+
+
+class LabourPool:
+    """某个 category×direction 的共享FTE人力池（加权处理器共享 / fluid model）。
+
+    团队每小时的托盘处理能力在池内所有活动订单之间按权重分配：
+    订单 i 的速率 = rate × w_i / Σw。权重由 latest_start 决定，离最晚开始时间越近权重越大
+    （w = 1 / (1 + 剩余松弛小时)）；松弛随时间减少，所以每当活动集合或速率变化时，
+    所有活动订单的权重都按当前时刻重新计算，等得久的订单不会被后来松弛更小的订单一直压在后面。
+    速率在每次开门时按 FTEManager.get_hourly_capacity 抽取一次（含±5%波动），关门时为0。
+
+    用虚拟时间实现：V 以 rate/Σw 的速度前进，两次变化之间权重不变，订单 i 在
+    V 达到 start_tag_i + 剩余托盘_i / w_i 时完成。完成标签放在堆里，只有活动集合或速率变化时
+    才重新加权并计算下一次完成时刻（每个事件 O(活动订单数)），不需要每个订单自己的推进循环。
+    """
+
+    def __init__(self, sim, category, direction):
+        self.sim = sim
+        self.env = sim.env
+        self.category = category
+        self.direction = direction
+        self.rate = 0.0
+        self.total_weight = 0.0
+        self.virtual_time = 0.0
+        self.active_jobs = 0
+        self._last_update = self.env.now
+        self._heap = []  # (finish_tag, seq, job)，已退出的job惰性删除
+        self._jitter_rng = sim.random_stream(f'capacity_jitter/labour/{category}/{direction}')
+        self._seq = 0
+        self._timer_token = 0
+        self.env.process(self._shift_process())
+
+    def submit(self, order, pallets, latest_start=None):
+        """订单加入人力池，返回 LabourJob（yield job.done 等待完成）"""
+        self._advance()
+        if self.active_jobs == 0:
+            # 池空时重置虚拟时间，避免长时间运行的浮点漂移
+            self.virtual_time = 0.0
+            self._heap.clear()
+
+        job = LabourJob(self.env, order, pallets, latest_start, self._weight(latest_start))
+        job.start_tag = self.virtual_time
+        job.finish_tag = self.virtual_time + pallets / job.weight
+        heapq.heappush(self._heap, (job.finish_tag, self._seq, job))
+        self._seq += 1
+        self.total_weight += job.weight
+        self.active_jobs += 1
+        self._reschedule()
+        return job
+
+    def processed(self, job):
+        """job 目前已完成的托盘数"""
+        if not job.active:
+            return job.pallets if job.done.triggered else job.base
+        self._advance()
+        return self._processed_at(job, self.virtual_time)
+
+    def _weight(self, latest_start):
+        slack = 0.0 if latest_start is None else max(0.0, latest_start - self.env.now)
+        return 1.0 / (1.0 + slack)
+
+    @staticmethod
+    def _processed_at(job, virtual_time):
+        return min(job.pallets, job.base + (virtual_time - job.start_tag) * job.weight)
+
+    def withdraw(self, job):
+        """未完成的订单退出人力池（到达timeslot/deadline），返回已完成的托盘数"""
+        processed = self.processed(job)
+        if job.active:
+            self._remove(job)
+            self._reschedule()
+        return processed
+
+    def _shift_process(self):
+        """开门时抽取本班次的处理速率，关门时速率归零"""
+        while True:
+            time_until_close = self.sim._time_until_close()
+            if self.sim.is_dc_open() and time_until_close > 0:
+                self._set_rate(self.sim.fte_manager.get_hourly_capacity(
+                    self.category, self.direction, coefficient=self.sim.opening_hour_coefficient,
+                    rng=self._jitter_rng))
+                yield self.env.timeout(time_until_close)
+            else:
+                self._set_rate(0.0)
+                yield self.env.timeout(max(0.0, self.sim._next_open_time() - self.env.now))
+
+    def _set_rate(self, rate):
+        self._advance()
+        self.rate = max(0.0, rate)
+        self._reschedule()
+
+    def _advance(self):
+        now = self.env.now
+        if self.total_weight > 0 and self.rate > 0:
+            self.virtual_time += (now - self._last_update) * self.rate / self.total_weight
+        self._last_update = now
+
+    def _remove(self, job):
+        job.base = self._processed_at(job, self.virtual_time)
+        job.active = False
+        self.active_jobs -= 1
+        self.total_weight -= job.weight
+        if self.active_jobs == 0:
+            self.total_weight = 0.0
+
+    def _reschedule(self):
+        """完成所有已到期的订单，并重新安排下一次完成时刻"""
+        heap = self._heap
+        while heap and (not heap[0][2].active or heap[0][0] <= self.virtual_time + 1e-9 * max(1.0, heap[0][0])):
+            _, _, job = heapq.heappop(heap)
+            if job.active:
+                self._remove(job)
+                job.done.succeed(job.pallets)
+        self._reweight()
+
+        self._timer_token += 1
+        if not heap or self.rate <= 0:
+            return
+        delay = (heap[0][0] - self.virtual_time) * self.total_weight / self.rate
+        token = self._timer_token
+        timer = self.env.timeout(max(0.0, delay))
+        timer.callbacks.append(lambda _event, token=token: self._on_timer(token))
+
+    def _reweight(self):
+        """按当前时刻重新计算活动订单的权重，并重建完成堆（同时去掉已退出的job）"""
+        virtual_time = self.virtual_time
+        heap = []
+        total_weight = 0.0
+        for _, seq, job in self._heap:
+            if not job.active:
+                continue
+            job.base = self._processed_at(job, virtual_time)
+            job.weight = self._weight(job.latest_start)
+            job.start_tag = virtual_time
+            job.finish_tag = virtual_time + (job.pallets - job.base) / job.weight
+            heap.append((job.finish_tag, seq, job))
+            total_weight += job.weight
+        heapq.heapify(heap)
+        self._heap = heap
+        self.total_weight = total_weight
+
+    def _on_timer(self, token):
+        if token != self._timer_token:
+            return  # 活动集合或速率已变化，这个计时已过期
+        self._advance()
+        if self._heap and self._heap[0][2].active:
+            # 计时本身就是按堆顶完成时刻设置的，避免浮点误差导致零间隔重复调度
+            self.virtual_time = max(self.virtual_time, self._heap[0][0])
+        self._reschedule()
+
+
 # ==================== 主仿真类 ====================
 
 class DCSimulation:
     """配送中心仿真主控制器"""
     
-    def __init__(self, env, scenario_config, run_id=1, order_tracker=None):
+    def __init__(self, env, scenario_config, run_id=1, order_tracker=None, seed=None, scenario_key=None,
+                 target_month=None):
+        """
+        Args:
+            seed: 根随机种子（None=DEFAULT_RANDOM_SEED）
+            scenario_key: 参与派生随机流的场景标识；None表示各场景共享同一条随机流（CRN）
+            target_month: 只加载该月份的订单（None=加载全部月份）；run() 时会按需补加载。
+                同时参与派生随机流，不同月份的同一次replication互相独立
+        """
         self.env = env
         self.config = scenario_config
         self.dc_config = self.config
+        # 编译好的开门日历（按场景配置在进程内缓存）
+        self.calendar = get_open_calendar(self.config)
         self.run_id = run_id
+        self.seed = DEFAULT_RANDOM_SEED if seed is None else int(seed)
+        self.scenario_key = scenario_key
+        self.target_month = target_month
+        # 本次仿真独立的随机数发生器：所有随机抽样都必须走 self.rng 或 random_stream()，不依赖全局 np.random
+        self.rng = make_simulation_rng(self.seed, scenario_key, run_id, month=target_month)
+        self._order_streams = {}
         self._init_resources()
         # 传递营业时间给KPICollector
         operating_hours = scenario_config.get('operating_hours', 18)
-        self.kpi = KPICollector(operating_hours=operating_hours)
-        self.orders = self._load_orders()
+        kpi_mode = self.config.get('kpi_mode', SYSTEM_PARAMETERS.get('kpi_mode', 'detail'))
+        if kpi_mode not in ('detail', 'summary'):
+            raise ValueError(f"未知的kpi_mode: {kpi_mode}（可选 'detail' / 'summary'）")
+        self.kpi = KPICollector(operating_hours=operating_hours, summary_only=(kpi_mode == 'summary'))
+        self.order_tables = []
+        self.orders = self._load_orders(target_month)
         self.pending_orders = []
         # 订单追踪器（可选）
         self.order_tracker = order_tracker if order_tracker else OrderTracker(enabled=False)
@@ -1336,9 +2558,37 @@ class DCSimulation:
         
         if self.config.get('arrival_smoothing', False):
             print(f"  到达优化: 已启用（平滑高峰流量）")
+        if self.labour_pools:
+            print(f"  人力模型: 共享人力池（按latest_start加权分配整队产能）")
     
-    def _load_orders(self):
-        """加载预生成的订单数据"""
+    def random_stream(self, name):
+        """某个随机来源的独立子流（与 self.rng 同样由 seed/scenario_key/run_id/target_month 派生）。
+
+        新的随机来源应该各用一条子流，这样CRN对比时各场景在同一次replication里
+        对同一来源抽到的随机数一致，不受其他来源调用次数的影响。
+        """
+        return make_simulation_rng(self.seed, self.scenario_key, self.run_id, stream=name, month=self.target_month)
+
+    def order_stream(self, name, order):
+        """随机来源 name 在某个订单上的子流（按 order.order_id 派生，本次仿真内缓存）。
+
+        订单处理中的产能波动每个调用位置、每个订单一条子流：每次调用仍是独立的±5%波动，
+        而CRN对比时同一订单在各场景抽到相同的序列，不受其他订单和调用次数的影响。
+        """
+        key = (name, order.order_id)
+        rng = self._order_streams.get(key)
+        if rng is None:
+            rng = make_simulation_rng(self.seed, self.scenario_key, self.run_id, stream=name, substream=order.order_id,
+                                      month=self.target_month)
+            self._order_streams[key] = rng
+        return rng
+
+    def _load_orders(self, target_month=None):
+        """加载预生成的订单数据
+
+        订单表在进程内只读取一次（见 load_order_table：优先内存映射列式存储，回退JSON），
+        这里只为本次仿真克隆订单的可变状态。target_month 不为None时只读取/克隆该月份的分组。
+        """
         orders_path = SYSTEM_PARAMETERS.get('generated_orders_path')
         
         if not orders_path:
@@ -1346,45 +2596,23 @@ class DCSimulation:
             return None
         
         try:
-            import json
-            from pathlib import Path
-            
-            # 处理相对路径
-            if not Path(orders_path).is_absolute():
-                orders_path = Path(__file__).parent.parent / orders_path
-            else:
-                orders_path = Path(orders_path)
-            
-            if not orders_path.exists():
-                print(f"警告: 订单文件不存在: {orders_path}")
+            order_table = load_order_table(months=None if target_month is None else [target_month])
+            if order_table is None:
+                print(f"警告: 订单文件不存在: {_resolve_orders_path(orders_path)}")
                 return None
 
-            with open(orders_path, 'r', encoding='utf-8') as f:
-                orders_data = json.load(f)
-
-            # 转换为Order对象，按category+direction分组
-            orders_dict = {}
-            for key, order_list in orders_data.items():
-                orders_dict[key] = [Order(order_data) for order_data in order_list]
-
-                # 计算绝对仿真时间
-                for order in orders_dict[key]:
-                    # 仿真从 day=1 的 00:00 开始 -> time=0
-                    base_time = (order.day - 1) * 24
-
-                    # Outbound: 计算creation_time
-                    if order.direction == 'Outbound':
-                        # creation_hour可能是负数（表示前一天）
-                        if order.creation_hour < 0:
-                            # 例如：day=2, creation_hour=-24 → 第1天0点
-                            order.creation_time = base_time + order.creation_hour
-                        else:
-                            # 例如：day=2, creation_hour=10 → 第2天10点
-                            order.creation_time = base_time + order.creation_hour
+            # 本次仿真的订单状态表 + Order句柄，按category+direction分组
+            spans = {}
+            records = []
+            for key, group_records in order_table.items():
+                if target_month is not None and _order_group_month(key) != target_month:
+                    continue
+                spans[key] = (len(records), len(records) + len(group_records))
+                records.extend(group_records)
 
-                    # 计算timeslot_time
-                    if order.timeslot_hour is not None:
-                        order.timeslot_time = base_time + order.timeslot_hour
+            table = OrderTable(records)
+            self.order_tables.append(table)
+            orders_dict = {key: table.handles(start, stop) for key, (start, stop) in spans.items()}
             
             print(f"✓ 订单数据加载成功: {len(orders_dict)} 个月度分组")
             return orders_dict
@@ -1418,6 +2646,9 @@ class DCSimulation:
         
         # 记录当前小时（用于检测小时变化）
         self.current_hour = -1
+
+        # 码头timeslot资源（拿不到slot的卡车在这里排队等待）
+        self.dock_slots = DockSlotBoard(self.env, self.hourly_timeslot_capacity, self.hourly_timeslot_used)
         
         # 启动timeslot容量更新和重置进程
         self.env.process(self.timeslot_capacity_manager())
@@ -1439,8 +2670,20 @@ class DCSimulation:
         self.fte_manager = FTEManager(
             operating_hours=operating_hours,
             efficiency_multiplier=efficiency_multiplier,
-            fte_adjustment_ratio=self.config.get('fte_adjustment_ratio')
+            fte_adjustment_ratio=self.config.get('fte_adjustment_ratio'),
+            rng=self.rng
         )
+
+        # 人力模型：independent = 每个订单各自按整队产能推进（原逻辑）；
+        #           shared = 每个 category×direction 一个共享人力池，按优先级分配产能
+        self.labour_model = self.config.get('labour_model', SYSTEM_PARAMETERS.get('labour_model', 'independent'))
+        self.labour_pools = {}
+        if self.labour_model == 'shared':
+            for category in ['FG', 'R&P']:
+                for direction in ['Inbound', 'Outbound']:
+                    self.labour_pools[(category, direction)] = LabourPool(self, category, direction)
+        elif self.labour_model != 'independent':
+            raise ValueError(f"未知的labour_model: {self.labour_model}（可选 'independent' / 'shared'）")
     
     def _smooth_arrival_rates(self, dc_config):
         """
@@ -1573,44 +2816,19 @@ class DCSimulation:
         """检查 DC 是否在运营时间内"""
         if time is None:
             time = self.env.now
-        return _is_dc_open_at_time(time, self.config)
+        return self.calendar.is_open(time)
 
     def _next_open_time(self, time=None):
         """返回下一个开门时刻（绝对仿真时间，小时制）。"""
         if time is None:
             time = self.env.now
-
-        if self.is_dc_open(time):
-            return float(time)
-
-        start_day = int(time) // 24
-        for day_index in range(start_day, start_day + 60):
-            windows = _compute_daily_open_windows(self.config, day_index)
-            for a, b in windows:
-                start_abs = day_index * 24 + a
-                end_abs = day_index * 24 + b
-                if time < start_abs:
-                    return float(start_abs)
-                if start_abs <= time < end_abs:
-                    return float(time)
-
-        return float(time)
+        return self.calendar.next_open(time)
 
     def _time_until_close(self, time=None):
         """返回距离本日关门还有多少小时（若已关门则返回0）。"""
         if time is None:
             time = self.env.now
-        if not self.is_dc_open(time):
-            return 0.0
-
-        day_index = int(time) // 24
-        hour_of_day = int(time) % 24
-        day_start = day_index * 24
-        for a, b in _compute_daily_open_windows(self.config, day_index):
-            if a <= hour_of_day < b:
-                close_abs = day_start + b
-                return max(0.0, float(close_abs) - float(time))
-        return 0.0
+        return self.calendar.time_until_close(time)
     
     # ==================== 优先级计算辅助方法 ====================
     
@@ -1619,7 +2837,8 @@ class DCSimulation:
         hourly_capacity = self.fte_manager.get_hourly_capacity(
             order.category,
             'Outbound',
-            coefficient=self.opening_hour_coefficient
+            coefficient=self.opening_hour_coefficient,
+            rng=self.order_stream('capacity_jitter/prep_estimate', order)
         )
         
         if hourly_capacity <= 0:
@@ -1699,10 +2918,7 @@ class DCSimulation:
                 # 追踪：订单到达调度器
                 self.order_tracker.log_event(
                     order, 'ORDER_ARRIVED', self.env.now,
-                    f'Order enters scheduler queue. Pallets={order.pallets}, '
-                    f'Region={order.region}, Timeslot={self.order_tracker._sim_time_to_str(order.timeslot_time)}, '
-                    f'Est.Prep={est_prep:.2f}h, Latest_Start={self.order_tracker._sim_time_to_str(latest_start)}, '
-                    f'Status={status}',
+                    est_prep=est_prep, latest_start=latest_start, status=status,
                     queue_size=len(ready_queue)
                 )
                 
@@ -1723,14 +2939,13 @@ class DCSimulation:
                 # 追踪：订单从优先级队列中取出
                 self.order_tracker.log_event(
                     order, 'DISPATCHED', self.env.now,
-                    f'Dispatched from priority queue (#{dispatch_count}). '
-                    f'Queue remaining={len(ready_queue)}, '
-                    f'Latest_Start={self.order_tracker._sim_time_to_str(latest_start)}',
-                    dispatch_rank=dispatch_count
+                    dispatch_rank=dispatch_count, queue_remaining=len(ready_queue),
+                    latest_start=latest_start
                 )
                 
-                # 启动备货和装货流程
-                self.env.process(self.outbound_preparation_process(order))
+                # 启动备货和装货流程（备货完成时触发 preparation_done_event 唤醒装货流程）
+                order.preparation_done_event = self.env.event()
+                self.env.process(self.outbound_preparation_process(order, latest_start))
                 self.env.process(self.outbound_loading_process(order))
             
             else:
@@ -1750,7 +2965,19 @@ class DCSimulation:
         print(f"  - 已开始处理: {dispatch_count}")
         print(f"{'='*110}\n")
     
-    def outbound_preparation_process(self, order):
+    def _work_in_labour_pool(self, order, direction, deadline, latest_start=None):
+        """在共享人力池中处理订单，直到完成或到达deadline；返回已处理托盘数"""
+        pool = self.labour_pools[(order.category, direction)]
+        job = pool.submit(order, order.pallets, latest_start)
+        if deadline is None:
+            yield job.done
+        else:
+            yield job.done | self.env.timeout(max(0.0, deadline - self.env.now))
+        if job.done.triggered:
+            return order.pallets
+        return pool.withdraw(job)
+
+    def outbound_preparation_process(self, order, latest_start=None):
         """Outbound备货流程（从creation_time开始）"""
         order.preparation_started = True
         order.processing_start_time = self.env.now
@@ -1760,21 +2987,29 @@ class DCSimulation:
         # 追踪：备货开始
         self.order_tracker.log_event(
             order, 'PREP_START', self.env.now,
-            f'Preparation started. Total pallets={total_pallets}, '
-            f'DC open={self.is_dc_open()}, '
-            f'Timeslot={self.order_tracker._sim_time_to_str(order.timeslot_time)}'
+            total_pallets=total_pallets, dc_open=self.is_dc_open()
         )
 
+        if self.labour_pools:
+            # 共享人力池：完成或到达timeslot时返回
+            processed_pallets = yield from self._work_in_labour_pool(
+                order, 'Outbound', order.timeslot_time, latest_start)
+            order.preparation_pallets_done = processed_pallets
+            if processed_pallets < total_pallets:
+                self.order_tracker.log_event(
+                    order, 'PREP_TIMESLOT_REACHED', self.env.now,
+                    processed=processed_pallets, total_pallets=total_pallets
+                )
+
         # 逐步处理直到完成或到达timeslot；仅在DC开门时推进备货
         _prep_loop_count = 0
-        while processed_pallets < total_pallets:
+        while not self.labour_pools and processed_pallets < total_pallets:
             # 检查是否已到timeslot时刻
             if order.timeslot_time is not None and self.env.now >= order.timeslot_time:
                 # 追踪：timeslot到达但备货未完成
                 self.order_tracker.log_event(
                     order, 'PREP_TIMESLOT_REACHED', self.env.now,
-                    f'Timeslot reached before prep complete. Processed={processed_pallets:.0f}/{total_pallets} pallets '
-                    f'({processed_pallets/total_pallets*100:.1f}%)'
+                    processed=processed_pallets, total_pallets=total_pallets
                 )
                 break
 
@@ -1784,8 +3019,7 @@ class DCSimulation:
                 if next_open > self.env.now:
                     self.order_tracker.log_event(
                         order, 'PREP_DC_CLOSED', self.env.now,
-                        f'DC closed. Waiting until next open={self.order_tracker._sim_time_to_str(next_open)}. '
-                        f'Progress={processed_pallets:.0f}/{total_pallets} pallets'
+                        next_open=next_open, processed=processed_pallets, total_pallets=total_pallets
                     )
                     yield self.env.timeout(next_open - self.env.now)
                 continue
@@ -1794,7 +3028,8 @@ class DCSimulation:
             hourly_capacity = self.fte_manager.get_hourly_capacity(
                 order.category,
                 'Outbound',
-                coefficient=self.opening_hour_coefficient
+                coefficient=self.opening_hour_coefficient,
+                rng=self.order_stream('capacity_jitter/outbound_processing', order)
             )
             if hourly_capacity <= 0:
                 # 理论上不该发生；给一个很小的推进避免死循环
@@ -1828,31 +3063,30 @@ class DCSimulation:
             if pallets_added > 0.01:
                 self.order_tracker.log_event(
                     order, 'PREP_PROGRESS', self.env.now,
-                    f'Work session #{_prep_loop_count}: +{pallets_added:.1f} pallets in {actual_time:.2f}h '
-                    f'(capacity={hourly_capacity:.1f}p/h). Total={processed_pallets:.0f}/{total_pallets} '
-                    f'({processed_pallets/total_pallets*100:.1f}%)',
-                    pallets_done=round(processed_pallets, 1),
-                    hourly_capacity=round(hourly_capacity, 1)
+                    session=_prep_loop_count, pallets_added=pallets_added, duration=actual_time,
+                    hourly_capacity=hourly_capacity, pallets_done=processed_pallets, total_pallets=total_pallets
                 )
 
         # 检查是否完成
         if processed_pallets >= total_pallets:
             order.preparation_completed = True
             order.processing_end_time = self.env.now
+            if order.preparation_done_event is not None and not order.preparation_done_event.triggered:
+                order.preparation_done_event.succeed()
             
             # 追踪：备货完成
             prep_duration = self.env.now - order.processing_start_time
             self.order_tracker.log_event(
                 order, 'PREP_COMPLETE', self.env.now,
-                f'Preparation completed! All {total_pallets} pallets ready. '
-                f'Duration={prep_duration:.2f}h. '
-                f'Time until timeslot={order.timeslot_time - self.env.now:.2f}h' if order.timeslot_time else f'Duration={prep_duration:.2f}h'
+                total_pallets=total_pallets, duration=prep_duration
             )
             
             # 记录FTE使用情况
             total_processing_time = self.env.now - order.processing_start_time
             available_fte = self.fte_manager.adjusted_fte[order.category]['Outbound']
-            hourly_capacity = self.fte_manager.get_hourly_capacity(order.category, 'Outbound', coefficient=self.opening_hour_coefficient)
+            hourly_capacity = self.fte_manager.get_hourly_capacity(
+                order.category, 'Outbound', coefficient=self.opening_hour_coefficient,
+                rng=self.order_stream('capacity_jitter/outbound_fte_usage', order))
             
             self.kpi.record_fte_usage(
                 category=order.category,
@@ -1868,8 +3102,7 @@ class DCSimulation:
         # 追踪：等待timeslot
         self.order_tracker.log_event(
             order, 'LOADING_WAIT_TIMESLOT', self.env.now,
-            f'Waiting for scheduled timeslot={self.order_tracker._sim_time_to_str(order.timeslot_time)}. '
-            f'Prep completed={order.preparation_completed}'
+            prep_completed=order.preparation_completed
         )
         
         # 等待到timeslot时刻
@@ -1884,14 +3117,14 @@ class DCSimulation:
             # 追踪：timeslot到达但备货未完成
             self.order_tracker.log_event(
                 order, 'LOADING_PREP_NOT_READY', self.env.now,
-                f'Timeslot reached but preparation NOT complete! '
-                f'Prepared={order.preparation_pallets_done:.0f}/{order.pallets} pallets. '
-                f'Order will be DELAYED and rescheduled.'
+                prepared=order.preparation_pallets_done
             )
 
-            # 继续等待备货完成
-            while not order.preparation_completed:
-                yield self.env.timeout(0.1)  # 每6分钟检查一次
+            # 继续等待备货完成（由备货流程触发事件唤醒，不再定时轮询）
+            if not order.preparation_completed:
+                if order.preparation_done_event is None:
+                    order.preparation_done_event = self.env.event()
+                yield order.preparation_done_event
 
             # 重新分配到下一个可用的整点timeslot（并尽量避开DC关闭时段/零容量时段）
             new_slot = self.reschedule_delayed_order(order)
@@ -1899,8 +3132,7 @@ class DCSimulation:
             # 追踪：重新分配timeslot
             self.order_tracker.log_event(
                 order, 'LOADING_RESCHEDULED', self.env.now,
-                f'Rescheduled to new timeslot={self.order_tracker._sim_time_to_str(new_slot)} '
-                f'(original={self.order_tracker._sim_time_to_str(order.timeslot_time)})'
+                new_slot=new_slot
             )
 
             # 等待到新timeslot（new_slot 保证不早于当前时间，且为整点）
@@ -1908,10 +3140,7 @@ class DCSimulation:
                 yield self.env.timeout(new_slot - self.env.now)
         else:
             # 备货完成：按原timeslot执行（如果容量满，后续仍可能顺延）
-            self.order_tracker.log_event(
-                order, 'LOADING_PREP_READY', self.env.now,
-                f'Preparation already complete. Ready for loading at scheduled timeslot.'
-            )
+            self.order_tracker.log_event(order, 'LOADING_PREP_READY', self.env.now)
             if order.timeslot_time is not None:
                 # timeslot_time是整点，但为了稳妥仍做一次对齐
                 slot = int(order.timeslot_time)
@@ -1921,24 +3150,15 @@ class DCSimulation:
         # 检查timeslot容量
         slot_key = f'{order.category.lower()}_loading' if order.category == 'FG' else 'rp_loading'
         
-        # 等待可用slot（如果当前小时已满）
-        _waited_for_capacity = False
-        while True:
-            available = self.hourly_timeslot_capacity.get(slot_key, 0)
-            used = self.hourly_timeslot_used.get(slot_key, 0)
-            
-            if used < available:
-                break
-            
-            if not _waited_for_capacity:
-                self.order_tracker.log_event(
-                    order, 'LOADING_WAIT_CAPACITY', self.env.now,
-                    f'Dock capacity full (used={used}/{available}). Waiting for next hour.'
-                )
-                _waited_for_capacity = True
-            
-            # 等待下一个小时
-            yield self.env.timeout(1)
+        # 申请slot；当前小时已满则在码头资源上排队，直到某个小时有空余slot
+        slot_request = self.dock_slots.request(slot_key)
+        if slot_request is not None:
+            self.order_tracker.log_event(
+                order, 'LOADING_WAIT_CAPACITY', self.env.now,
+                used=self.hourly_timeslot_used.get(slot_key, 0),
+                capacity=self.hourly_timeslot_capacity.get(slot_key, 0)
+            )
+            yield slot_request
 
         # 真实开始装货的timeslot（整点小时）
         actual_slot = int(self.env.now)
@@ -1953,15 +3173,10 @@ class DCSimulation:
             else:
                 order.delay_hours = 0
         
-        # 占用timeslot
-        self.hourly_timeslot_used[slot_key] = self.hourly_timeslot_used.get(slot_key, 0) + 1
-        
-        # 追踪：装货开始
+        # 追踪：装货开始（slot已由 dock_slots 占用）
         self.order_tracker.log_event(
             order, 'LOADING_START', self.env.now,
-            f'Loading started at dock. Actual timeslot={self.order_tracker._sim_time_to_str(self.env.now)}, '
-            f'Scheduled={self.order_tracker._sim_time_to_str(order.timeslot_time)}, '
-            f'On-time={order.on_time}'
+            on_time=order.on_time
         )
         
         # 装货（1小时）
@@ -1973,8 +3188,7 @@ class DCSimulation:
         # 追踪：装货完成 + 最终汇总
         self.order_tracker.log_event(
             order, 'LOADING_COMPLETE', self.env.now,
-            f'Loading complete! Truck departs. Pallets={order.pallets}, '
-            f'On-time={order.on_time}, Delay={order.delay_hours}h'
+            on_time=order.on_time, delay_hours=order.delay_hours
         )
         self.order_tracker.finalize_order(order, self.env.now)
         
@@ -2025,40 +3239,23 @@ class DCSimulation:
     def inbound_receiving_process(self, order):
         """Inbound接收流程（在timeslot时刻）"""
         # 追踪：到达码头
-        self.order_tracker.log_event(
-            order, 'INBOUND_ARRIVAL', self.env.now,
-            f'Truck arrives at reception dock. Pallets={order.pallets}, '
-            f'Timeslot={self.order_tracker._sim_time_to_str(order.timeslot_time)}'
-        )
+        self.order_tracker.log_event(order, 'INBOUND_ARRIVAL', self.env.now)
         
         # 检查timeslot容量
         slot_key = f'{order.category.lower()}_reception' if order.category == 'FG' else 'rp_reception'
         
-        # 等待可用slot
-        _waited_inbound = False
-        while True:
-            available = self.hourly_timeslot_capacity.get(slot_key, 0)
-            used = self.hourly_timeslot_used.get(slot_key, 0)
-            
-            if used < available:
-                break
-            
-            if not _waited_inbound:
-                self.order_tracker.log_event(
-                    order, 'INBOUND_WAIT_CAPACITY', self.env.now,
-                    f'Reception dock full (used={used}/{available}). Waiting.'
-                )
-                _waited_inbound = True
-            yield self.env.timeout(1)
-        
-        # 占用timeslot
-        self.hourly_timeslot_used[slot_key] = self.hourly_timeslot_used.get(slot_key, 0) + 1
+        # 申请slot（满则在码头资源上排队；拿到时计数器已加一）
+        slot_request = self.dock_slots.request(slot_key)
+        if slot_request is not None:
+            self.order_tracker.log_event(
+                order, 'INBOUND_WAIT_CAPACITY', self.env.now,
+                used=self.hourly_timeslot_used.get(slot_key, 0),
+                capacity=self.hourly_timeslot_capacity.get(slot_key, 0)
+            )
+            yield slot_request
         
         # 追踪：开始卸货
-        self.order_tracker.log_event(
-            order, 'INBOUND_UNLOADING', self.env.now,
-            f'Unloading started (1 hour). Pallets={order.pallets}'
-        )
+        self.order_tracker.log_event(order, 'INBOUND_UNLOADING', self.env.now)
         
         # 卸货（1小时）
         unloading_start = self.env.now
@@ -2071,20 +3268,32 @@ class DCSimulation:
         # 追踪：卸货完成，开始FTE处理
         self.order_tracker.log_event(
             order, 'INBOUND_PROCESSING_START', self.env.now,
-            f'Unloading complete. FTE processing starts. '
-            f'Deadline={self.order_tracker._sim_time_to_str(order.processing_deadline)} (24h window)'
+            deadline=order.processing_deadline
         )
         
         # FTE处理（24小时内完成）
         total_pallets = order.pallets
         processed_pallets = 0
 
-        while processed_pallets < total_pallets:
+        if self.labour_pools:
+            # 共享人力池：按deadline前的最晚开始时间确定优先级
+            est_hours = total_pallets / max(1e-9, self.fte_manager.get_nominal_hourly_capacity(
+                order.category, 'Inbound', coefficient=self.opening_hour_coefficient))
+            processed_pallets = yield from self._work_in_labour_pool(
+                order, 'Inbound', order.processing_deadline, order.processing_deadline - est_hours)
+            if processed_pallets < total_pallets:
+                self.order_tracker.log_event(
+                    order, 'INBOUND_DEADLINE_EXCEEDED', self.env.now,
+                    processed=processed_pallets, total_pallets=total_pallets
+                )
+                print(f"警告: 订单{order.order_id}超过24h处理deadline")
+
+        while not self.labour_pools and processed_pallets < total_pallets:
             # 检查是否超过deadline（deadline使用绝对时间，不因关门而暂停）
             if self.env.now >= order.processing_deadline:
                 self.order_tracker.log_event(
                     order, 'INBOUND_DEADLINE_EXCEEDED', self.env.now,
-                    f'24h processing deadline exceeded! Processed={processed_pallets:.0f}/{total_pallets}'
+                    processed=processed_pallets, total_pallets=total_pallets
                 )
                 print(f"警告: 订单{order.order_id}超过24h处理deadline")
                 break
@@ -2095,8 +3304,7 @@ class DCSimulation:
                 if next_open > self.env.now:
                     self.order_tracker.log_event(
                         order, 'INBOUND_DC_CLOSED', self.env.now,
-                        f'DC closed. Wait until {self.order_tracker._sim_time_to_str(next_open)}. '
-                        f'Progress={processed_pallets:.0f}/{total_pallets}'
+                        next_open=next_open, processed=processed_pallets, total_pallets=total_pallets
                     )
                     yield self.env.timeout(next_open - self.env.now)
                 continue
@@ -2104,7 +3312,8 @@ class DCSimulation:
             hourly_capacity = self.fte_manager.get_hourly_capacity(
                 order.category,
                 'Inbound',
-                coefficient=self.opening_hour_coefficient
+                coefficient=self.opening_hour_coefficient,
+                rng=self.order_stream('capacity_jitter/inbound_processing', order)
             )
             if hourly_capacity <= 0:
                 yield self.env.timeout(min(0.1, self._time_until_close()))
@@ -2132,16 +3341,17 @@ class DCSimulation:
         # 追踪：处理完成
         self.order_tracker.log_event(
             order, 'INBOUND_COMPLETE', self.env.now,
-            f'Inbound processing complete. Pallets={total_pallets}, '
-            f'Total time={self.env.now - unloading_start:.2f}h, '
-            f'Within deadline={self.env.now <= order.processing_deadline}'
+            total_pallets=total_pallets, unloading_start=unloading_start,
+            deadline=order.processing_deadline
         )
         self.order_tracker.finalize_order(order, self.env.now)
         
         # 记录FTE使用情况
         total_processing_time = self.env.now - order.processing_start_time
         available_fte = self.fte_manager.adjusted_fte[order.category]['Inbound']
-        hourly_capacity = self.fte_manager.get_hourly_capacity(order.category, 'Inbound', coefficient=self.opening_hour_coefficient)
+        hourly_capacity = self.fte_manager.get_hourly_capacity(
+            order.category, 'Inbound', coefficient=self.opening_hour_coefficient,
+            rng=self.order_stream('capacity_jitter/inbound_fte_usage', order))
         
         self.kpi.record_fte_usage(
             category=order.category,
@@ -2199,6 +3409,12 @@ class DCSimulation:
         
         # 启动timeslot容量管理器（必需）
         self.env.process(self.timeslot_capacity_manager())
+
+        # 构造时只加载了其他月份：按需补加载目标月份
+        if self.orders is not None and not any(_order_group_month(k) == target_month for k in self.orders):
+            extra = self._load_orders(target_month)
+            if extra:
+                self.orders.update(extra)
         
         # 订单驱动流程
         if not self.orders:
@@ -2253,44 +3469,6 @@ class DCSimulation:
         
         return summary
     
-    def _generate_order_statistics(self):
-        """生成订单统计信息（新逻辑）
-
-        注意：
-        - completion_rate 的分母是“仿真窗口内、目标月份的订单”（否则会把全年订单都算进来，导致完成率虚低）
-        - on_time_* 默认只针对 Outbound（按原 timeslot 准时）
-        """
-        stats = {
-            # 统计范围信息
-            'target_month': None,
-            'horizon_days': None,
-            'horizon_hours': None,
-
-            # 全部订单（Inbound+Outbound）完成率（在范围内）
-            'total_orders': 0,
-            'completed_orders': 0,
-            'incomplete_orders': 0,
-            'completion_rate': 0.0,
-
-            # Outbound（按原 timeslot 准时）
-            'total_outbound_orders': 0,
-            'completed_outbound_orders': 0,
-            'on_time_outbound_orders': 0,
-            'delayed_outbound_orders': 0,
-            'outbound_completion_rate': 0.0,
-            'on_time_rate_all': 0.0,
-            'on_time_rate_completed': 0.0,
-
-            # 延误统计（Outbound）
-            'total_delay_hours': 0,
-            'avg_delay_hours': 0.0,
-
-            # 兼容字段：历史代码读取 on_time_rate
-            'on_time_rate': 0.0
-        }
-        
-        return stats
-
     def _generate_order_statistics(self, target_month=1, duration_days=30):
         """生成订单统计信息（新逻辑）
 
@@ -2331,23 +3509,36 @@ class DCSimulation:
 
         horizon = duration_days * 24
 
-        # 只取目标月份的订单
-        month_orders = []
+        # 只取目标月份的订单：按所属 OrderTable 收集行号，之后全部统计都在状态列上向量化完成
         month_token = f'M{target_month:02d}'
+        rows_by_table = {}
         for key, orders_list in self.orders.items():
-            if month_token in key:
-                month_orders.extend(orders_list)
-
-        # 进一步限制到仿真窗口内（以 timeslot_time 为主；Outbound 没有 timeslot_time 的也忽略）
-        scoped_orders = []
-        for o in month_orders:
-            if o.timeslot_time is None:
-                continue
-            if 0 <= o.timeslot_time < horizon:
-                scoped_orders.append(o)
-
-        stats['total_orders'] = len(scoped_orders)
-        stats['completed_orders'] = sum(1 for o in scoped_orders if o.completed)
+            if month_token in key and orders_list:
+                table = orders_list[0]._table
+                rows_by_table.setdefault(id(table), (table, []))[1].append(
+                    np.fromiter(map(_ORDER_ROW, orders_list), dtype=np.int64, count=len(orders_list)))
+        tables = [(table, np.concatenate(rows)) for table, rows in rows_by_table.values()]
+        if not tables:
+            tables = [(OrderTable([]), np.empty(0, dtype=np.int64))]
+
+        def gather(name):
+            if name in OrderTable.STATE_COLUMNS:
+                return np.concatenate([getattr(table, name)[rows] for table, rows in tables])
+            return np.concatenate([table.column(name)[rows] for table, rows in tables])
+
+        cols = {name: gather(name) for name in (
+            'timeslot_time', 'category', 'direction', 'region', 'completed', 'on_time',
+            'actual_timeslot', 'delay_hours', 'processing_end_time', 'processing_deadline')}
+
+        # 进一步限制到仿真窗口内（以 timeslot_time 为主；没有 timeslot_time 的也忽略，NaN比较为False）
+        timeslot = cols['timeslot_time']
+        scoped = (timeslot >= 0) & (timeslot < horizon)
+        cols = {name: values[scoped] for name, values in cols.items()}
+        completed = cols['completed'].astype(bool)
+        outbound = cols['direction'] == 'Outbound'
+
+        stats['total_orders'] = int(scoped.sum())
+        stats['completed_orders'] = int(completed.sum())
         stats['incomplete_orders'] = stats['total_orders'] - stats['completed_orders']
         if stats['total_orders'] > 0:
             stats['completion_rate'] = stats['completed_orders'] / stats['total_orders'] * 100
@@ -2365,54 +3556,45 @@ class DCSimulation:
             ('R&P', 'Inbound', 'RP_inbound'),
             ('R&P', 'Outbound', 'RP_outbound'),
         ]
-        for cat, direction, prefix in flow_defs:
-            flow_orders = [o for o in scoped_orders if o.category == cat and o.direction == direction]
-            total = len(flow_orders)
-            completed = sum(1 for o in flow_orders if o.completed)
+        on_time_ok = completed & np.where(
+            outbound, cols['on_time'].astype(bool),
+            cols['processing_end_time'] <= cols['processing_deadline'])
+        flow = np.full(len(completed), len(flow_defs), dtype=np.int64)
+        for i, (cat, direction, _prefix) in enumerate(flow_defs):
+            flow[(cols['category'] == cat) & (cols['direction'] == direction)] = i
+        n_bins = len(flow_defs) + 1
+        flow_total = np.bincount(flow, minlength=n_bins)
+        flow_completed = np.bincount(flow, weights=completed, minlength=n_bins)
+        flow_on_time = np.bincount(flow, weights=on_time_ok, minlength=n_bins)
+        for i, (_cat, _direction, prefix) in enumerate(flow_defs):
+            total, completed_n, on_time = int(flow_total[i]), int(flow_completed[i]), int(flow_on_time[i])
             stats[f'{prefix}_total_orders'] = total
-            stats[f'{prefix}_completed_orders'] = completed
-            stats[f'{prefix}_completion_rate'] = (completed / total * 100) if total else 0.0
-
-            if direction == 'Outbound':
-                on_time = sum(1 for o in flow_orders if o.completed and getattr(o, 'on_time', False))
-            else:
-                on_time = sum(
-                    1 for o in flow_orders
-                    if o.completed
-                    and getattr(o, 'processing_end_time', None) is not None
-                    and getattr(o, 'processing_deadline', None) is not None
-                    and o.processing_end_time <= o.processing_deadline
-                )
-
+            stats[f'{prefix}_completed_orders'] = completed_n
+            stats[f'{prefix}_completion_rate'] = (completed_n / total * 100) if total else 0.0
             stats[f'{prefix}_on_time_orders'] = on_time
             stats[f'{prefix}_on_time_rate_all'] = (on_time / total * 100) if total else 0.0
-            stats[f'{prefix}_on_time_rate_completed'] = (on_time / completed * 100) if completed else 0.0
+            stats[f'{prefix}_on_time_rate_completed'] = (on_time / completed_n * 100) if completed_n else 0.0
 
         # Outbound on-time（按 timeslot）
-        outbound = [o for o in scoped_orders if o.direction == 'Outbound']
-        stats['total_outbound_orders'] = len(outbound)
-        stats['completed_outbound_orders'] = sum(1 for o in outbound if o.completed)
-        stats['on_time_outbound_orders'] = sum(1 for o in outbound if o.completed and o.on_time)
-        stats['delayed_outbound_orders'] = sum(1 for o in outbound if o.completed and not o.on_time)
+        out_completed = outbound & completed
+        out_on_time = out_completed & cols['on_time'].astype(bool)
+        out_delayed = out_completed & ~cols['on_time'].astype(bool)
+        stats['total_outbound_orders'] = int(outbound.sum())
+        stats['completed_outbound_orders'] = int(out_completed.sum())
+        stats['on_time_outbound_orders'] = int(out_on_time.sum())
+        stats['delayed_outbound_orders'] = int(out_delayed.sum())
 
         # Day1 -> Day2 reschedule (基于原定timeslot的“第1天”与实际装车/完成的“第2天”)
         # 口径：仅Outbound；分母=原定timeslot在第1天(0-24h)的Outbound订单数；
         # 分子=其中已完成且实际装车开始(actual_timeslot)落在第2天(24-48h)的订单数。
-        day1_outbound = [
-            o for o in outbound
-            if o.timeslot_time is not None and (int(o.timeslot_time) // 24) == 0
-        ]
-        day1_to_day2_completed = [
-            o for o in day1_outbound
-            if o.completed and o.actual_timeslot is not None and (int(o.actual_timeslot) // 24) == 1
-        ]
-        stats['day1_outbound_orders'] = len(day1_outbound)
-        stats['day1_to_day2_outbound_orders'] = len(day1_to_day2_completed)
+        day1_outbound = outbound & (cols['timeslot_time'] < 24)
+        day1_to_day2 = day1_outbound & completed & (cols['actual_timeslot'] // 24 == 1)
+        stats['day1_outbound_orders'] = int(day1_outbound.sum())
+        stats['day1_to_day2_outbound_orders'] = int(day1_to_day2.sum())
         stats['day1_to_day2_outbound_rate'] = (
             stats['day1_to_day2_outbound_orders'] / stats['day1_outbound_orders'] * 100
             if stats['day1_outbound_orders'] > 0 else 0.0
         )
-
         if stats['total_outbound_orders'] > 0:
             stats['outbound_completion_rate'] = stats['completed_outbound_orders'] / stats['total_outbound_orders'] * 100
             stats['on_time_rate_all'] = stats['on_time_outbound_orders'] / stats['total_outbound_orders'] * 100
@@ -2421,28 +3603,31 @@ class DCSimulation:
         if stats['completed_outbound_orders'] > 0:
             stats['on_time_rate_completed'] = stats['on_time_outbound_orders'] / stats['completed_outbound_orders'] * 100
 
-        stats['total_delay_hours'] = sum(o.delay_hours for o in outbound if o.completed)
+        stats['total_delay_hours'] = int(cols['delay_hours'][out_completed].sum())
         if stats['delayed_outbound_orders'] > 0:
             stats['avg_delay_hours'] = stats['total_delay_hours'] / stats['delayed_outbound_orders']
 
-        # FG Outbound：按地区统计（同样使用 scoped 范围）
+        # FG Outbound：按地区统计（同样使用 scoped 范围），区域标签去重后再做前缀匹配
+        region_labels, region_index = np.unique(
+            np.array(['' if r is None else r for r in cols['region']], dtype=str), return_inverse=True)
+        fg_outbound = outbound & (cols['category'] == 'FG')
         region_stats = {}
-        fg_outbound = [o for o in outbound if o.category == 'FG']
         for region_prefix in ['G2', 'ROW']:
-            region_orders = [o for o in fg_outbound if (o.region or '').startswith(region_prefix)]
-            total = len(region_orders)
-            completed = sum(1 for o in region_orders if o.completed)
-            on_time = sum(1 for o in region_orders if o.completed and o.on_time)
-            delayed = sum(1 for o in region_orders if o.completed and not o.on_time)
+            in_region = fg_outbound & np.array([label.startswith(region_prefix) for label in region_labels],
+                                               dtype=bool)[region_index]
+            total = int(in_region.sum())
+            completed_n = int((in_region & completed).sum())
+            on_time = int((in_region & out_on_time).sum())
+            delayed = int((in_region & out_delayed).sum())
 
             rs = {
                 'total_orders': total,
-                'completed_orders': completed,
+                'completed_orders': completed_n,
                 'on_time_orders': on_time,
                 'delayed_orders': delayed,
-                'completion_rate': (completed / total * 100) if total else 0.0,
+                'completion_rate': (completed_n / total * 100) if total else 0.0,
                 'on_time_rate_all': (on_time / total * 100) if total else 0.0,
-                'on_time_rate_completed': (on_time / completed * 100) if completed else 0.0,
+                'on_time_rate_completed': (on_time / completed_n * 100) if completed_n else 0.0,
             }
             region_stats[region_prefix] = rs
 
@@ -2450,6 +3635,251 @@ class DCSimulation:
         return stats
 
 
+# ==================== 并行重复运行 ====================
+def _print_closed_timeslot_exposure(sim, base_cfg: dict, scen_cfg: dict, duration_days=30, target_month=1):
+    """Print how many scheduled timeslots become unavailable due to scenario-specific closures.
+
+    This is mainly for diagnosing Friday late-shift cancellations.
+    """
+    has_rules = bool(scen_cfg.get('biweekly_shift_cancel')) or bool(scen_cfg.get('shift_cancel_rules'))
+    if not has_rules:
+        return
+
+    if not getattr(sim, 'orders', None):
+        return
+
+    horizon = duration_days * 24
+    month_token = f'M{target_month:02d}'
+
+    month_orders = []
+    for key, orders_list in sim.orders.items():
+        if month_token in key:
+            month_orders.extend(orders_list)
+
+    scoped = [o for o in month_orders if getattr(o, 'timeslot_time', None) is not None and 0 <= o.timeslot_time < horizon]
+    if not scoped:
+        return
+
+    base_calendar = get_open_calendar(base_cfg, horizon_days=duration_days)
+    scen_calendar = get_open_calendar(scen_cfg, horizon_days=duration_days)
+    affected = [
+        o for o in scoped
+        if base_calendar.is_open(o.timeslot_time) and (not scen_calendar.is_open(o.timeslot_time))
+    ]
+
+    total = len(scoped)
+    n_aff = len(affected)
+    if n_aff == 0:
+        print("\n  [诊断] 本场景的额外关门不影响任何订单的原定timeslot（baseline开门而本场景关门的订单数=0）。")
+        return
+
+    by_flow = defaultdict(int)
+    by_hour = defaultdict(int)
+    for o in affected:
+        by_flow[(o.category, o.direction)] += 1
+        di = int(o.timeslot_time) // 24
+        hod = int(o.timeslot_time) % 24
+        day1_weekday = int(scen_cfg.get('day1_weekday', 0))
+        weekday = (day1_weekday + di) % 7
+        by_hour[(weekday, hod)] += 1
+
+    weekday_names = {0: 'Mon', 1: 'Tue', 2: 'Wed', 3: 'Thu', 4: 'Fri', 5: 'Sat', 6: 'Sun'}
+
+    print("\n  [诊断] 额外关门导致‘原定timeslot落在关门时段’的订单：")
+    print(f"    - 影响订单数: {n_aff}/{total} ({n_aff / total * 100:.2f}%)")
+    for (cat, direction), cnt in sorted(by_flow.items(), key=lambda x: (-x[1], x[0][0], x[0][1])):
+        print(f"    - {cat} {direction}: {cnt}")
+
+    top_hours = sorted(by_hour.items(), key=lambda x: -x[1])[:8]
+    if top_hours:
+        hh = ", ".join([f"{weekday_names.get(w, str(w))} {h:02d}:00({c})" for (w, h), c in top_hours])
+        print(f"    - Top受影响时段: {hh}")
+
+
+def _init_replication_worker(system_parameters):
+    """进程池initializer：让子进程使用与主进程相同的SYSTEM_PARAMETERS（spawn模式下模块会被重新导入）。"""
+    SYSTEM_PARAMETERS.clear()
+    SYSTEM_PARAMETERS.update(system_parameters)
+
+
+def _run_replication_job(job):
+    """运行单个 (scenario, transform, replication) job。
+
+    job 是一个可pickle的dict：scenario配置在主进程里已经应用过transform，
+    子进程只负责构建自己的 simpy.Environment 和 DCSimulation。
+
+    Returns:
+        (result, log): 仿真summary，以及capture_output=True时捕获的控制台输出
+    """
+    buf = io.StringIO() if job.get('capture_output') else None
+    with (contextlib.redirect_stdout(buf) if buf is not None else contextlib.nullcontext()):
+        env = simpy.Environment()
+        sim = DCSimulation(
+            env, job['scenario_config'], run_id=job['rep'] + 1,
+            seed=job['seed'], scenario_key=job.get('scenario_key'), target_month=job['target_month']
+        )
+
+        # 诊断：本场景的额外关门到底影响了多少“原定timeslot”订单
+        if job['rep'] == 0 and job.get('base_scenario_config') is not None:
+            _print_closed_timeslot_exposure(
+                sim, job['base_scenario_config'], job['scenario_config'],
+                duration_days=job['duration_days'], target_month=job['target_month']
+            )
+
+        result = sim.run(duration_days=job['duration_days'], target_month=job['target_month'])
+    return result, (buf.getvalue() if buf is not None else '')
+
+
+def _resolve_workers(workers):
+    """workers: None/1 = 串行；0 = 使用全部CPU核；>1 = 进程数。"""
+    if workers is None:
+        return 1
+    workers = int(workers)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return max(1, workers)
+
+
+def _orders_fingerprint():
+    """当前订单输入的指纹：列式存储manifest和JSON文件的 (路径, 大小, mtime)"""
+    return [
+        result_cache.file_fingerprint(_resolve_orders_store_path()),
+        result_cache.file_fingerprint(_resolve_orders_path()),
+    ]
+
+
+def _replication_cache_key(job):
+    """单个replication job的结果缓存key。
+
+    覆盖所有决定仿真结果的输入：transform之后的场景配置、随机流（seed, scenario_key, rep）、
+    target_month / duration_days、SYSTEM_PARAMETERS、LOADED_CONFIG（simulation_config.json 的内容，
+    FTEManager 直接从中读取 fte_config）、订单文件指纹和代码版本（仿真源码的hash）。
+    base_scenario_config 只用于打印诊断信息，不参与key。
+    """
+    global _RESULT_CACHE_CODE_VERSION
+    if _RESULT_CACHE_CODE_VERSION is None:
+        _RESULT_CACHE_CODE_VERSION = result_cache.source_fingerprint(*_RESULT_CACHE_SOURCES)
+    return result_cache.fingerprint(
+        _RESULT_CACHE_CODE_VERSION,
+        job['scenario_config'],
+        job.get('scenario_key'),
+        job['seed'],
+        job['rep'],
+        job['target_month'],
+        job['duration_days'],
+        SYSTEM_PARAMETERS,
+        LOADED_CONFIG,
+        _orders_fingerprint(),
+    )
+
+
+def _iter_replication_results(jobs, workers=1):
+    """按job顺序逐个产出 (job, result)。
+
+    - RESULT_CACHE 启用时先查结果缓存，只有未命中的job才真正仿真，仿真结果写回缓存；
+    - workers<=1 时在当前进程串行执行（输出实时打印）；
+    - 否则一次性把所有未命中的job分发到进程池，各job的控制台输出被捕获后按job顺序回放，
+      因此日志和结果的顺序都与串行运行一致。
+    """
+    cache = RESULT_CACHE
+    if cache is None:
+        yield from _simulate_replication_jobs(jobs, workers)
+        return
+
+    keys = [_replication_cache_key(job) for job in jobs]
+    cached = [cache.get(key) for key in keys]
+    hits = sum(result is not None for result in cached)
+    if hits:
+        print(f"结果缓存: 命中 {hits}/{len(jobs)} 个replication，只仿真未命中的 {len(jobs) - hits} 个")
+    fresh = _simulate_replication_jobs([job for job, result in zip(jobs, cached) if result is None], workers)
+    for job, key, result in zip(jobs, keys, cached):
+        if result is None:
+            _, result = next(fresh)
+            cache.put(key, result, label=(f"{job.get('scenario_name', job['scenario_config'].get('name'))} "
+                                          f"M{job['target_month']:02d} rep{job['rep'] + 1}"))
+        elif job.get('header'):
+            print(f"{job['header']}  [缓存命中]")
+        yield job, result
+
+
+def _simulate_replication_jobs(jobs, workers=1):
+    """实际运行job（串行或进程池），按job顺序逐个产出 (job, result)。"""
+    workers = _resolve_workers(workers)
+
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            if job.get('header'):
+                print(job['header'])
+            result, _ = _run_replication_job(job)
+            yield job, result
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(jobs)),
+        initializer=_init_replication_worker,
+        initargs=(dict(SYSTEM_PARAMETERS),)
+    ) as executor:
+        futures = [executor.submit(_run_replication_job, dict(job, capture_output=True)) for job in jobs]
+        for job, fut in zip(jobs, futures):
+            result, log = fut.result()
+            if job.get('header'):
+                print(job['header'])
+            if log:
+                print(log, end='')
+            yield job, result
+
+
+def _print_replication_result(result):
+    """打印单次重复的关键指标。"""
+    print(f"\n  === 流量统计 ===")
+    print(f"  Inbound总量: {result.get('total_inbound_pallets', 0):.0f} pallets")
+    print(f"    - FG: {result.get('FG_inbound_pallets', 0):.0f}")
+    print(f"    - R&P: {result.get('R&P_inbound_pallets', 0):.0f}")
+    print(f"  Outbound总量: {result.get('total_outbound_pallets', 0):.0f} pallets")
+    print(f"    - FG: {result.get('FG_outbound_pallets', 0):.0f}")
+    print(f"    - R&P: {result.get('R&P_outbound_pallets', 0):.0f}")
+
+    print(f"\n  === 延期情况 ===")
+    print(f"  Inbound 24h延期: {result.get('total_inbound_delays', 0)} 订单 ({result.get('total_delayed_pallets', 0):.0f} pallets)")
+    if result.get('total_inbound_delays', 0) > 0:
+        print(f"    - 平均延期: {result.get('avg_inbound_delay_hours', 0):.2f}h")
+        print(f"    - FG延期: {result.get('fg_inbound_delays', 0)}, R&P延期: {result.get('rp_inbound_delays', 0)}")
+    os_ = result.get('order_statistics', {})
+    print(f"  完成率: {os_.get('completion_rate', 0):.1f}%")
+    print(f"  准时率(所有订单): {os_.get('on_time_rate_all', os_.get('on_time_rate', 0)):.1f}%")
+    print(f"  准时率(仅已完成订单): {os_.get('on_time_rate_completed', 0):.1f}%")
+
+    print(f"\n  === 资源利用 ===")
+    print(f"  平均卡车等待时间: {result['avg_truck_wait_time']:.2f} 小时")
+    print(f"  平均午夜积压: {result['avg_midnight_backlog_pallets']:.1f} 托盘")
+
+    # 显示FTE利用率（简化版）
+    if 'overall_fte_utilization_rate' in result:
+        print(f"\n  === FTE利用情况 ===")
+        print(f"  整体FTE利用率: {result['overall_fte_utilization_rate']:.1%}")
+        print(f"  实际使用: {result.get('total_fte_used', 0):.1f} FTE, 可用: {result.get('total_fte_available', 0):.1f} FTE")
+        for category in ['FG', 'R&P']:
+            for direction in ['inbound', 'outbound']:
+                key_util = f'{category}_{direction}_fte_utilization_rate'
+                key_used = f'{category}_{direction}_fte_used'
+                key_available = f'{category}_{direction}_fte_available'
+
+                if key_util in result:
+                    used = result.get(key_used, 0)
+                    available = result.get(key_available, 0)
+                    util = result[key_util]
+                    print(f"    {category} {direction.capitalize()}: {util:.1%} (使用{used:.1f} / 可用{available:.1f} FTE)")
+
+    # 显示码头利用率
+    if result.get('avg_dock_utilization', 0) > 0:
+        print(f"\n  === Timeslot利用率 ===")
+        print(f"  整体平均利用率: {result['avg_dock_utilization']:.1%}")
+        print(f"  Loading码头: 平均 {result['loading_avg_utilization']:.1%}, 峰值 {result['loading_peak_utilization']:.1%}")
+        print(f"  Reception码头: 平均 {result['reception_avg_utilization']:.1%}, 峰值 {result['reception_peak_utilization']:.1%}")
+        print(f"    - FG码头: {result['FG_dock_avg_utilization']:.1%}")
+        print(f"    - R&P码头: {result['R&P_dock_avg_utilization']:.1%}")
+
+
 def _extract_available_months_from_orders_data(orders_data: dict):
     """从generated_orders.json顶层key中提取可用月份列表（例如 *_M01, *_M02 ...）。"""
     months = set()
@@ -2490,96 +3920,272 @@ def _flatten_order_statistics(os_dict: dict, prefix: str = 'os_'):
     return flat
 
 
-def _run_one_scenario_one_month(scenario_config, num_replications=5, duration_days=30, target_month=1):
-    """运行单个场景、单个月份，返回跨replication平均后的结果(dict)。"""
-    scenario_results = []
-    for rep in range(num_replications):
-        env = simpy.Environment()
-        sim = DCSimulation(env, scenario_config, run_id=rep + 1)
-        result = sim.run(duration_days=duration_days, target_month=target_month)
-        scenario_results.append(result)
-
-    avg_result = {}
-    for key in scenario_results[0].keys():
-        if key in ['hourly_dock_utilization', 'order_statistics']:
-            if key == 'order_statistics':
-                dicts = [r.get('order_statistics', {}) for r in scenario_results]
-                numeric_keys = [
-                    'target_month', 'horizon_days', 'horizon_hours',
-                    'total_orders', 'completed_orders', 'incomplete_orders',
-                    'completion_rate',
-                    'total_outbound_orders', 'completed_outbound_orders',
-                    'on_time_outbound_orders', 'delayed_outbound_orders',
-                    'outbound_completion_rate', 'on_time_rate', 'on_time_rate_all', 'on_time_rate_completed',
-                    'total_delay_hours', 'avg_delay_hours',
-                    'day1_outbound_orders', 'day1_to_day2_outbound_orders', 'day1_to_day2_outbound_rate'
-                ]
-                for prefix in ['FG_inbound', 'FG_outbound', 'RP_inbound', 'RP_outbound']:
-                    numeric_keys.extend([
-                        f'{prefix}_total_orders',
-                        f'{prefix}_completed_orders',
-                        f'{prefix}_completion_rate',
-                        f'{prefix}_on_time_orders',
-                        f'{prefix}_on_time_rate_all',
-                        f'{prefix}_on_time_rate_completed',
-                    ])
-
-                merged = {}
-                for nk in numeric_keys:
-                    vals = [d.get(nk, 0) for d in dicts]
-                    merged[nk] = float(np.mean(vals))
-
-                # 地区统计：取均值
-                region_out = {}
-                for rk in ['G2', 'ROW']:
-                    rs_list = [d.get('fg_outbound_region_stats', {}).get(rk, {}) for d in dicts]
-                    if any(rs_list):
-                        region_out[rk] = {
-                            'total_orders': float(np.mean([rs.get('total_orders', 0) for rs in rs_list])),
-                            'completed_orders': float(np.mean([rs.get('completed_orders', 0) for rs in rs_list])),
-                            'on_time_orders': float(np.mean([rs.get('on_time_orders', 0) for rs in rs_list])),
-                            'delayed_orders': float(np.mean([rs.get('delayed_orders', 0) for rs in rs_list])),
-                            'completion_rate': float(np.mean([rs.get('completion_rate', 0.0) for rs in rs_list])),
-                            'on_time_rate_all': float(np.mean([rs.get('on_time_rate_all', 0.0) for rs in rs_list])),
-                            'on_time_rate_completed': float(np.mean([rs.get('on_time_rate_completed', 0.0) for rs in rs_list])),
-                        }
-                if region_out:
-                    merged['fg_outbound_region_stats'] = region_out
-                avg_result[key] = merged
+# ==================== 跨replication汇总 ====================
+
+# 95% 双侧 t 分位数（自由度 1-30）；自由度更大时用 z + (z^3 + z) / (4·df) 近似
+_T_CRITICAL_95 = np.array([
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+])
+
+# aggregate_replications 默认在每个数值叶子旁边写入的统计量（key_std / key_se / key_ci95）
+REPLICATION_STAT_SUFFIXES = ('std', 'se', 'ci95')
+
+
+def _t_critical_95(dof):
+    """95% 双侧 t 分位数（dof 可以是数组；dof<1 返回0）"""
+    dof = np.asarray(dof, dtype=np.int64)
+    table = _T_CRITICAL_95[np.clip(dof, 1, len(_T_CRITICAL_95)) - 1]
+    approx = 1.959964 + 2.372 / np.maximum(dof, 1)
+    return np.where(dof < 1, 0.0, np.where(dof <= len(_T_CRITICAL_95), table, approx))
+
+
+def replication_stats(values, present=None):
+    """按replication（第0维）计算每一列的 n / mean / std / se / ci95。
+
+    Args:
+        values: (reps, ...) 数组
+        present: 与values同形状的bool数组，False 表示该replication没有这个指标（None=全部都有）
+
+    Returns:
+        dict of ndarray（形状为 values.shape[1:]）：std 为样本标准差（ddof=1），
+        se = std/sqrt(n)，ci95 为95%置信区间的半宽 t·se；n<2 时 std/se/ci95 为0
+    """
+    values = np.asarray(values, dtype=np.float64)
+    present = np.ones(values.shape, dtype=bool) if present is None else np.asarray(present, dtype=bool)
+    n = present.sum(axis=0)
+    safe_n = np.maximum(n, 1)
+    mean = np.where(present, values, 0.0).sum(axis=0) / safe_n
+    sq = np.where(present, (values - mean) ** 2, 0.0).sum(axis=0)
+    std = np.where(n > 1, np.sqrt(sq / np.maximum(n - 1, 1)), 0.0)
+    se = std / np.sqrt(safe_n)
+    return {'n': n, 'mean': mean, 'std': std, 'se': se, 'ci95': _t_critical_95(n - 1) * se}
+
+
+def _flatten_result_tree(tree, prefix, out):
+    for key, value in tree.items():
+        path = prefix + (key,)
+        if isinstance(value, dict) and value:
+            _flatten_result_tree(value, path, out)
+        else:
+            out.append((path, value))
+
+
+def aggregate_replications(results, stat_suffixes=REPLICATION_STAT_SUFFIXES):
+    """递归合并多次replication的（嵌套）结果dict。
+
+    每个结果只展开一次，所有数值叶子（含 order_statistics、地区统计、hourly_dock_utilization）
+    放进一个 (reps, 叶子数) 矩阵，由 replication_stats 一次算完。某次replication缺少的叶子不参与该叶子的统计。
+
+    Args:
+        results: DCSimulation.run 的结果列表
+        stat_suffixes: 在每个数值叶子（字符串key）旁边额外写入的统计量，
+            例如 ('std', 'ci95') 会写入 key_std / key_ci95；传 () 则只保留均值
+
+    Returns:
+        与单次结果结构相同的dict：数值叶子为均值，非数值叶子取第一次出现的值
+    """
+    results = list(results)
+    columns = {}      # 数值叶子路径 -> 列号
+    others = {}       # 非数值叶子路径 -> 第一次出现的值
+    paths = {}        # 全部叶子路径（按首次出现顺序）
+    rep_index, col_index, cells = [], [], []
+    for rep, result in enumerate(results):
+        flat = []
+        _flatten_result_tree(result, (), flat)
+        for path, value in flat:
+            paths.setdefault(path, None)
+            if isinstance(value, (int, float, np.number)):
+                rep_index.append(rep)
+                col_index.append(columns.setdefault(path, len(columns)))
+                cells.append(value)
             else:
-                avg_result[key] = scenario_results[0].get(key)
+                others.setdefault(path, value)
+
+    values = np.zeros((len(results), len(columns)), dtype=np.float64)
+    present = np.zeros(values.shape, dtype=bool)
+    values[rep_index, col_index] = cells
+    present[rep_index, col_index] = True
+    stats = {name: array.tolist() for name, array in replication_stats(values, present).items()}
+
+    merged = {}
+    for path in paths:
+        node = merged
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        key = path[-1]
+        col = columns.get(path)
+        if col is None:
+            value = others[path]
+            node.setdefault(key, {} if isinstance(value, dict) else value)
             continue
+        node[key] = stats['mean'][col]
+        if isinstance(key, str):
+            for suffix in stat_suffixes:
+                node[f'{key}_{suffix}'] = stats[suffix][col]
+    return merged
 
-        values = [r.get(key) for r in scenario_results]
-        if isinstance(values[0], (int, float, np.number)):
-            avg_result[key] = float(np.mean(values))
-        else:
-            avg_result[key] = values[0]
 
-    return avg_result
+def _kpi_value(result, name):
+    """读取单次结果的KPI：'os_xxx' 对应 order_statistics（列名与 _flatten_order_statistics 一致），其余为顶层key"""
+    if name.startswith('os_'):
+        value = _flatten_order_statistics(result.get('order_statistics', {}), prefix='os_').get(name)
+    else:
+        value = result.get(name)
+    if not isinstance(value, (int, float, np.number)):
+        raise ValueError(f"自适应replication: 结果中没有数值KPI '{name}'")
+    return float(value)
+
+
+def _run_adaptive_replications(groups, make_job, target_ci, min_replications=3, max_replications=30,
+                               replication_budget=None, batch_size=4, workers=1, on_result=None):
+    """自适应replication：每组（场景 / 场景×月份）先跑 min_replications 次，之后按轮追加，
+    直到所有组的 target_ci 中每个KPI的95% CI半宽都不超过目标，或达到 max_replications / replication_budget。
+
+    每轮最多追加 batch_size 次replication，贪心地分给“再加一次后最差KPI的 半宽/目标 下降最多”的组
+    （用当前样本标准差估计：t(n)·s/sqrt(n+1)），已达标或已到上限的组不再追加。
+    分配只取决于已完成的结果和 batch_size，与 workers 无关，所以并行与串行结果逐位一致。
+
+    Args:
+        groups: 组key列表
+        make_job: (组key, rep) -> replication job dict
+        target_ci: {KPI名: 95% CI半宽目标}，KPI名见 _kpi_value（例如 'os_on_time_rate_all', 'avg_truck_wait_time'）
+        replication_budget: 所有组合计的replication上限（含首轮，至少为 len(groups) × max(2, min_replications)，
+            否则抛出 ValueError；None = 只受 max_replications 限制）
+        on_result: 每次replication完成后的回调 (job, result)
+
+    Returns:
+        {组key: [result, ...]}（按rep顺序）
+    """
+    kpis = list(target_ci)
+    targets = np.array([float(target_ci[k]) for k in kpis], dtype=np.float64)
+    if not kpis or np.any(targets <= 0):
+        raise ValueError(f"target_ci 必须是 {{KPI名: 正的CI半宽}}，当前为 {target_ci}")
+    min_replications = max(2, int(min_replications))  # 至少2次才有方差估计
+    max_replications = max(min_replications, int(max_replications))
+    if replication_budget is None:
+        replication_budget = len(groups) * max_replications
+    elif replication_budget < len(groups) * min_replications:
+        raise ValueError(f"replication_budget={replication_budget} 不够首轮：{len(groups)} 组 × "
+                         f"{min_replications} 次 = {len(groups) * min_replications}")
+
+    results = {group: [] for group in groups}
+    kpi_rows = {group: [] for group in groups}
+
+    def run(jobs):
+        for job, result in _iter_replication_results(jobs, workers=workers):
+            group = groups[job['adaptive_group']]
+            results[group].append(result)
+            kpi_rows[group].append([_kpi_value(result, name) for name in kpis])
+            if on_result is not None:
+                on_result(job, result)
+
+    def make(index, rep):
+        return dict(make_job(groups[index], rep), adaptive_group=index)
+
+    run([make(i, rep) for i in range(len(groups)) for rep in range(min_replications)])
+    used = len(groups) * min_replications
+
+    while used < replication_budget:
+        # 每组每个KPI的样本标准差（相对目标）；n次replication时的半宽为 t(n-1)·s/sqrt(n)
+        std = {i: replication_stats(np.array(kpi_rows[group]))['std'] / targets for i, group in enumerate(groups)}
+
+        def half_width(i, n):
+            return float(np.max(_t_critical_95(n - 1) * std[i] / np.sqrt(n)))
+
+        def gain(i, n):
+            """第 n+1 次replication预计能把最差KPI的 半宽/目标 降低多少（已达标或到上限返回None）"""
+            if n >= max_replications or half_width(i, n) <= 1.0:
+                return None
+            return half_width(i, n) - half_width(i, n + 1)
+
+        heap = []
+        for i, group in enumerate(groups):
+            g = gain(i, len(results[group]))
+            if g is not None:
+                heapq.heappush(heap, (-g, i, len(results[group])))
+        batch = []
+        while heap and len(batch) < batch_size and used + len(batch) < replication_budget:
+            _neg_gain, i, n = heapq.heappop(heap)
+            batch.append(make(i, n))
+            g = gain(i, n + 1)
+            if g is not None:
+                heapq.heappush(heap, (-g, i, n + 1))
+        if not batch:
+            break
+        run(batch)
+        used += len(batch)
+
+    return results
+
+
+def _print_adaptive_summary(results, target_ci):
+    """打印自适应模式下每组的replication次数和各KPI的95% CI半宽"""
+    kpis = list(target_ci)
+    print(f"\n自适应replication完成（目标95% CI半宽: {target_ci}）:")
+    for group, group_results in results.items():
+        stats = replication_stats(np.array([[_kpi_value(r, name) for name in kpis] for r in group_results]))
+        ci_text = ', '.join(f"{name}={mean:.3f}±{half:.3f}"
+                            for name, mean, half in zip(kpis, stats['mean'], stats['ci95']))
+        print(f"  {group}: {len(group_results)} 次重复 | {ci_text}")
+
+
+def _month_replication_jobs(scenario_name, scenario_config, num_replications=5, duration_days=30, target_month=1,
+                            seed=DEFAULT_RANDOM_SEED, first_rep=0):
+    """构建单个场景、单个月份的replication job列表（供 _iter_replication_results 执行）。
+
+    rep 从 first_rep 开始编号（自适应模式追加replication时使用），随机流只取决于 (seed, 场景, rep)。
+    """
+    return [
+        {
+            'scenario_name': scenario_name,
+            'scenario_config': scenario_config,
+            'rep': rep,
+            'seed': seed,
+            'scenario_key': scenario_name,
+            'duration_days': duration_days,
+            'target_month': target_month,
+        }
+        for rep in range(first_rep, first_rep + num_replications)
+    ]
+
+
+def _run_one_scenario_one_month(scenario_config, num_replications=5, duration_days=30, target_month=1,
+                                seed=DEFAULT_RANDOM_SEED, workers=1, scenario_name=None):
+    """运行单个场景、单个月份，返回跨replication平均后的结果(dict，含 key_std / key_se / key_ci95)。"""
+    jobs = _month_replication_jobs(
+        scenario_name if scenario_name is not None else scenario_config.get('name'),
+        scenario_config,
+        num_replications=num_replications,
+        duration_days=duration_days,
+        target_month=target_month,
+        seed=seed
+    )
+    scenario_results = [result for _, result in _iter_replication_results(jobs, workers=workers)]
+    return aggregate_replications(scenario_results)
 
 
-def run_yearly_scenario_summary(scenarios_to_run=None, months=None, num_replications=3, duration_days=30):
+def run_yearly_scenario_summary(scenarios_to_run=None, months=None, num_replications=3, duration_days=30,
+                                workers=1, seed=DEFAULT_RANDOM_SEED, target_ci=None, max_replications=30,
+                                replication_budget=None, adaptive_batch_size=4):
     """全年汇总：按月运行仿真，所有KPI对月份取平均（每个scenario一行）。
 
     注意：这里的“全年平均”=对所选 months 的月度结果取算术平均（不是求和）。
+    workers/seed 的含义同 run_scenario_comparison：所有 (scenario, month, replication)
+    job一次性分发到进程池，结果与串行运行逐位一致。
+    target_ci / max_replications / replication_budget / adaptive_batch_size 同 run_scenario_comparison，
+    自适应的单位是 (scenario, month)：每个月份的CI分别达标，预算在所有 (scenario, month) 之间分配。
     """
     if scenarios_to_run is None:
         scenarios_to_run = list(SIMULATION_CONFIG.keys())
 
     # 自动识别有哪些月份
-    global _CACHED_ORDERS_DATA
     if months is None:
-        if _CACHED_ORDERS_DATA is not None:
-            months = _extract_available_months_from_orders_data(_CACHED_ORDERS_DATA)
-        else:
-            # 触发一次读取（构造一个临时sim只为load）
-            try:
-                _ = DCSimulation(simpy.Environment(), SIMULATION_CONFIG[scenarios_to_run[0]], run_id=0)
-                if _CACHED_ORDERS_DATA is not None:
-                    months = _extract_available_months_from_orders_data(_CACHED_ORDERS_DATA)
-            except Exception:
-                months = []
+        try:
+            months = available_order_months()
+        except Exception:
+            months = []
         if not months:
             months = list(range(1, 13))
 
@@ -2588,12 +4194,40 @@ def run_yearly_scenario_summary(scenarios_to_run=None, months=None, num_replicat
     print("=" * 70)
     print(f"场景数量: {len(scenarios_to_run)}")
     print(f"月份范围: {months}")
-    print(f"每月每场景重复次数: {num_replications}")
+    if target_ci:
+        print(f"自适应重复次数: 首轮 {num_replications}, 每月每场景上限 {max_replications}, "
+              f"总预算 {replication_budget if replication_budget is not None else '不限'}, 目标95% CI半宽 {target_ci}")
+    else:
+        print(f"每月每场景重复次数: {num_replications}")
     print(f"每月仿真天数: {duration_days}")
     print("=" * 70)
 
     yearly_rows = {}
 
+    def make_job(group, rep):
+        scenario_name, m = group
+        return _month_replication_jobs(
+            scenario_name,
+            SIMULATION_CONFIG[scenario_name],
+            num_replications=1,
+            duration_days=duration_days,
+            target_month=m,
+            seed=seed,
+            first_rep=rep
+        )[0]
+
+    groups = [(scenario_name, m) for scenario_name in scenarios_to_run for m in months]
+    if target_ci:
+        adaptive_results = _run_adaptive_replications(
+            groups, make_job, target_ci,
+            min_replications=num_replications, max_replications=max_replications,
+            replication_budget=replication_budget, batch_size=adaptive_batch_size, workers=workers
+        )
+        _print_adaptive_summary(adaptive_results, target_ci)
+    else:
+        results_iter = _iter_replication_results(
+            [make_job(group, rep) for group in groups for rep in range(num_replications)], workers=workers)
+
     for scenario_name in scenarios_to_run:
         scenario_config = SIMULATION_CONFIG[scenario_name]
         print(f"\n{'='*70}")
@@ -2603,59 +4237,17 @@ def run_yearly_scenario_summary(scenarios_to_run=None, months=None, num_replicat
         per_month_results = []
         for m in months:
             print(f"\n--- Month {m:02d} ---")
-            avg_month = _run_one_scenario_one_month(
-                scenario_config,
-                num_replications=num_replications,
-                duration_days=duration_days,
-                target_month=m
-            )
-            per_month_results.append(avg_month)
-
-        yearly_avg = {}
-        all_keys = set()
-        for r in per_month_results:
-            all_keys.update(r.keys())
-
-        for key in sorted(all_keys):
-            if key in ['hourly_dock_utilization']:
-                continue
-            if key == 'order_statistics':
-                dicts = [r.get('order_statistics', {}) for r in per_month_results]
-                merged = {}
-                numeric_keys = set()
-                for d in dicts:
-                    if isinstance(d, dict):
-                        for k, v in d.items():
-                            if k == 'fg_outbound_region_stats':
-                                continue
-                            if isinstance(v, (int, float, np.number)):
-                                numeric_keys.add(k)
-                for nk in numeric_keys:
-                    merged[nk] = float(np.mean([d.get(nk, 0) for d in dicts]))
-
-                region_out = {}
-                for rk in ['G2', 'ROW']:
-                    rs_list = [d.get('fg_outbound_region_stats', {}).get(rk, {}) for d in dicts]
-                    if any(rs_list):
-                        region_out[rk] = {}
-                        rs_keys = set()
-                        for rs in rs_list:
-                            if isinstance(rs, dict):
-                                for k, v in rs.items():
-                                    if isinstance(v, (int, float, np.number)):
-                                        rs_keys.add(k)
-                        for k in rs_keys:
-                            region_out[rk][k] = float(np.mean([rs.get(k, 0) for rs in rs_list]))
-                if region_out:
-                    merged['fg_outbound_region_stats'] = region_out
-                yearly_avg[key] = merged
-                continue
-
-            vals = [r.get(key) for r in per_month_results if key in r]
-            if vals and isinstance(vals[0], (int, float, np.number)):
-                yearly_avg[key] = float(np.mean(vals))
+            if target_ci:
+                month_results = adaptive_results[(scenario_name, m)]
             else:
-                yearly_avg[key] = vals[0] if vals else None
+                month_results = [next(results_iter)[1] for _ in range(num_replications)]
+            month_avg = aggregate_replications(month_results, stat_suffixes=())
+            month_avg['num_replications'] = len(month_results)
+            per_month_results.append(month_avg)
+
+        # 月度结果再对月份取平均（不写 _std/_ci95：月份之间的差异不是replication误差）
+        merged = aggregate_replications(per_month_results, stat_suffixes=())
+        yearly_avg = {key: merged[key] for key in sorted(merged) if key != 'hourly_dock_utilization'}
 
         yearly_rows[scenario_name] = yearly_avg
 
@@ -2686,67 +4278,27 @@ def run_scenario_comparison(
     target_month=1,
     scenario_config_transform=None,
     output_suffix='',
-    details_suffix=''
+    details_suffix='',
+    workers=1,
+    seed=DEFAULT_RANDOM_SEED,
+    target_ci=None,
+    max_replications=30,
+    replication_budget=None,
+    adaptive_batch_size=4
 ):
-    """运行多场景对比分析"""
-
-    def _print_closed_timeslot_exposure(sim: 'DCSimulation', base_cfg: dict, scen_cfg: dict):
-        """Print how many scheduled timeslots become unavailable due to scenario-specific closures.
-
-        This is mainly for diagnosing Friday late-shift cancellations.
-        """
-        has_rules = bool(scen_cfg.get('biweekly_shift_cancel')) or bool(scen_cfg.get('shift_cancel_rules'))
-        if not has_rules:
-            return
-
-        if not getattr(sim, 'orders', None):
-            return
-
-        horizon = duration_days * 24
-        month_token = f'M{target_month:02d}'
-
-        month_orders = []
-        for key, orders_list in sim.orders.items():
-            if month_token in key:
-                month_orders.extend(orders_list)
-
-        scoped = [o for o in month_orders if getattr(o, 'timeslot_time', None) is not None and 0 <= o.timeslot_time < horizon]
-        if not scoped:
-            return
-
-        affected = [
-            o for o in scoped
-            if _is_dc_open_at_time(o.timeslot_time, base_cfg) and (not _is_dc_open_at_time(o.timeslot_time, scen_cfg))
-        ]
-
-        total = len(scoped)
-        n_aff = len(affected)
-        if n_aff == 0:
-            print("\n  [诊断] 本场景的额外关门不影响任何订单的原定timeslot（baseline开门而本场景关门的订单数=0）。")
-            return
-
-        by_flow = defaultdict(int)
-        by_hour = defaultdict(int)
-        for o in affected:
-            by_flow[(o.category, o.direction)] += 1
-            di = int(o.timeslot_time) // 24
-            hod = int(o.timeslot_time) % 24
-            day1_weekday = int(scen_cfg.get('day1_weekday', 0))
-            weekday = (day1_weekday + di) % 7
-            by_hour[(weekday, hod)] += 1
-
-        weekday_names = {0: 'Mon', 1: 'Tue', 2: 'Wed', 3: 'Thu', 4: 'Fri', 5: 'Sat', 6: 'Sun'}
-
-        print("\n  [诊断] 额外关门导致‘原定timeslot落在关门时段’的订单：")
-        print(f"    - 影响订单数: {n_aff}/{total} ({n_aff / total * 100:.2f}%)")
-        for (cat, direction), cnt in sorted(by_flow.items(), key=lambda x: (-x[1], x[0][0], x[0][1])):
-            print(f"    - {cat} {direction}: {cnt}")
+    """运行多场景对比分析
+
+    Args:
+        workers: 并行进程数（1=串行，0=使用全部CPU核）。每个 (scenario, replication)
+            是一个独立job，由子进程自建 simpy.Environment 和 DCSimulation。
+        seed: 根随机种子。每个replication的随机流由 (seed, 场景, 重复编号, 月份) 派生
+            （见 make_simulation_rng），所以并行与串行的 all_results / comparison_df 逐位一致。
+        target_ci: 自适应模式（None=固定 num_replications 次）。{KPI名: 95% CI半宽目标}，
+            例如 {'os_on_time_rate_all': 1.0, 'avg_truck_wait_time': 0.05}；此时 num_replications 是每个场景的首轮次数，
+            之后按 _run_adaptive_replications 的规则追加，直到达标或达到 max_replications / replication_budget
+        adaptive_batch_size: 自适应模式每轮追加的replication数（与workers无关，不影响结果的可复现性）
+    """
 
-        top_hours = sorted(by_hour.items(), key=lambda x: -x[1])[:8]
-        if top_hours:
-            hh = ", ".join([f"{weekday_names.get(w, str(w))} {h:02d}:00({c})" for (w, h), c in top_hours])
-            print(f"    - Top受影响时段: {hh}")
-    
     if scenarios_to_run is None:
         scenarios_to_run = list(SIMULATION_CONFIG.keys())
     
@@ -2754,163 +4306,93 @@ def run_scenario_comparison(
     print("DC 运营时间缩短仿真分析")
     print("=" * 70)
     print(f"场景数量: {len(scenarios_to_run)}")
-    print(f"每场景重复次数: {num_replications}")
+    if target_ci:
+        print(f"自适应重复次数: 首轮 {num_replications}, 每场景上限 {max_replications}, "
+              f"总预算 {replication_budget if replication_budget is not None else '不限'}, 目标95% CI半宽 {target_ci}")
+    else:
+        print(f"每场景重复次数: {num_replications}")
     print(f"仿真天数: {duration_days}")
     print(f"目标月份: {target_month}")
+    if _resolve_workers(workers) > 1:
+        print(f"并行进程数: {_resolve_workers(workers)}")
     print("=" * 70)
     
     all_results = {}
-    
+
+    # transform在主进程里应用（transform通常是闭包，不能pickle），子进程只拿到最终的配置dict
+    scenario_configs = {}
     for scenario_name in scenarios_to_run:
         base_scenario_config = SIMULATION_CONFIG[scenario_name]
         scenario_config = base_scenario_config
         if scenario_config_transform is not None:
             scenario_config = scenario_config_transform(scenario_config)
-        print(f"\n{'='*70}")
-        print(f"运行场景: {scenario_config['name']}")
-        print(f"{'='*70}")
-        
-        scenario_results = []
-        
-        for rep in range(num_replications):
-            print(f"\n--- 重复 {rep + 1}/{num_replications} ---")
-            
-            # 创建新的仿真环境
-            env = simpy.Environment()
-            sim = DCSimulation(env, scenario_config, run_id=rep+1)
+        scenario_configs[scenario_name] = (base_scenario_config, scenario_config)
+
+    def make_job(scenario_name, rep):
+        base_scenario_config, scenario_config = scenario_configs[scenario_name]
+        return {
+            'scenario_name': scenario_name,
+            'scenario_config': scenario_config,
+            'base_scenario_config': base_scenario_config,
+            'rep': rep,
+            'seed': seed,
+            'scenario_key': scenario_name,
+            'duration_days': duration_days,
+            'target_month': target_month,
+            'header': (f"\n--- {scenario_name} 重复 {rep + 1} ---" if target_ci
+                       else f"\n--- 重复 {rep + 1}/{num_replications} ---"),
+        }
 
-            # 诊断：本场景的额外关门到底影响了多少“原定timeslot”订单
-            if rep == 0:
-                _print_closed_timeslot_exposure(sim, base_scenario_config, scenario_config)
-            
-            # 运行仿真
-            result = sim.run(duration_days=duration_days, target_month=target_month)
-            scenario_results.append(result)
-            
-            # 打印关键指标
-            print(f"\n  === 流量统计 ===")
-            print(f"  Inbound总量: {result.get('total_inbound_pallets', 0):.0f} pallets")
-            print(f"    - FG: {result.get('FG_inbound_pallets', 0):.0f}")
-            print(f"    - R&P: {result.get('R&P_inbound_pallets', 0):.0f}")
-            print(f"  Outbound总量: {result.get('total_outbound_pallets', 0):.0f} pallets")
-            print(f"    - FG: {result.get('FG_outbound_pallets', 0):.0f}")
-            print(f"    - R&P: {result.get('R&P_outbound_pallets', 0):.0f}")
-            
-            print(f"\n  === 延期情况 ===")
-            print(f"  Inbound 24h延期: {result.get('total_inbound_delays', 0)} 订单 ({result.get('total_delayed_pallets', 0):.0f} pallets)")
-            if result.get('total_inbound_delays', 0) > 0:
-                print(f"    - 平均延期: {result.get('avg_inbound_delay_hours', 0):.2f}h")
-                print(f"    - FG延期: {result.get('fg_inbound_delays', 0)}, R&P延期: {result.get('rp_inbound_delays', 0)}")
-            os_ = result.get('order_statistics', {})
-            print(f"  完成率: {os_.get('completion_rate', 0):.1f}%")
-            print(f"  准时率(所有订单): {os_.get('on_time_rate_all', os_.get('on_time_rate', 0)):.1f}%")
-            print(f"  准时率(仅已完成订单): {os_.get('on_time_rate_completed', 0):.1f}%")
-            
-            print(f"\n  === 资源利用 ===")
-            print(f"  平均卡车等待时间: {result['avg_truck_wait_time']:.2f} 小时")
-            print(f"  平均午夜积压: {result['avg_midnight_backlog_pallets']:.1f} 托盘")
-            
-            # 显示FTE利用率（简化版）
-            if 'overall_fte_utilization_rate' in result:
-                print(f"\n  === FTE利用情况 ===")
-                print(f"  整体FTE利用率: {result['overall_fte_utilization_rate']:.1%}")
-                print(f"  实际使用: {result.get('total_fte_used', 0):.1f} FTE, 可用: {result.get('total_fte_available', 0):.1f} FTE")
-                for category in ['FG', 'R&P']:
-                    for direction in ['inbound', 'outbound']:
-                        key_util = f'{category}_{direction}_fte_utilization_rate'
-                        key_used = f'{category}_{direction}_fte_used'
-                        key_available = f'{category}_{direction}_fte_available'
-                        
-                        if key_util in result:
-                            used = result.get(key_used, 0)
-                            available = result.get(key_available, 0)
-                            util = result[key_util]
-                            print(f"    {category} {direction.capitalize()}: {util:.1%} (使用{used:.1f} / 可用{available:.1f} FTE)")
-            
-            # 显示码头利用率
-            if result.get('avg_dock_utilization', 0) > 0:
-                print(f"\n  === Timeslot利用率 ===")
-                print(f"  整体平均利用率: {result['avg_dock_utilization']:.1%}")
-                print(f"  Loading码头: 平均 {result['loading_avg_utilization']:.1%}, 峰值 {result['loading_peak_utilization']:.1%}")
-                print(f"  Reception码头: 平均 {result['reception_avg_utilization']:.1%}, 峰值 {result['reception_peak_utilization']:.1%}")
-                print(f"    - FG码头: {result['FG_dock_avg_utilization']:.1%}")
-                print(f"    - R&P码头: {result['R&P_dock_avg_utilization']:.1%}")
-            
-            # 导出详细数据（仅第一次重复）- 已禁用以减少文件数量
-            # if rep == 0:
-            #     output_path = os.path.join(RESULTS_DIR, f'simulation_details_{scenario_name}{details_suffix}.xlsx')
-            #     sim.kpi.export_to_excel(output_path)
-        
-        # 计算平均结果
-        avg_result = {}
-        for key in scenario_results[0].keys():
-            # 跳过字典类型的数据（如hourly_dock_utilization, order_statistics）
-            if key in ['hourly_dock_utilization', 'order_statistics']:
-                if key == 'order_statistics':
-                    # 对常用KPI做跨重复平均，避免“只看第一次重复”的偏差
-                    dicts = [r.get('order_statistics', {}) for r in scenario_results]
-                    numeric_keys = [
-                        'total_orders', 'completed_orders', 'incomplete_orders',
-                        'on_time_orders', 'delayed_orders', 'total_delay_hours',
-                        'completion_rate', 'on_time_rate', 'on_time_rate_all', 'on_time_rate_completed',
-                        'avg_delay_hours',
-                        'day1_outbound_orders', 'day1_to_day2_outbound_orders', 'day1_to_day2_outbound_rate'
-                    ]
-
-                    # Flow-level metrics (FG/R&P × Inbound/Outbound)
-                    for prefix in ['FG_inbound', 'FG_outbound', 'RP_inbound', 'RP_outbound']:
-                        numeric_keys.extend([
-                            f'{prefix}_total_orders',
-                            f'{prefix}_completed_orders',
-                            f'{prefix}_completion_rate',
-                            f'{prefix}_on_time_orders',
-                            f'{prefix}_on_time_rate_all',
-                            f'{prefix}_on_time_rate_completed',
-                        ])
-                    merged = {}
-                    for nk in numeric_keys:
-                        vals = [d.get(nk, 0) for d in dicts]
-                        merged[nk] = float(np.mean(vals))
-                    # 地区统计：同样做均值（如果存在）
-                    region_keys = ['G2', 'ROW']
-                    region_out = {}
-                    for rk in region_keys:
-                        rs_list = [d.get('fg_outbound_region_stats', {}).get(rk, {}) for d in dicts]
-                        if any(rs_list):
-                            region_out[rk] = {
-                                'total_orders': float(np.mean([rs.get('total_orders', 0) for rs in rs_list])),
-                                'completed_orders': float(np.mean([rs.get('completed_orders', 0) for rs in rs_list])),
-                                'on_time_orders': float(np.mean([rs.get('on_time_orders', 0) for rs in rs_list])),
-                                'delayed_orders': float(np.mean([rs.get('delayed_orders', 0) for rs in rs_list])),
-                                'completion_rate': float(np.mean([rs.get('completion_rate', 0.0) for rs in rs_list])),
-                                'on_time_rate_all': float(np.mean([rs.get('on_time_rate_all', 0.0) for rs in rs_list])),
-                                'on_time_rate_completed': float(np.mean([rs.get('on_time_rate_completed', 0.0) for rs in rs_list])),
-                            }
-                    if region_out:
-                        merged['fg_outbound_region_stats'] = region_out
-                    avg_result[key] = merged
-                else:
-                    # hourly_dock_utilization 目前不做跨重复平均（结构较复杂）
-                    avg_result[key] = scenario_results[0][key]
-                continue
+    if target_ci:
+        adaptive_results = _run_adaptive_replications(
+            scenarios_to_run, make_job, target_ci,
+            min_replications=num_replications, max_replications=max_replications,
+            replication_budget=replication_budget, batch_size=adaptive_batch_size, workers=workers,
+            on_result=lambda _job, result: _print_replication_result(result)
+        )
+        _print_adaptive_summary(adaptive_results, target_ci)
+    else:
+        results_iter = _iter_replication_results(
+            [make_job(scenario_name, rep) for scenario_name in scenarios_to_run for rep in range(num_replications)],
+            workers=workers
+        )
+    
+    for scenario_name in scenarios_to_run:
+        scenario_config = scenario_configs[scenario_name][1]
+        if target_ci:
+            scenario_results = adaptive_results[scenario_name]
+        else:
+            print(f"\n{'='*70}")
+            print(f"运行场景: {scenario_config['name']}")
+            print(f"{'='*70}")
             
-            # 检查值是否为数值类型
-            values = [r[key] for r in scenario_results]
-            if isinstance(values[0], (int, float, np.number)):
-                avg_result[key] = np.mean(values)
-                avg_result[f'{key}_std'] = np.std(values)
-            else:
-                # 非数值类型，使用第一个值
-                avg_result[key] = values[0]
+            scenario_results = []
+            for _ in range(num_replications):
+                _job, result = next(results_iter)
+                scenario_results.append(result)
+                
+                # 打印关键指标
+                _print_replication_result(result)
+                
+                # 导出详细数据（仅第一次重复）- 已禁用以减少文件数量
+                # if rep == 0:
+                #     output_path = os.path.join(RESULTS_DIR, f'simulation_details_{scenario_name}{details_suffix}.xlsx')
+                #     sim.kpi.export_to_excel(output_path)
+        
+        # 计算平均结果（每个数值指标附带 _std / _se / _ci95，含 order_statistics 和 hourly_dock_utilization）
+        avg_result = aggregate_replications(scenario_results)
+        avg_result['num_replications'] = len(scenario_results)
         
         all_results[scenario_name] = avg_result
         
-        print(f"\n{scenario_config['name']} - 平均结果 ({num_replications} 次重复):")
+        print(f"\n{scenario_config['name']} - 平均结果 ({len(scenario_results)} 次重复):")
         aos = avg_result.get('order_statistics', {})
         print(f"  完成率: {aos.get('completion_rate', 0):.1f}%")
         print(f"  准时率(所有订单): {aos.get('on_time_rate_all', aos.get('on_time_rate', 0)):.1f}%")
-        print(f"  平均卡车等待时间: {avg_result['avg_truck_wait_time']:.2f} ± {avg_result['avg_truck_wait_time_std']:.2f} 小时")
-        print(f"  平均午夜积压: {avg_result['avg_midnight_backlog_pallets']:.1f} ± {avg_result['avg_midnight_backlog_pallets_std']:.1f} 托盘")
+        print(f"  平均卡车等待时间: {avg_result['avg_truck_wait_time']:.2f} ± {avg_result['avg_truck_wait_time_std']:.2f} 小时"
+              f" (95% CI ±{avg_result['avg_truck_wait_time_ci95']:.2f})")
+        print(f"  平均午夜积压: {avg_result['avg_midnight_backlog_pallets']:.1f} ± {avg_result['avg_midnight_backlog_pallets_std']:.1f} 托盘"
+              f" (95% CI ±{avg_result['avg_midnight_backlog_pallets_ci95']:.1f})")
     
     # 生成对比表格
     comparison_df = pd.DataFrame(all_results).T
@@ -2928,6 +4410,145 @@ def run_scenario_comparison(
     return all_results, comparison_df
 
 
+def _flat_kpis(result):
+    """单次结果的全部数值KPI（顶层数值key + order_statistics 的 os_* 列），用于配对差分"""
+    flat = {k: float(v) for k, v in result.items() if isinstance(v, (int, float, np.number))}
+    flat.update(_flatten_order_statistics(result.get('order_statistics', {}), prefix='os_'))
+    return flat
+
+
+def run_paired_comparison(
+    scenarios_to_run=None,
+    reference='baseline',
+    num_replications=5,
+    duration_days=30,
+    target_month=1,
+    scenario_config_transform=None,
+    kpis=None,
+    output_suffix='',
+    workers=1,
+    seed=DEFAULT_RANDOM_SEED
+):
+    """配对（common random numbers）场景对比：报告每个场景相对 reference 的逐replication差值及其95% CI。
+
+    所有场景的第 rep 次replication使用同一组随机流（scenario_key=None，见 make_simulation_rng），
+    因此 “场景X − reference” 的差值里两者共有的随机波动相互抵消，
+    同样精度所需的replication数远少于独立抽样。
+    订单处理中的产能波动按 (调用位置, 订单号) 各取一条子流（见 DCSimulation.order_stream），
+    开门时间不同、调用次数和顺序不同的场景里，同一订单仍抽到相同的波动序列。
+    差值统计与独立抽样时的对比也一并给出（variance_ratio = 独立抽样差值方差 / 配对差值方差）。
+
+    Args:
+        reference: 参照场景（不在 scenarios_to_run 里时自动加入）
+        kpis: 要比较的KPI名列表（顶层key或 os_* 列；None=全部数值KPI）
+
+    Returns:
+        (all_results, paired_df): all_results 与 run_scenario_comparison 相同（跨replication汇总）；
+        paired_df 每行一个 (scenario, kpi)
+    """
+    if scenarios_to_run is None:
+        scenarios_to_run = list(SIMULATION_CONFIG.keys())
+    scenarios_to_run = list(scenarios_to_run)
+    if reference not in scenarios_to_run:
+        scenarios_to_run.insert(0, reference)
+
+    print("=" * 70)
+    print("DC 配对场景对比（common random numbers）")
+    print("=" * 70)
+    print(f"参照场景: {reference}")
+    print(f"场景数量: {len(scenarios_to_run)}")
+    print(f"每场景重复次数: {num_replications}")
+    print(f"仿真天数: {duration_days}")
+    print(f"目标月份: {target_month}")
+    print("=" * 70)
+
+    jobs = []
+    for scenario_name in scenarios_to_run:
+        scenario_config = SIMULATION_CONFIG[scenario_name]
+        if scenario_config_transform is not None:
+            scenario_config = scenario_config_transform(scenario_config)
+        jobs.extend(
+            {
+                'scenario_name': scenario_name,
+                'scenario_config': scenario_config,
+                'rep': rep,
+                'seed': seed,
+                'scenario_key': None,  # 所有场景共享第 rep 次replication的随机流
+                'duration_days': duration_days,
+                'target_month': target_month,
+                'header': f"\n--- {scenario_name} 重复 {rep + 1}/{num_replications} ---",
+            }
+            for rep in range(num_replications)
+        )
+
+    results = {scenario_name: [] for scenario_name in scenarios_to_run}
+    for job, result in _iter_replication_results(jobs, workers=workers):
+        results[job['scenario_name']].append(result)
+
+    all_results = {}
+    for scenario_name, scenario_results in results.items():
+        all_results[scenario_name] = aggregate_replications(scenario_results)
+        all_results[scenario_name]['num_replications'] = len(scenario_results)
+
+    # KPI矩阵：(reps, kpis)，reference 与各场景逐replication配对
+    flat = {scenario_name: [_flat_kpis(r) for r in scenario_results] for scenario_name, scenario_results in results.items()}
+    if kpis is None:
+        kpis = list(flat[reference][0])
+    matrices = {
+        scenario_name: np.array([[rep_kpis.get(k, np.nan) for k in kpis] for rep_kpis in rows], dtype=np.float64)
+        for scenario_name, rows in flat.items()
+    }
+    ref = matrices[reference]
+    ref_stats = replication_stats(ref)
+
+    rows = []
+    for scenario_name in scenarios_to_run:
+        if scenario_name == reference:
+            continue
+        values = matrices[scenario_name]
+        scen_stats = replication_stats(values)
+        diff_stats = replication_stats(values - ref)
+        # 独立抽样时差值均值的标准误（对照用）
+        unpaired_se = np.sqrt(scen_stats['se'] ** 2 + ref_stats['se'] ** 2)
+        unpaired_ci = _t_critical_95(2 * num_replications - 2) * unpaired_se
+        paired_var = diff_stats['std'] ** 2
+        unpaired_var = scen_stats['std'] ** 2 + ref_stats['std'] ** 2
+        variance_ratio = np.divide(unpaired_var, paired_var, out=np.full(len(kpis), np.nan), where=paired_var > 0)
+        for j, kpi in enumerate(kpis):
+            rows.append({
+                'scenario': scenario_name,
+                'reference': reference,
+                'kpi': kpi,
+                'reference_mean': ref_stats['mean'][j],
+                'scenario_mean': scen_stats['mean'][j],
+                'diff_mean': diff_stats['mean'][j],
+                'diff_std': diff_stats['std'][j],
+                'diff_ci95': diff_stats['ci95'][j],
+                'diff_ci95_low': diff_stats['mean'][j] - diff_stats['ci95'][j],
+                'diff_ci95_high': diff_stats['mean'][j] + diff_stats['ci95'][j],
+                'unpaired_ci95': unpaired_ci[j],
+                'variance_ratio': variance_ratio[j],
+                'num_replications': num_replications,
+            })
+    paired_df = pd.DataFrame(rows)
+
+    if not paired_df.empty:
+        print(f"\n配对差值（场景 − {reference}，95% CI）:")
+        headline = [k for k in ('os_completion_rate', 'os_on_time_rate_all', 'avg_truck_wait_time') if k in kpis]
+        for _, row in paired_df[paired_df['kpi'].isin(headline)].iterrows():
+            print(f"  {row['scenario']:<16s} {row['kpi']:<22s} {row['diff_mean']:+8.3f} ± {row['diff_ci95']:.3f}"
+                  f"  (独立抽样 ± {row['unpaired_ci95']:.3f})")
+
+    comparison_df = pd.DataFrame(all_results).T
+    paired_path = os.path.join(RESULTS_DIR, f'simulation_results_paired{output_suffix}.xlsx')
+    with pd.ExcelWriter(paired_path, engine='openpyxl') as writer:
+        paired_df.to_excel(writer, sheet_name='Paired_Differences', index=False)
+        comparison_df.to_excel(writer, sheet_name='Scenario_Means')
+    print(f"\nPaired comparison saved to: {paired_path}")
+
+    return all_results, paired_df
+
+
 def _scenario_transform_fte_power(alpha=0.8, baseline_hours=18):
     """Scenario-A transform: keep everything same, only apply power-law FTE hourly efficiency."""
     def _t(cfg: dict):
@@ -4593,14 +6214,51 @@ def visualize_results(comparison_df, all_results=None):
 # ==================== Main Program Entry ====================
 
 if __name__ == '__main__':
-    # 设置随机种子以确保可重复性
-    np.random.seed(42)
+    parser = argparse.ArgumentParser(description='DC运营时间缩短仿真')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='并行进程数：1=串行（默认），0=使用全部CPU核')
+    parser.add_argument('--target-ci', action='append', default=[], metavar='KPI=HALF_WIDTH',
+                        help="自适应重复次数：KPI的95%%置信区间半宽目标，可重复，"
+                             "例如 --target-ci os_on_time_rate_all=1.0 --target-ci avg_truck_wait_time=0.05")
+    parser.add_argument('--max-replications', type=int, default=30,
+                        help='自适应模式下每个场景（全年汇总为每个场景×月份）的重复次数上限')
+    parser.add_argument('--replication-budget', type=int, default=None,
+                        help='自适应模式下一次对比运行的总重复次数上限（含首轮，'
+                             '至少为 组数 × 首轮次数 num_replications（最少按2计）；默认不限）')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='不读写仿真结果缓存（outputs/result_cache），所有replication重新仿真')
+    parser.add_argument('--cache-max-size', default=None, metavar='SIZE',
+                        help='运行结束后按LRU把结果缓存淘汰到该大小以下，例如 2GB；'
+                             '查看/清理缓存见 python src/result_cache.py --help')
+    args = parser.parse_args()
+    WORKERS = args.workers
+    if args.no_cache:
+        RESULT_CACHE = None
+
+    # 未指定 --target-ci 时保持固定的 num_replications；指定后 num_replications 只是首轮次数
+    ADAPTIVE_REPLICATIONS = {}
+    if args.target_ci:
+        target_ci = {}
+        for item in args.target_ci:
+            kpi, sep, half_width = item.partition('=')
+            if not sep:
+                parser.error(f'--target-ci 需要 KPI=HALF_WIDTH 格式: {item}')
+            target_ci[kpi.strip()] = float(half_width)
+        ADAPTIVE_REPLICATIONS = {
+            'target_ci': target_ci,
+            'max_replications': args.max_replications,
+            'replication_budget': args.replication_budget,
+        }
+
+    # 可重复性：每次replication的随机流由 DEFAULT_RANDOM_SEED、场景、run_id和目标月份派生（见 make_simulation_rng），
+    # 不再依赖全局 np.random.seed
 
     # 选择仿真月份（generated_orders.json 按 M01..M12 分组）
     TARGET_MONTH = 1
     
     RUN_SINGLE_MONTH = False
     RUN_YEARLY_SUMMARY = False  # Case 1: 时间窗口变化影响的FTE分析
+    RUN_PAIRED_COMPARISON = False  # 配对对比（CRN）：各场景相对baseline的差值及95% CI
     RUN_FTE_POWER_OVERLAY = True  # Case 2: α=0.7,0.8,0.9的FTE弹性分析
     RUN_BIWEEKLY_FRIDAY_LATE_SHIFT_CANCEL_OVERLAY = False  # Scenario A: no timeslot compression
     RUN_FRIDAY_LATE_SHIFT_CANCEL_ON_SELECTED_WINDOWS = False  # Case 3: 班次灵活性策略的FTE分析
@@ -4613,6 +6271,8 @@ if __name__ == '__main__':
         results_base, comparison_df_base = run_scenario_comparison(
             scenarios_to_run=None,
             num_replications=3,
+            workers=WORKERS,
+            **ADAPTIVE_REPLICATIONS,
             duration_days=30,
             target_month=TARGET_MONTH,
         )
@@ -4629,6 +6289,8 @@ if __name__ == '__main__':
             res, _df = run_scenario_comparison(
                 scenarios_to_run=None,
                 num_replications=3,
+                workers=WORKERS,
+                **ADAPTIVE_REPLICATIONS,
                 duration_days=30,
                 target_month=TARGET_MONTH,
                 scenario_config_transform=_scenario_transform_fte_power(
@@ -4662,6 +6324,8 @@ if __name__ == '__main__':
         results, comparison_df = run_scenario_comparison(
             scenarios_to_run=None,
             num_replications=3,  # 每个场景重复 3 次
+            workers=WORKERS,
+            **ADAPTIVE_REPLICATIONS,
             duration_days=30,    # 仿真 30 天
             target_month=TARGET_MONTH
         )
@@ -4679,6 +6343,8 @@ if __name__ == '__main__':
         base_res, _base_df = run_scenario_comparison(
             scenarios_to_run=scenarios_to_run,
             num_replications=3,
+            workers=WORKERS,
+            **ADAPTIVE_REPLICATIONS,
             duration_days=30,
             target_month=TARGET_MONTH,
             output_suffix='_biwkfri_base',
@@ -4688,6 +6354,8 @@ if __name__ == '__main__':
         biweekly_res, _biweekly_df = run_scenario_comparison(
             scenarios_to_run=scenarios_to_run,
             num_replications=3,
+            workers=WORKERS,
+            **ADAPTIVE_REPLICATIONS,
             duration_days=30,
             target_month=TARGET_MONTH,
             scenario_config_transform=_scenario_transform_biweekly_cancel_friday_late_shift(
@@ -4703,6 +6371,8 @@ if __name__ == '__main__':
         weekly_res, _weekly_df = run_scenario_comparison(
             scenarios_to_run=scenarios_to_run,
             num_replications=3,
+            workers=WORKERS,
+            **ADAPTIVE_REPLICATIONS,
             duration_days=30,
             target_month=TARGET_MONTH,
             scenario_config_transform=_scenario_transform_weekly_cancel_friday_late_shift(
@@ -4716,6 +6386,8 @@ if __name__ == '__main__':
         weekly_full_off_res, _weekly_full_off_df = run_scenario_comparison(
             scenarios_to_run=scenarios_to_run,
             num_replications=3,
+            workers=WORKERS,
+            **ADAPTIVE_REPLICATIONS,
             duration_days=30,
             target_month=TARGET_MONTH,
             scenario_config_transform=_scenario_transform_weekly_cancel_friday_full_day(
@@ -4728,6 +6400,8 @@ if __name__ == '__main__':
         tue_thu_res, _tue_thu_df = run_scenario_comparison(
             scenarios_to_run=scenarios_to_run,
             num_replications=3,
+            workers=WORKERS,
+            **ADAPTIVE_REPLICATIONS,
             duration_days=30,
             target_month=TARGET_MONTH,
             scenario_config_transform=_scenario_transform_weekly_cancel_tue_thu_late_shift(
@@ -4772,6 +6446,8 @@ if __name__ == '__main__':
         base_res, _base_df = run_scenario_comparison(
             scenarios_to_run=scenarios_to_run,
             num_replications=3,
+            workers=WORKERS,
+            **ADAPTIVE_REPLICATIONS,
             duration_days=30,
             target_month=TARGET_MONTH,
             output_suffix='_fri_cancel_tw_base',
@@ -4781,6 +6457,8 @@ if __name__ == '__main__':
         biweekly_res, _biweekly_df = run_scenario_comparison(
             scenarios_to_run=scenarios_to_run,
             num_replications=3,
+            workers=WORKERS,
+            **ADAPTIVE_REPLICATIONS,
             duration_days=30,
             target_month=TARGET_MONTH,
             scenario_config_transform=_scenario_transform_biweekly_cancel_friday_late_shift_with_fte_adjustment(
@@ -4797,6 +6475,8 @@ if __name__ == '__main__':
         weekly_res, _weekly_df = run_scenario_comparison(
             scenarios_to_run=scenarios_to_run,
             num_replications=3,
+            workers=WORKERS,
+            **ADAPTIVE_REPLICATIONS,
             duration_days=30,
             target_month=TARGET_MONTH,
             scenario_config_transform=_scenario_transform_weekly_cancel_friday_late_shift_with_fte_adjustment(
@@ -4811,6 +6491,8 @@ if __name__ == '__main__':
         weekly_full_off_res, _weekly_full_off_df = run_scenario_comparison(
             scenarios_to_run=scenarios_to_run,
             num_replications=3,
+            workers=WORKERS,
+            **ADAPTIVE_REPLICATIONS,
             duration_days=30,
             target_month=TARGET_MONTH,
             scenario_config_transform=_scenario_transform_weekly_cancel_friday_full_day_with_fte_adjustment(
@@ -4824,6 +6506,8 @@ if __name__ == '__main__':
         tue_thu_res, _tue_thu_df = run_scenario_comparison(
             scenarios_to_run=scenarios_to_run,
             num_replications=3,
+            workers=WORKERS,
+            **ADAPTIVE_REPLICATIONS,
             duration_days=30,
             target_month=TARGET_MONTH,
             scenario_config_transform=_scenario_transform_weekly_cancel_tue_thu_late_shift_with_fte_adjustment(
@@ -4904,6 +6588,8 @@ if __name__ == '__main__':
         results_case1, comparison_df_case1 = run_scenario_comparison(
             scenarios_to_run=None,
             num_replications=3,
+            workers=WORKERS,
+            **ADAPTIVE_REPLICATIONS,
             duration_days=30,
             target_month=TARGET_MONTH
         )
@@ -4921,8 +6607,26 @@ if __name__ == '__main__':
             scenarios_to_run=None,
             months=None,          # 自动识别 generated_orders.json 里有哪些月份
             num_replications=3,
+            workers=WORKERS,
+            **ADAPTIVE_REPLICATIONS,
             duration_days=30
         )
+
+    if RUN_PAIRED_COMPARISON:
+        # 各场景与baseline使用相同的随机流（CRN），直接给出“场景 − baseline”的差值及95% CI
+        run_paired_comparison(
+            scenarios_to_run=None,
+            reference='baseline',
+            num_replications=3,
+            workers=WORKERS,
+            duration_days=30,
+            target_month=TARGET_MONTH
+        )
+    
+    if RESULT_CACHE is not None and args.cache_max_size:
+        removed, freed = RESULT_CACHE.evict(result_cache.parse_size(args.cache_max_size))
+        if removed:
+            print(f"\n结果缓存: 按LRU淘汰 {removed} 个条目，释放 {result_cache.format_size(freed)}")
     
     print("\n" + "="*70)
     print("仿真分析完成！生成的文件：")
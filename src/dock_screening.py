@@ -0,0 +1,109 @@
+"""
+码头容量快速筛选（screening）- 不运行simpy，直接用NumPy计算每类码头的小时容量排队
+
+适用问题：只改 SYSTEM_PARAMETERS['hourly_dock_capacity']（例如“20:00的装货slot减1”）的 what-if。
+每类码头（fg_loading / rp_loading / fg_reception / rp_reception）视为一个确定性的小时容量队列：
+卡车在 timeslot 所在小时到达，每小时最多服务 capacity[h] 辆，未服务的顺延到下一小时。
+
+设 A(h) 为截至第h小时（含）累计到达数，C(h) 为累计容量，则截至第h小时累计服务数为
+
+    D(h) = C(h) + min(0, min_{k<=h} (A(k) - C(k)))
+
+（min-plus 卷积的闭式解），全部是 cumsum / minimum.accumulate，可以一次性对成千上万组容量配置计算。
+
+与 DCSimulation 的差异（screening 的适用范围）：
+- Outbound 假设备货都能在 timeslot 前完成（不含备货延误导致的重排）；
+- 同一小时内谁先拿到slot与仿真的轮询顺序不同，因此单个订单的等待时间不可直接对比；
+  排队长度、等待车辆·小时、每小时 used/available 等与服务顺序无关的指标才是可比的
+  （交叉验证见 scripts/dock_capacity_screening.py）。
+"""
+
+import numpy as np
+
+# slot_key -> (category, dock_type, direction)，与 DCSimulation.hourly_timeslot_capacity 的key一致
+DOCK_SLOTS = {
+    'fg_loading': ('FG', 'loading', 'Outbound'),
+    'rp_loading': ('R&P', 'loading', 'Outbound'),
+    'fg_reception': ('FG', 'reception', 'Inbound'),
+    'rp_reception': ('R&P', 'reception', 'Inbound'),
+}
+
+
+def hourly_capacity_schedule(cap_map, open_mask):
+    """把 {hour_of_day: slots}（支持字符串/整数键）展开为逐小时容量数组，DC关门的小时容量为0。
+
+    Args:
+        cap_map: 例如 SYSTEM_PARAMETERS['hourly_dock_capacity']['FG']['loading']
+        open_mask: bool数组，open_mask[h] 表示第h小时开始时DC是否开门
+
+    Returns:
+        int64 数组，长度与 open_mask 相同
+    """
+    open_mask = np.asarray(open_mask, dtype=bool)
+    per_hour = np.array([cap_map.get(h, cap_map.get(str(h), 0)) for h in range(24)], dtype=np.int64)
+    return np.where(open_mask, per_hour[np.arange(len(open_mask)) % 24], 0)
+
+
+def arrivals_per_hour(arrival_times, horizon_hours):
+    """把到达时刻（仿真小时）按所在小时计数，超出 [0, horizon_hours) 的忽略。"""
+    hours = np.floor(np.asarray(arrival_times, dtype=np.float64)).astype(np.int64)
+    hours = hours[(hours >= 0) & (hours < horizon_hours)]
+    return np.bincount(hours, minlength=horizon_hours)
+
+
+def evaluate_dock_queue(arrivals, capacity):
+    """计算小时容量队列。
+
+    Args:
+        arrivals: (H,) 每小时到达数
+        capacity: (H,) 或 (K, H) 每小时容量；K 组配置一次计算
+
+    Returns:
+        dict，逐小时数组的形状与 capacity 相同，汇总指标的形状为 capacity.shape[:-1]：
+            used / available / queue (每小时结束时仍在排队的车辆数)
+            served_cum, arrivals, served, unserved, truck_hours_waiting, max_queue, utilization
+    """
+    arrivals = np.asarray(arrivals, dtype=np.int64)
+    capacity = np.asarray(capacity, dtype=np.int64)
+    cum_arrivals = np.cumsum(arrivals)
+    cum_capacity = np.cumsum(capacity, axis=-1)
+    served_cum = cum_capacity + np.minimum(0, np.minimum.accumulate(cum_arrivals - cum_capacity, axis=-1))
+    used = np.diff(served_cum, axis=-1, prepend=0)
+    queue = cum_arrivals - served_cum
+    total_capacity = capacity.sum(axis=-1)
+
+    return {
+        'used': used,
+        'available': capacity,
+        'queue': queue,
+        'served_cum': served_cum,
+        'arrivals': int(cum_arrivals[-1]) if len(cum_arrivals) else 0,
+        'served': served_cum[..., -1],
+        'unserved': queue[..., -1],
+        'truck_hours_waiting': queue.sum(axis=-1),
+        'max_queue': queue.max(axis=-1),
+        'utilization': np.divide(used.sum(axis=-1), total_capacity,
+                                 out=np.zeros(np.shape(total_capacity), dtype=np.float64),
+                                 where=total_capacity > 0),
+    }
+
+
+def assign_slots(arrival_times, served_cum):
+    """按到达先后（FIFO）给每辆卡车分配服务小时（单组配置）。
+
+    Args:
+        arrival_times: 到达时刻（仿真小时），任意顺序
+        served_cum: evaluate_dock_queue 返回的 (H,) 累计服务数
+
+    Returns:
+        (slot_hour, delay_hours): 与 arrival_times 同顺序；仿真窗口内未服务的卡车 slot_hour = H，delay 为 NaN
+    """
+    arrival_times = np.asarray(arrival_times, dtype=np.float64)
+    arrival_hours = np.floor(arrival_times).astype(np.int64)
+    order = np.argsort(arrival_hours, kind='stable')
+    horizon = len(served_cum)
+
+    slot_hour = np.empty(len(arrival_hours), dtype=np.int64)
+    slot_hour[order] = np.searchsorted(served_cum, np.arange(len(order)), side='right')
+    delay = np.where(slot_hour < horizon, slot_hour - arrival_hours, np.nan)
+    return slot_hour, delay
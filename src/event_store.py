@@ -0,0 +1,254 @@
+"""
+追踪事件列式日志 - OrderTracker 的磁盘事件sink
+
+仿真过程中事件先缓存在内存里，每满 chunk_size 条写出一个分块（每列一个 .npy 文件，可内存映射）::
+
+    order_flow_events/
+        manifest.json          # 事件代码表、每个分块的行数/字段类型/分类编码表
+        order_ids.npy          # 订单编码 -> order_id
+        order_chunks.npy       # 订单编码 -> [首个分块, 最后分块]（按order_id查询时只打开这些分块）
+        C00000/order.npy       # 订单编码（int32）
+        C00000/event.npy       # 事件代码编码（int16）
+        C00000/sim_time.npy    # float64
+        C00000/details.npy     # 现成描述文字的分类编码（int32，-1表示没有）
+        C00000/f_<字段>.npy    # log_event 的原始字段
+        C00000/order_sort.npy  # 按订单编码稳定排序后的行号（同一订单的事件连续且保持时间顺序）
+        C00001/...
+
+字段在分块内按取值推断存储类型：
+  'bool'  : int8，-1表示None
+  'int'   : float64，NaN表示None（读取时还原为int）
+  'float' : float64，NaN表示None
+  'cat'   : 分类编码（int32，-1表示None），编码表写入该分块的manifest
+
+同一事件代码的字段集合记录在分块的 event_fields 里，读取时只还原该事件真正传入的字段。
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+EVENT_STORE_FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def _field_kind(values):
+    """推断一列字段的存储类型（None不参与判断）"""
+    kind = None
+    for v in values:
+        if v is None:
+            continue
+        if isinstance(v, (bool, np.bool_)):
+            k = 'bool'
+        elif isinstance(v, (int, np.integer)):
+            k = 'int'
+        elif isinstance(v, (float, np.floating)):
+            k = 'float'
+        else:
+            return 'cat'
+        if kind is None or kind == k:
+            kind = k
+        elif {kind, k} == {'int', 'float'}:
+            kind = 'float'
+        else:
+            return 'cat'
+    return kind or 'float'
+
+
+def _encode_field(kind, values):
+    """把一列字段编码为ndarray；'cat' 同时返回编码表"""
+    if kind == 'bool':
+        return np.array([-1 if v is None else int(bool(v)) for v in values], dtype=np.int8), None
+    if kind in ('int', 'float'):
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64), None
+    vocab = {}
+    codes = np.array([-1 if v is None else vocab.setdefault(str(v), len(vocab)) for v in values], dtype=np.int32)
+    return codes, list(vocab)
+
+
+def _decode_field(kind, arr, vocab):
+    """ndarray -> python值列表"""
+    if kind == 'bool':
+        return [None if c < 0 else bool(c) for c in arr.tolist()]
+    if kind == 'int':
+        return [None if v != v else int(v) for v in arr.tolist()]
+    if kind == 'float':
+        return [None if v != v else v for v in arr.tolist()]
+    return [None if c < 0 else vocab[c] for c in arr.tolist()]
+
+
+def is_event_store(store_dir):
+    """目录是否是本模块写出的事件日志（含带 format_version 的 manifest.json）"""
+    try:
+        with open(os.path.join(store_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return isinstance(manifest, dict) and 'format_version' in manifest
+
+
+class EventLogStore:
+    """分块写出、按order_id索引的追踪事件日志。
+
+    store_dir 必须不存在、为空，或是之前写出的事件日志（会被整个覆盖）；
+    其他已有内容的目录会被拒绝（ValueError），以免误删用户文件。
+    append() 只追加到内存缓冲区；缓冲区满 chunk_size 条或调用 flush() / 任何读取方法时写出一个分块。
+    读取得到的事件是 (order_id, 事件代码, 时刻, details, 原始字段dict)，与 OrderTracker 内存模式的记录相同。
+    """
+
+    def __init__(self, store_dir, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.store_dir = str(store_dir)
+        self.chunk_size = int(chunk_size)
+        if os.path.isdir(self.store_dir) and os.listdir(self.store_dir):
+            if not is_event_store(self.store_dir):
+                raise ValueError(f"事件日志目录 {self.store_dir} 已有其他内容（不是事件日志），"
+                                 f"请指定一个新目录或空目录")
+            shutil.rmtree(self.store_dir)
+        os.makedirs(self.store_dir, exist_ok=True)
+
+        self._order_codes = {}      # order_id -> 编码
+        self._order_chunks = []     # 编码 -> [首个分块, 最后分块]
+        self._event_codes = {}      # 事件代码 -> 编码
+        self._chunks = []           # 每个分块的元数据
+        self._buffer = []           # 尚未写出的 (订单编码, 事件编码, 时刻, details, 字段)
+        self.event_count = 0
+
+    @property
+    def order_ids(self):
+        """按首次出现顺序排列的order_id"""
+        return list(self._order_codes)
+
+    def append(self, order_id, event_type, sim_time, details=None, fields=None):
+        code = self._order_codes.get(order_id)
+        if code is None:
+            code = self._order_codes[order_id] = len(self._order_codes)
+            self._order_chunks.append([len(self._chunks), len(self._chunks)])
+        else:
+            self._order_chunks[code][1] = len(self._chunks)
+        event_code = self._event_codes.setdefault(event_type, len(self._event_codes))
+        self._buffer.append((code, event_code, sim_time, details, fields or {}))
+        self.event_count += 1
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """把缓冲区写成一个分块，并更新manifest和订单索引"""
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        name = f'C{len(self._chunks):05d}'
+        chunk_dir = os.path.join(self.store_dir, name)
+        os.makedirs(chunk_dir, exist_ok=True)
+
+        order = np.array([r[0] for r in rows], dtype=np.int32)
+        np.save(os.path.join(chunk_dir, 'order.npy'), order)
+        np.save(os.path.join(chunk_dir, 'event.npy'), np.array([r[1] for r in rows], dtype=np.int16))
+        np.save(os.path.join(chunk_dir, 'sim_time.npy'), np.array([r[2] for r in rows], dtype=np.float64))
+        np.save(os.path.join(chunk_dir, 'order_sort.npy'), np.argsort(order, kind='stable').astype(np.int32))
+        details, details_vocab = _encode_field('cat', [r[3] for r in rows])
+        np.save(os.path.join(chunk_dir, 'details.npy'), details)
+
+        event_types = list(self._event_codes)
+        event_fields = {}
+        for r in rows:
+            if event_types[r[1]] not in event_fields:
+                event_fields[event_types[r[1]]] = list(r[4])
+        field_names = list(dict.fromkeys(f for names in event_fields.values() for f in names))
+
+        kinds, vocabs = {}, {}
+        for field in field_names:
+            values = [r[4].get(field) for r in rows]
+            kinds[field] = _field_kind(values)
+            arr, vocab = _encode_field(kinds[field], values)
+            np.save(os.path.join(chunk_dir, f'f_{field}.npy'), arr)
+            if vocab is not None:
+                vocabs[field] = vocab
+
+        self._chunks.append({
+            'dir': name,
+            'rows': len(rows),
+            'details': details_vocab,
+            'fields': kinds,
+            'categories': vocabs,
+            'event_fields': event_fields,
+        })
+        self._write_index()
+
+    def _write_index(self):
+        ids = list(self._order_codes)
+        np.save(os.path.join(self.store_dir, 'order_ids.npy'),
+                np.array([s.encode('utf-8') for s in ids], dtype=bytes) if ids else np.array([], dtype='S1'))
+        np.save(os.path.join(self.store_dir, 'order_chunks.npy'),
+                np.array(self._order_chunks, dtype=np.int32).reshape(-1, 2))
+        manifest = {
+            'format_version': EVENT_STORE_FORMAT_VERSION,
+            'event_types': list(self._event_codes),
+            'events': sum(c['rows'] for c in self._chunks),
+            'chunks': self._chunks,
+        }
+        with open(os.path.join(self.store_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+    # ---------- 读取 ----------
+
+    @property
+    def field_names(self):
+        """全部分块出现过的字段名（按首次出现顺序），用于统一 Event_Log 的列"""
+        self.flush()
+        return list(dict.fromkeys(f for chunk in self._chunks for f in chunk['fields']))
+
+    def _load(self, chunk, name):
+        return np.load(os.path.join(self.store_dir, chunk['dir'], f'{name}.npy'), mmap_mode='r')
+
+    def _read_rows(self, chunk_index, rows=None):
+        """读取一个分块中的若干行（rows=None 表示全部，按写入顺序）"""
+        chunk = self._chunks[chunk_index]
+        if rows is None:
+            rows = slice(None)
+        order_ids = self.order_ids
+        event_types = list(self._event_codes)
+        order = np.asarray(self._load(chunk, 'order')[rows]).tolist()
+        event = np.asarray(self._load(chunk, 'event')[rows]).tolist()
+        sim_time = np.asarray(self._load(chunk, 'sim_time')[rows]).tolist()
+        details = _decode_field('cat', np.asarray(self._load(chunk, 'details')[rows]), chunk['details'])
+        fields = {
+            field: _decode_field(kind, np.asarray(self._load(chunk, f'f_{field}')[rows]),
+                                 chunk['categories'].get(field))
+            for field, kind in chunk['fields'].items()
+        }
+        for i in range(len(order)):
+            event_type = event_types[event[i]]
+            yield (order_ids[order[i]], event_type, sim_time[i], details[i],
+                   {field: fields[field][i] for field in chunk['event_fields'][event_type]})
+
+    def iter_events(self):
+        """按写入（时间）顺序逐个分块读出全部事件"""
+        self.flush()
+        for chunk_index in range(len(self._chunks)):
+            yield from self._read_rows(chunk_index)
+
+    def iter_chunks(self):
+        """按分块读出事件（每次一个list），导出时可以逐块写Excel而不必把全部事件放进内存"""
+        self.flush()
+        for chunk_index in range(len(self._chunks)):
+            yield list(self._read_rows(chunk_index))
+
+    def events_for(self, order_id):
+        """某个订单的全部事件（时间顺序）；只读取该订单出现过的分块"""
+        self.flush()
+        code = self._order_codes.get(order_id)
+        if code is None:
+            return []
+        first, last = self._order_chunks[code]
+        events = []
+        for chunk_index in range(first, last + 1):
+            chunk = self._chunks[chunk_index]
+            order_sort = self._load(chunk, 'order_sort')
+            sorted_codes = self._load(chunk, 'order')[order_sort]
+            lo, hi = np.searchsorted(sorted_codes, [code, code + 1])
+            if hi > lo:
+                events.extend(self._read_rows(chunk_index, np.asarray(order_sort[lo:hi])))
+        return events
@@ -0,0 +1,205 @@
+"""
+订单列式存储 - generated_orders.json 的二进制替代格式
+
+目录结构（按月份分区，每列一个 .npy 文件，可以 np.load(mmap_mode='r') 直接内存映射）::
+
+    generated_orders_store/
+        manifest.json        # 列类型、分类编码表、每个月的分组区间
+        M01/order_id.npy
+        M01/pallets.npy
+        ...
+        M02/...
+
+读取某个月时只会打开该月目录下的文件，不会触及全年其他月份的数据。
+data_preparation.py 负责写入，dc_simulation_plot_update.py 负责读取（找不到存储时回退到JSON）。
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+STORE_FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+# 列名 -> 存储类型
+#   'str'   : 定长UTF-8字节串（读取时解码）
+#   'int'   : 整数
+#   'cat'   : 分类编码（int32，-1表示缺失），编码表写入manifest
+#   'float' : float64，NaN表示缺失
+ORDER_COLUMNS = {
+    'order_id': 'str',
+    'month': 'int',
+    'day': 'int',
+    'category': 'cat',
+    'direction': 'cat',
+    'pallets': 'int',
+    'region': 'cat',
+    'creation_hour': 'float',
+    'creation_time_abs': 'float',
+    'timeslot_hour': 'float',
+    'timeslot_abs': 'float',
+}
+
+
+def default_store_path(orders_json_path):
+    """JSON订单文件对应的默认列式存储目录（同目录下的 <文件名>_store）。"""
+    orders_json_path = str(orders_json_path)
+    base, _ext = os.path.splitext(orders_json_path)
+    return base + '_store'
+
+
+def _is_missing(v):
+    return v is None or (isinstance(v, float) and v != v)
+
+
+def _records_of(orders):
+    """DataFrame 或 list[dict] -> list[dict]"""
+    if hasattr(orders, 'to_dict'):
+        return orders.to_dict(orient='records')
+    return list(orders)
+
+
+def _encode_column(name, kind, values, vocab):
+    if kind == 'str':
+        return np.array(['' if _is_missing(v) else str(v).encode('utf-8') for v in values], dtype=np.bytes_)
+    if kind == 'cat':
+        index = {v: i for i, v in enumerate(vocab)}
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, v in enumerate(values):
+            if _is_missing(v):
+                codes[i] = -1
+                continue
+            v = str(v)
+            if v not in index:
+                index[v] = len(vocab)
+                vocab.append(v)
+            codes[i] = index[v]
+        return codes
+    if kind == 'int':
+        arr = np.array([np.nan if _is_missing(v) else v for v in values], dtype=np.float64)
+        if np.isnan(arr).any() or not np.all(arr == np.round(arr)):
+            # 出现缺失或非整数值时退化为float列
+            return arr
+        return arr.astype(np.int64)
+    return np.array([np.nan if _is_missing(v) else float(v) for v in values], dtype=np.float64)
+
+
+def is_order_store(store_dir):
+    """目录是否是本模块写出的订单存储（含带 format_version 的 manifest.json，版本不限）"""
+    try:
+        with open(os.path.join(str(store_dir), MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return isinstance(manifest, dict) and 'format_version' in manifest
+
+
+def write_order_store(orders_by_key, store_dir):
+    """把 {分组key: 订单DataFrame/list[dict]} 写成按月分区的列式存储。
+
+    分组key沿用JSON格式（例如 'FG_Outbound_M01'），月份取自订单的 month 列。
+    manifest.json 最后写入，只有manifest存在的存储才会被读取。
+    store_dir 必须不存在、为空，或是之前写出的订单存储（会被整个覆盖）；
+    其他已有内容的目录会被拒绝（ValueError），以免误删用户文件。
+
+    Returns:
+        manifest dict
+    """
+    store_dir = str(store_dir)
+    if os.path.isdir(store_dir) and os.listdir(store_dir):
+        if not is_order_store(store_dir):
+            raise ValueError(f"订单存储目录 {store_dir} 已有其他内容（不是订单存储），"
+                             f"请检查 generated_orders_store_path，或指定一个新目录或空目录")
+        shutil.rmtree(store_dir)
+    os.makedirs(store_dir, exist_ok=True)
+
+    # 按月份归组
+    by_month = {}
+    for key in sorted(orders_by_key):
+        records = _records_of(orders_by_key[key])
+        if not records:
+            continue
+        month = int(records[0]['month'])
+        by_month.setdefault(month, []).append((key, records))
+
+    vocabs = {name: [] for name, kind in ORDER_COLUMNS.items() if kind == 'cat'}
+    manifest = {
+        'format_version': STORE_FORMAT_VERSION,
+        'columns': dict(ORDER_COLUMNS),
+        'categories': vocabs,
+        'months': {},
+    }
+
+    for month in sorted(by_month):
+        part = f'M{month:02d}'
+        part_dir = os.path.join(store_dir, part)
+        os.makedirs(part_dir, exist_ok=True)
+
+        rows = []
+        groups = {}
+        for key, records in by_month[month]:
+            groups[key] = [len(rows), len(rows) + len(records)]
+            rows.extend(records)
+
+        for name, kind in ORDER_COLUMNS.items():
+            values = [r.get(name) for r in rows]
+            arr = _encode_column(name, kind, values, vocabs.get(name))
+            np.save(os.path.join(part_dir, f'{name}.npy'), arr)
+
+        manifest['months'][str(month)] = {
+            'dir': part,
+            'rows': len(rows),
+            'groups': groups,
+        }
+
+    with open(os.path.join(store_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+def read_manifest(store_dir):
+    """读取manifest；存储不存在或版本不兼容时返回None。"""
+    path = os.path.join(str(store_dir), MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != STORE_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def available_months(manifest):
+    return sorted(int(m) for m in manifest.get('months', {}))
+
+
+def load_month_columns(store_dir, month, manifest=None, mmap=True):
+    """内存映射读取某个月的全部列。
+
+    Returns:
+        (columns, groups): columns 为 {列名: ndarray}（分类列、字符串列已解码为python列表），
+        groups 为 {分组key: (start, stop)}；该月不存在时返回 (None, {})
+    """
+    if manifest is None:
+        manifest = read_manifest(store_dir)
+    if manifest is None:
+        return None, {}
+    info = manifest['months'].get(str(int(month)))
+    if info is None:
+        return None, {}
+
+    part_dir = os.path.join(str(store_dir), info['dir'])
+    columns = {}
+    for name, kind in manifest['columns'].items():
+        arr = np.load(os.path.join(part_dir, f'{name}.npy'), mmap_mode='r' if mmap else None)
+        if kind == 'cat':
+            vocab = manifest['categories'][name]
+            columns[name] = [vocab[c] if c >= 0 else None for c in arr.tolist()]
+        elif kind == 'str':
+            columns[name] = [v.decode('utf-8') for v in arr.tolist()]
+        else:
+            columns[name] = arr
+    groups = {key: (int(se[0]), int(se[1])) for key, se in info['groups'].items()}
+    return columns, groups
@@ -0,0 +1,212 @@
+"""
+仿真结果磁盘缓存 - 按内容寻址，每个 replication job 一个文件
+
+key 是仿真输入的 sha256（由调用方拼好要参与的部分，见 dc_simulation_plot_update._replication_cache_key）::
+
+    outputs/result_cache/
+        3f/3fa1...e9.pkl     # pickle: {'key', 'label', 'created', 'result'}
+        a0/a07c...12.pkl
+        ...
+
+命中时会更新文件的 mtime，淘汰时按 mtime 从旧到新删除（LRU），直到总大小不超过上限。
+命令行：
+
+    python src/result_cache.py info
+    python src/result_cache.py list [-n 20]
+    python src/result_cache.py evict --max-size 2GB
+    python src/result_cache.py clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 'outputs', 'result_cache')
+CACHE_SUFFIX = '.pkl'
+# 读条目时当作“无法使用”的异常：文件缺失/截断/损坏，或由不兼容的 numpy/pandas 版本写出（类或模块已不存在）
+UNREADABLE_ERRORS = (OSError, EOFError, pickle.UnpicklingError, ImportError, AttributeError)
+
+_SIZE_UNITS = {'': 1, 'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3, 'TB': 1024 ** 4}
+
+
+def _canonical(obj):
+    """转换为可稳定JSON序列化的结构：dict按key排序（key统一转字符串），元组当列表，其余对象用repr"""
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return obj
+    if hasattr(obj, 'item'):
+        return obj.item()
+    return repr(obj)
+
+
+def fingerprint(*parts):
+    """任意个可JSON化部分的sha256（十六进制）"""
+    payload = json.dumps([_canonical(p) for p in parts], sort_keys=True, ensure_ascii=False,
+                         separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def file_fingerprint(path):
+    """文件/目录的 (路径, 大小, mtime) 指纹；目录取其中 manifest.json（若有）或目录本身"""
+    if path is None or not os.path.exists(path):
+        return None
+    target = path
+    if os.path.isdir(path) and os.path.exists(os.path.join(path, 'manifest.json')):
+        target = os.path.join(path, 'manifest.json')
+    stat = os.stat(target)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def source_fingerprint(*paths):
+    """源码文件内容的sha256，作为“代码版本”"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def parse_size(text):
+    """'500MB' / '2GB' / '1048576' -> 字节数"""
+    text = str(text).strip().upper()
+    for unit in sorted(_SIZE_UNITS, key=len, reverse=True):
+        if unit and text.endswith(unit):
+            return int(float(text[:-len(unit)]) * _SIZE_UNITS[unit])
+    return int(float(text))
+
+
+def format_size(num_bytes):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if num_bytes < 1024 or unit == 'GB':
+            return f'{num_bytes:.1f}{unit}' if unit != 'B' else f'{num_bytes}B'
+        num_bytes /= 1024
+
+
+class ResultCache:
+    """按key存取pickle结果的目录缓存（多进程读安全；写入先写临时文件再原子改名）"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=None):
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + CACHE_SUFFIX)
+
+    def get(self, key):
+        """返回缓存的结果；不存在、文件损坏或由不兼容的库版本写出（无法unpickle）时返回None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except UNREADABLE_ERRORS:
+            self.misses += 1
+            return None
+        os.utime(path)  # 记录最近使用时间（LRU）
+        self.hits += 1
+        return entry['result']
+
+    def put(self, key, result, label=''):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'key': key, 'label': label, 'created': time.time(), 'result': result}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        if self.max_bytes is not None:
+            self.evict(self.max_bytes)
+
+    def entries(self):
+        """[(最近使用时间, 大小, 路径)]，按最近使用时间从旧到新"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for shard in os.listdir(self.cache_dir):
+            shard_dir = os.path.join(self.cache_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if name.endswith(CACHE_SUFFIX):
+                    path = os.path.join(shard_dir, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        return entries
+
+    def total_bytes(self):
+        return sum(size for _mtime, size, _path in self.entries())
+
+    def evict(self, max_bytes):
+        """按LRU删除条目直到总大小 <= max_bytes；返回 (删除条目数, 释放字节数)"""
+        entries = self.entries()
+        total = sum(size for _mtime, size, _path in entries)
+        removed = freed = 0
+        for _mtime, size, path in entries:
+            if total <= max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+            freed += size
+        return removed, freed
+
+    def clear(self):
+        return self.evict(0)
+
+    def describe(self, path):
+        """读取条目的标签和创建时间（不返回结果本身）；条目无法读取时标签为“(无法读取)”"""
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except UNREADABLE_ERRORS:
+            return '(无法读取)', None
+        return entry.get('label', ''), entry.get('created')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='仿真结果缓存管理')
+    parser.add_argument('--dir', default=DEFAULT_CACHE_DIR, help='缓存目录')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('info', help='条目数与总大小')
+    list_parser = sub.add_parser('list', help='按最近使用时间列出条目')
+    list_parser.add_argument('-n', type=int, default=20, help='最多列出多少条（最近使用的在前）')
+    evict_parser = sub.add_parser('evict', help='按LRU淘汰到指定大小以下')
+    evict_parser.add_argument('--max-size', required=True, help='例如 500MB / 2GB')
+    sub.add_parser('clear', help='删除全部条目')
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.dir)
+    if args.command == 'info':
+        entries = cache.entries()
+        total = sum(size for _mtime, size, _path in entries)
+        print(f'缓存目录: {cache.cache_dir}')
+        print(f'条目数: {len(entries)}, 总大小: {format_size(total)}')
+        if entries:
+            print(f'最近使用: {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entries[-1][0]))}, '
+                  f'最久未用: {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entries[0][0]))}')
+    elif args.command == 'list':
+        for mtime, size, path in reversed(cache.entries()[-args.n:] if args.n > 0 else cache.entries()):
+            label, _created = cache.describe(path)
+            print(f'{time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(mtime))}  {format_size(size):>8s}  '
+                  f'{os.path.basename(path)[:12]}  {label}')
+    elif args.command == 'evict':
+        removed, freed = cache.evict(parse_size(args.max_size))
+        print(f'已删除 {removed} 个条目，释放 {format_size(freed)}；剩余 {format_size(cache.total_bytes())}')
+    elif args.command == 'clear':
+        removed, freed = cache.clear()
+        print(f'已删除 {removed} 个条目，释放 {format_size(freed)}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Total Shipments 工作簿的读取层 - 每个sheet只用openpyxl解析一次
+
+第一次读取时解析 'Inbound Shipments 2025' / 'Outbound Shipments 2025' 两个sheet，
+把日期列转成 datetime64 后，以pickle（保留全部dtype）写到源文件旁边::
+
+    data/raw/Total Shipments 2025.xlsx
+    data/raw/Total Shipments 2025.shipments.pkl   # {'format_version', 'source_size', 'source_mtime_ns', 'frames'}
+
+缓存按源文件的 (大小, mtime) 判断是否有效，工作簿被替换后自动重新解析。
+同一进程内的多次调用还会复用内存中的结果（返回副本，调用方可以随意加列/过滤）。
+data_preparation.py 和 scripts/analysis/volume*.py 都通过 load_shipments 读取。
+"""
+
+import os
+import pickle
+
+import pandas as pd
+
+CACHE_FORMAT_VERSION = 1
+CACHE_SUFFIX = '.shipments.pkl'
+
+# 方向 -> sheet名称
+SHIPMENT_SHEETS = {
+    'Inbound': 'Inbound Shipments 2025',
+    'Outbound': 'Outbound Shipments 2025',
+}
+DATE_COLUMN = 'Date Hour appointement'
+
+# 进程内缓存：(源文件绝对路径, 大小, mtime_ns) -> {方向: DataFrame}
+_MEMO = {}
+
+
+def default_cache_path(xlsx_path):
+    """工作簿对应的缓存文件（同目录下的 <文件名>.shipments.pkl）。"""
+    base, _ext = os.path.splitext(str(xlsx_path))
+    return base + CACHE_SUFFIX
+
+
+def _source_signature(xlsx_path):
+    stat = os.stat(xlsx_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _parse_workbook(xlsx_path):
+    """用openpyxl解析两个sheet（一次打开工作簿）并统一dtype。"""
+    frames = pd.read_excel(xlsx_path, sheet_name=list(SHIPMENT_SHEETS.values()))
+    result = {}
+    for direction, sheet_name in SHIPMENT_SHEETS.items():
+        df = frames[sheet_name]
+        df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN])
+        result[direction] = df
+    return result
+
+
+def _read_cache(cache_path, size, mtime_ns):
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, ImportError, AttributeError):
+        # 文件损坏，或由不兼容的 pandas/numpy 版本写出：当作没有缓存，重新解析工作簿
+        return None
+    if (cached.get('format_version') != CACHE_FORMAT_VERSION
+            or cached.get('source_size') != size or cached.get('source_mtime_ns') != mtime_ns):
+        return None
+    return cached['frames']
+
+
+def _write_cache(cache_path, frames, size, mtime_ns):
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({
+                'format_version': CACHE_FORMAT_VERSION,
+                'source_size': size,
+                'source_mtime_ns': mtime_ns,
+                'frames': frames,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"警告: 无法写入shipments缓存 {cache_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_shipments(xlsx_path, use_cache=True):
+    """读取 Total Shipments 工作簿。
+
+    Args:
+        xlsx_path: 工作簿路径
+        use_cache: False 时忽略并重写磁盘缓存（强制重新解析Excel）
+
+    Returns:
+        {'Inbound': DataFrame, 'Outbound': DataFrame}，DATE_COLUMN 已是 datetime64；每次调用返回新的副本
+    """
+    xlsx_path = os.path.abspath(str(xlsx_path))
+    size, mtime_ns = _source_signature(xlsx_path)
+    memo_key = (xlsx_path, size, mtime_ns)
+
+    frames = _MEMO.get(memo_key) if use_cache else None
+    if frames is None:
+        cache_path = default_cache_path(xlsx_path)
+        frames = _read_cache(cache_path, size, mtime_ns) if use_cache else None
+        if frames is None:
+            print(f"解析 {os.path.basename(xlsx_path)}（首次读取，之后使用缓存 {os.path.basename(cache_path)}）")
+            frames = _parse_workbook(xlsx_path)
+            _write_cache(cache_path, frames, size, mtime_ns)
+        _MEMO.clear()
+        _MEMO[memo_key] = frames
+
+    return {direction: df.copy() for direction, df in frames.items()}
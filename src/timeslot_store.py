@@ -0,0 +1,207 @@
+"""
+Timeslot 周数据读取层 - 并行解析 data/Timeslot by week/W*.xlsx 并增量缓存
+
+每个周文件只在新增或修改（大小/mtime变化）时才用openpyxl重新解析，解析在进程池中并行进行。
+缓存放在数据目录旁边（<目录名>_cache）::
+
+    data/Timeslot by week_cache/
+        manifest.json        # 每个周文件的 (大小, mtime_ns) 以及合并结果包含的文件列表
+        parts/W01.pkl        # 单个周文件列数标准化后的 DataFrame（col_0..col_30）
+        parts/W02.pkl
+        ...
+        merged.pkl           # 全部周文件合并、解析日期并修正 YYYY-M-11 之后的 DataFrame
+
+合并结果的列：col_0..col_30（col_7..col_30 为 0h00..23h00 的24个时段）+ Date_parsed。
+data_preparation.extract_dock_capacity_from_timeslot 和 scripts/analysis/Timeslot*.py 都通过 load_timeslot_data 读取。
+"""
+
+import glob
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+CACHE_FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+MERGED_NAME = 'merged.pkl'
+WEEK_FILE_PATTERN = 'W*.xlsx'
+
+# 时段列（0h00..23h00）的列号
+TIME_COLUMNS = list(range(7, 31))
+
+
+def default_cache_dir(timeslot_dir):
+    """周数据目录对应的默认缓存目录（同级的 <目录名>_cache）。"""
+    return os.path.normpath(str(timeslot_dir)) + '_cache'
+
+
+def normalize_week_rows(rows):
+    """工作表的行（第一行为表头）-> 列数统一为31、列名为 col_i 的 DataFrame。
+
+    部分周文件缺少 0h00 列（31列，补0），部分多出末尾一列（32列，去掉）。
+    """
+    df = pd.DataFrame(rows[1:], columns=rows[0])
+    if len(df.columns) == 31:
+        df.insert(7, '0h00', 0)
+    if len(df.columns) == 32:
+        df = df.iloc[:, :-1]
+    df.columns = [f'col_{i}' for i in range(len(df.columns))]
+    return df
+
+
+def parse_week_file(path):
+    """用openpyxl读取单个周文件的活动工作表（进程池worker）。"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, data_only=True)
+    rows = [list(row) for row in wb.active.iter_rows(values_only=True)]
+    return normalize_week_rows(rows)
+
+
+def fix_misread_dates(dates, year=2025):
+    """修正被解析成 YYYY-M-11 的日期（应为 YYYY-11-M），返回 (修正后的Series, 修正行数)。"""
+    mask = (dates.dt.year == year) & (dates.dt.day == 11) & (dates.dt.month <= 10)
+    count = int(mask.sum())
+    if count:
+        wrong = dates[mask]
+        dates = dates.copy()
+        dates[mask] = pd.to_datetime(pd.DataFrame({'year': wrong.dt.year, 'month': 11, 'day': wrong.dt.month}))
+    return dates, count
+
+
+def _merge_parts(parts):
+    merged = pd.concat(parts, ignore_index=True)
+    dates = pd.to_datetime(merged.iloc[:, 1], errors='coerce', dayfirst=True)
+    merged['Date_parsed'], fixed = fix_misread_dates(dates)
+    if fixed:
+        print(f"  修正日期 YYYY-M-11 -> YYYY-11-M: {fixed} 行")
+    return merged
+
+
+def _read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format_version') != CACHE_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def _dump(obj, path):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _load(path):
+    """读取缓存分片；文件损坏或由不兼容的 pandas/numpy 版本写入时返回 None，由调用方重新解析。"""
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, ImportError, AttributeError):
+        return None
+
+
+def _parse_files(paths, workers):
+    """并行解析周文件，按输入顺序逐个产出 (path, DataFrame 或 异常)。"""
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(paths))
+    if workers <= 1:
+        for path in paths:
+            try:
+                yield path, parse_week_file(path)
+            except Exception as e:
+                yield path, e
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(parse_week_file, path) for path in paths]
+        for path, fut in zip(paths, futures):
+            try:
+                yield path, fut.result()
+            except Exception as e:
+                yield path, e
+
+
+def load_timeslot_data(timeslot_dir, workers=None, cache_dir=None, use_cache=True, skip_errors=False):
+    """读取并合并全部周文件。
+
+    Args:
+        timeslot_dir: 周数据目录（包含 W*.xlsx）
+        workers: 解析进程数；None/0 = 全部CPU核，1 = 串行
+        cache_dir: 缓存目录（默认 default_cache_dir(timeslot_dir)）
+        use_cache: False 时重新解析全部周文件（并重写缓存）
+        skip_errors: True 时跳过无法解析的文件（打印警告，下次仍会重试），否则抛出异常
+
+    Returns:
+        合并后的DataFrame（col_0..col_30 + Date_parsed）；目录中没有周文件时返回None
+    """
+    timeslot_dir = str(timeslot_dir)
+    paths = sorted(glob.glob(os.path.join(glob.escape(timeslot_dir), WEEK_FILE_PATTERN)))
+    if not paths:
+        return None
+
+    cache_dir = cache_dir or default_cache_dir(timeslot_dir)
+    parts_dir = os.path.join(cache_dir, 'parts')
+    os.makedirs(parts_dir, exist_ok=True)
+
+    manifest = (_read_manifest(cache_dir) if use_cache else None) or {'files': {}, 'merged': None}
+    cached_files = manifest['files']
+    files = {}
+    stale = []
+    for path in paths:
+        name = os.path.basename(path)
+        stat = os.stat(path)
+        entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'part': os.path.splitext(name)[0] + '.pkl'}
+        files[name] = entry
+        if cached_files.get(name) != entry or not os.path.exists(os.path.join(parts_dir, entry['part'])):
+            stale.append(path)
+
+    merged_path = os.path.join(cache_dir, MERGED_NAME)
+    if not stale and manifest.get('merged') == sorted(files) and os.path.exists(merged_path):
+        merged = _load(merged_path)
+        if merged is not None:
+            print(f"  Timeslot: {len(paths)} 个周文件均未变化，读取缓存 {merged_path}")
+            return merged
+
+    # 无法读取的缓存分片按修改过的周文件处理，重新解析
+    parts = {}
+    for path in paths:
+        if path in stale:
+            continue
+        name = os.path.basename(path)
+        part = _load(os.path.join(parts_dir, files[name]['part']))
+        if part is None:
+            stale.append(path)
+        else:
+            parts[name] = part
+
+    print(f"  Timeslot: {len(paths)} 个周文件，解析新增/修改的 {len(stale)} 个（其余来自缓存）")
+    for path, result in _parse_files(stale, workers):
+        name = os.path.basename(path)
+        if isinstance(result, Exception):
+            if not skip_errors:
+                raise result
+            print(f"警告: 无法读取 {path}: {result}")
+            del files[name]
+            continue
+        _dump(result, os.path.join(parts_dir, files[name]['part']))
+        parts[name] = result
+
+    merged = _merge_parts([parts[name] for name in sorted(files)])
+    _dump(merged, merged_path)
+
+    # 清理已删除周文件的分片
+    for name, entry in cached_files.items():
+        if name not in files and os.path.exists(os.path.join(parts_dir, entry['part'])):
+            os.remove(os.path.join(parts_dir, entry['part']))
+
+    with open(os.path.join(cache_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump({'format_version': CACHE_FORMAT_VERSION, 'files': files, 'merged': sorted(files)},
+                  f, ensure_ascii=False, indent=2)
+    return merged